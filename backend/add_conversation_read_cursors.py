@@ -0,0 +1,94 @@
+"""
+Migration script to add per-user read cursors for trip group chats.
+Group reads move conversation_participants.last_read_at instead of the shared
+messages.is_read flag. Existing members start at the newest trip message that
+was already marked read. Run rebuild_conversation_summaries.py afterwards so
+stored unread counts use the cursors.
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_conversation_read_cursors():
+    """Add last_read_at/last_read_message_id and backfill them for trip members."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Adding read cursor columns to 'conversation_participants'...")
+        conn.execute(text("""
+            ALTER TABLE conversation_participants
+            ADD COLUMN IF NOT EXISTS last_read_at TIMESTAMP WITH TIME ZONE
+        """))
+        conn.execute(text("""
+            ALTER TABLE conversation_participants
+            ADD COLUMN IF NOT EXISTS last_read_message_id UUID REFERENCES messages(id) ON DELETE SET NULL
+        """))
+        
+        # Every accepted member needs a group chat row to hold their cursor
+        print("Creating missing group chat participant rows...")
+        result = conn.execute(text("""
+            INSERT INTO conversation_participants (id, user_id, other_user_id, trip_id, created_at)
+            SELECT gen_random_uuid(), tp.user_id, NULL, tp.trip_id, NOW()
+            FROM trip_participants tp
+            WHERE tp.status = 'accepted'
+              AND NOT EXISTS (
+                  SELECT 1 FROM conversation_participants cp
+                  WHERE cp.user_id = tp.user_id AND cp.trip_id = tp.trip_id AND cp.other_user_id IS NULL
+              )
+        """))
+        print(f"   Created {result.rowcount} rows")
+        
+        # The shared flag was flipped by whoever opened the chat first: start every
+        # member at the newest message marked read so nobody gets a burst of old unreads
+        print("Backfilling read cursors from messages.is_read...")
+        result = conn.execute(text("""
+            UPDATE conversation_participants cp
+            SET last_read_at = newest_read.created_at,
+                last_read_message_id = newest_read.id
+            FROM (
+                SELECT DISTINCT ON (trip_id) trip_id, id, created_at
+                FROM messages
+                WHERE trip_id IS NOT NULL AND is_read = TRUE
+                ORDER BY trip_id, created_at DESC, id DESC
+            ) newest_read
+            WHERE cp.trip_id = newest_read.trip_id
+              AND cp.other_user_id IS NULL
+              AND cp.last_read_at IS NULL
+        """))
+        print(f"   Backfilled {result.rowcount} cursors")
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Added 'last_read_at' and 'last_read_message_id' to 'conversation_participants'")
+        print("   - Next: python rebuild_conversation_summaries.py")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_conversation_read_cursors()
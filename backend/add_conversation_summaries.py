@@ -0,0 +1,90 @@
+"""
+Migration script to add the conversation_summaries table (materialized inbox).
+Run this script to update your database schema, then backfill it with:
+    python rebuild_conversation_summaries.py
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """Create conversation_summaries and its unique indexes."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Creating 'conversation_summaries' table...")
+
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS conversation_summaries (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                peer_user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+                trip_id UUID REFERENCES trips(id) ON DELETE CASCADE,
+                last_message_id UUID REFERENCES messages(id) ON DELETE SET NULL,
+                last_message_at TIMESTAMP WITH TIME ZONE,
+                unread_count INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                CONSTRAINT conversation_summaries_check CHECK (
+                    (peer_user_id IS NOT NULL AND trip_id IS NULL) OR
+                    (peer_user_id IS NULL AND trip_id IS NOT NULL)
+                )
+            )
+        """))
+
+        # One row per (user, peer) and per (user, trip); these also serve the inbox lookups
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_conversation_summaries_direct
+            ON conversation_summaries(user_id, peer_user_id)
+            WHERE trip_id IS NULL
+        """))
+
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_conversation_summaries_trip
+            ON conversation_summaries(user_id, trip_id)
+            WHERE trip_id IS NOT NULL
+        """))
+
+        # Fan-out updates for group messages and deletes filter by trip
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_conversation_summaries_trip_id
+            ON conversation_summaries(trip_id)
+            WHERE trip_id IS NOT NULL
+        """))
+
+        trans.commit()
+
+        print("✅ Migration completed successfully!")
+        print("  - Created 'conversation_summaries' table")
+        print("  - Created unique indexes for 1-on-1 and trip summaries")
+        print("Next: run 'python rebuild_conversation_summaries.py' to backfill existing conversations")
+
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
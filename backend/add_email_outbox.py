@@ -0,0 +1,73 @@
+"""
+Migration script to create the email_outbox table.
+Emails are queued here in the same transaction as the change that triggers them
+and delivered by the background outbox sender (app/mail/outbox.py).
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_email_outbox():
+    """Create the email_outbox table and its due-rows index."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Creating table 'email_outbox'...")
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id UUID PRIMARY KEY,
+                kind VARCHAR(50) NOT NULL,
+                recipient VARCHAR(255) NOT NULL,
+                context JSON NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                last_error TEXT,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+        """))
+        
+        # Only pending rows are indexed: sent rows are deleted and dead ones are never polled
+        print("Creating index 'idx_email_outbox_due'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+            ON email_outbox(next_attempt_at)
+            WHERE status = 'pending'
+        """))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Created table 'email_outbox'")
+        print("   - Created 'idx_email_outbox_due' (partial: pending)")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_email_outbox()
@@ -0,0 +1,56 @@
+"""
+Migration script to add the index behind the paginated expense list.
+GET /expenses/trips/{trip_id}/expenses walks a trip's expenses newest first,
+keyset-paged on (created_at, id).
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_expense_list_indexes():
+    """Add the (trip_id, created_at, id) index for a trip's expense pages."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Creating index 'idx_expenses_trip_created'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_expenses_trip_created
+            ON expenses(trip_id, created_at, id)
+        """))
+        
+        conn.execute(text("ANALYZE expenses"))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Created 'idx_expenses_trip_created'")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_expense_list_indexes()
@@ -0,0 +1,75 @@
+"""
+Migration script to add partial indexes for the message access patterns and drop
+single-column indexes made redundant by the composite ones.
+Run after add_message_cursor_indexes.py, which creates the 1-on-1 pair and trip
+timeline indexes (…, created_at, id).
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_message_access_indexes():
+    """Add partial indexes for unread counts and the visible trip timeline."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        # Unread 1-on-1 messages by receiver: only unread rows are indexed, so the
+        # index stays small and counts/updates touch just the unread tail
+        print("Creating index 'idx_messages_unread_direct'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_messages_unread_direct
+            ON messages(receiver_id, sender_id, created_at)
+            WHERE is_read = FALSE AND deleted_for_everyone_at IS NULL AND trip_id IS NULL
+        """))
+        
+        # Non-deleted trip messages in time order: last message per trip and unread range counts
+        print("Creating index 'idx_messages_trip_visible'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_messages_trip_visible
+            ON messages(trip_id, created_at, id)
+            WHERE deleted_for_everyone_at IS NULL
+        """))
+        
+        # sender_id and trip_id lead idx_messages_pair_created / idx_messages_trip_created
+        print("Dropping redundant single-column indexes...")
+        conn.execute(text("DROP INDEX IF EXISTS ix_messages_sender_id"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_messages_trip_id"))
+        
+        conn.execute(text("ANALYZE messages"))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Created 'idx_messages_unread_direct' (partial: unread, not deleted, 1-on-1)")
+        print("   - Created 'idx_messages_trip_visible' (partial: not deleted)")
+        print("   - Dropped 'ix_messages_sender_id' and 'ix_messages_trip_id'")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_message_access_indexes()
@@ -0,0 +1,62 @@
+"""
+Migration script to add composite indexes for keyset (cursor) pagination of chat histories.
+Run this script to update your database schema.
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_message_cursor_indexes():
+    """Add (…, created_at, id) indexes used by GET /messages/trip/{id} and /messages/conversation/{id}."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        # Trip group chat timeline
+        print("Creating index 'idx_messages_trip_created'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_messages_trip_created
+            ON messages(trip_id, created_at, id)
+        """))
+        
+        # 1-on-1 history: one range scan per direction of the pair
+        print("Creating index 'idx_messages_pair_created'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_messages_pair_created
+            ON messages(sender_id, receiver_id, created_at, id)
+        """))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Created 'idx_messages_trip_created' on messages(trip_id, created_at, id)")
+        print("   - Created 'idx_messages_pair_created' on messages(sender_id, receiver_id, created_at, id)")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_message_cursor_indexes()
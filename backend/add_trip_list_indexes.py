@@ -0,0 +1,71 @@
+"""
+Migration script to add the indexes behind the paginated, filterable trip list.
+GET /trips looks up the caller's participations by (user_id, status), loads the
+participants of one page of trips by trip_id and filters on trips.start_date.
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_trip_list_indexes():
+    """Add indexes for the trip list's participation lookup, participant loading and date filters."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Creating index 'idx_trip_participants_user_status'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_trip_participants_user_status
+            ON trip_participants(user_id, status)
+        """))
+        
+        print("Creating index 'idx_trip_participants_trip_id'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_trip_participants_trip_id
+            ON trip_participants(trip_id)
+        """))
+        
+        print("Creating index 'idx_trips_start_date'...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_trips_start_date
+            ON trips(start_date)
+        """))
+        
+        conn.execute(text("ANALYZE trip_participants"))
+        conn.execute(text("ANALYZE trips"))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Created 'idx_trip_participants_user_status'")
+        print("   - Created 'idx_trip_participants_trip_id'")
+        print("   - Created 'idx_trips_start_date'")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_trip_list_indexes()
@@ -0,0 +1,63 @@
+"""
+Migration script to add the trip_member_balances table (per-trip balance ledger).
+Run this script to update your database schema, then backfill it with:
+    python rebuild_trip_ledger.py
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """Create trip_member_balances."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Creating 'trip_member_balances' table...")
+
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS trip_member_balances (
+                trip_id UUID NOT NULL REFERENCES trips(id) ON DELETE CASCADE,
+                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                paid_cents BIGINT NOT NULL DEFAULT 0,
+                share_cents BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                PRIMARY KEY (trip_id, user_id)
+            )
+        """))
+
+        trans.commit()
+
+        print("✅ Migration completed successfully!")
+        print("  - Created 'trip_member_balances' table")
+        print("Next: run 'python rebuild_trip_ledger.py' to backfill existing trips")
+
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
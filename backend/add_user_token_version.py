@@ -0,0 +1,54 @@
+"""
+Migration script to add the token_version column to the users table.
+Access tokens carry the user's token_version; bumping it revokes every token
+issued before (see app/utils/principal.py).
+"""
+import sys
+from sqlalchemy import create_engine, text
+import os
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+
+# Load .env file for local development (but Docker env vars will override)
+load_dotenv()
+
+# Database URL from environment variables
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_user = os.getenv("POSTGRES_USER", "synvoy_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "synvoy_secure_password_2024")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5433")
+    db_name = os.getenv("POSTGRES_DB", "synvoy")
+    
+    encoded_password = quote_plus(db_password)
+    DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
+
+engine = create_engine(DATABASE_URL)
+
+def add_user_token_version():
+    """Add users.token_version (existing users start at 0)."""
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        print("Adding 'token_version' column to users table...")
+        conn.execute(text("""
+            ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0
+        """))
+        
+        trans.commit()
+        print("✅ Migration completed successfully!")
+        print("   - Added 'token_version' to 'users' (default 0)")
+        
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_user_token_version()
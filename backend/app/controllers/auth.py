@@ -11,18 +11,21 @@ from app.schemas.auth import (
     VerifyEmailRequest, ResendVerificationRequest, VerificationStatusResponse,
     ChangePasswordRequest, DeleteAccountRequest, CancelDeletionRequest, DeletionStatusResponse
 )
-from app.utils.auth import get_password_hash, verify_password, create_access_token, verify_token, generate_secure_token, hash_token
-from app.utils.email import send_verification_email, send_password_change_email, send_deletion_scheduled_email, send_deletion_complete_email
+from app.utils.auth import get_password_hash, verify_password, password_needs_rehash, create_access_token, verify_token, principal_claims, has_principal_claims, generate_secure_token, hash_token, verify_token_hash
+from app.utils.kdf_pool import KdfPoolBusy
+from app.utils.principal import Principal, TokenPrincipal, principal_cache, token_versions, evict_principal
+from app.mail.outbox import queue_email
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 import os
 import random
+import uuid
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
 
 @router.post("/register", response_model=TokenWithUser)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     # Validate tester code (required during development)
     expected_tester_code = os.getenv("TESTER_CODE", "")
@@ -80,22 +83,20 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         expires_at=expires_at
     )
     db.add(verification_token)
-    db.commit()
     
-    # Send verification email
-    try:
-        send_verification_email(
-            email=db_user.email,
-            name=f"{db_user.first_name} {db_user.last_name}",
-            code=verification_code
-        )
-    except Exception as e:
-        print(f"Warning: Failed to send verification email: {e}")
-        # Continue with registration even if email fails
+    # Queue the verification email with the token; the outbox sends it after commit
+    queue_email(
+        db, "verification", db_user.email,
+        email=db_user.email,
+        name=f"{db_user.first_name} {db_user.last_name}",
+        code=verification_code
+    )
+    db.commit()
     
     # Generate access token
     access_token = create_access_token(
-        data={"sub": str(db_user.id), "email": db_user.email}
+        data={"sub": str(db_user.id), "email": db_user.email},
+        user=db_user
     )
     
     # Convert user to response format
@@ -120,7 +121,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenWithUser)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Authenticate user and return access token. Accepts either email or username."""
     try:
         # Normalize input (lowercase for comparison)
@@ -183,11 +184,21 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
                 detail=f"User account is not active. Current status: {user.status}"
             )
         
+        # Upgrade hashes made under an older algorithm or cost while the password is at hand
+        if password_needs_rehash(user.password_hash):
+            try:
+                user.password_hash = get_password_hash(user_credentials.password)
+                db.commit()
+            except KdfPoolBusy:
+                # Not worth failing the login over; the next one will try again
+                db.rollback()
+        
         print(f"Login successful for user '{user_credentials.username_or_email}' (ID: {user.id})")
         
         # Generate access token
         access_token = create_access_token(
-            data={"sub": str(user.id), "email": user.email}
+            data={"sub": str(user.id), "email": user.email},
+            user=user
         )
         
         # Convert user to response format
@@ -224,42 +235,87 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail=f"Internal server error: {str(e)}"
         )
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token."""
-    token = credentials.credentials
-    payload = verify_token(token)
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    """Verified JWT payload with a well-formed subject, else 401."""
+    payload = verify_token(credentials.credentials)
     
-    if not payload:
+    if not payload or payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    try:
+        payload["sub"] = uuid.UUID(payload["sub"])
+    except (ValueError, AttributeError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    return payload
+
+def _check_token_version(payload: dict, token_version: Optional[int]):
+    """Reject tokens of deleted users and tokens issued before the user's last token_version bump."""
+    if token_version is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("ver", 0) != token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Get current authenticated user from JWT token, as a read-only Principal.
+    Served from the principal cache when warm; handlers that modify the user
+    must load the User row themselves and call evict_principal() after commit.
+    """
+    payload = _token_payload(credentials)
+    user_id = payload["sub"]
+    
+    def load_principal():
+        user = db.query(User).filter(User.id == user_id).first()
+        return Principal.from_user(user) if user else None
+    
+    principal = principal_cache.get_or_load(user_id, load_principal)
+    _check_token_version(payload, principal.token_version if principal else None)
+    return principal
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> TokenPrincipal:
+    """
+    Lightweight get_current_user for routes that only need the caller's id and
+    display fields. Signed-claims tokens are trusted for those fields; the only
+    lookup is the user's token_version (cached), so revoked tokens are still refused.
+    Tokens issued without claims fall back to get_current_user.
+    """
+    payload = _token_payload(credentials)
+    if not has_principal_claims(payload):
+        return TokenPrincipal.from_claims(principal_claims(get_current_user(credentials, db)))
+    user_id = payload["sub"]
     
-    return user
+    token_version = token_versions.get_or_load(
+        user_id,
+        lambda: db.query(User.token_version).filter(User.id == user_id).scalar()
+    )
+    _check_token_version(payload, token_version)
+    return TokenPrincipal.from_claims({**payload, "sub": str(user_id)})
 
 @router.get("/profile", response_model=UserResponse)
-async def get_user_profile(
-    current_user: User = Depends(get_current_user)
+def get_user_profile(
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get current authenticated user information."""
     return UserResponse(
@@ -276,7 +332,7 @@ async def get_user_profile(
     )
 
 @router.post("/verify-email")
-async def verify_email(
+def verify_email(
     verification_data: VerifyEmailRequest,
     db: Session = Depends(get_db)
 ):
@@ -321,6 +377,7 @@ async def verify_email(
         user.status = 'active'
         
         db.commit()
+        evict_principal(user.id)
         
         return {
             "message": "Email verified successfully",
@@ -338,7 +395,7 @@ async def verify_email(
         )
 
 @router.post("/resend-verification")
-async def resend_verification(
+def resend_verification(
     resend_data: ResendVerificationRequest,
     db: Session = Depends(get_db)
 ):
@@ -390,19 +447,14 @@ async def resend_verification(
             expires_at=expires_at
         )
         db.add(verification_token)
+        queue_email(
+            db, "verification", user.email,
+            email=user.email,
+            name=f"{user.first_name} {user.last_name}",
+            code=verification_code
+        )
         db.commit()
         
-        # Send verification email
-        try:
-            send_verification_email(
-                email=user.email,
-                name=f"{user.first_name} {user.last_name}",
-                code=verification_code
-            )
-        except Exception as e:
-            print(f"Warning: Failed to send verification email: {e}")
-            # Still return success to avoid revealing email issues
-        
         return {
             "message": "Verification code has been sent to your email"
         }
@@ -418,7 +470,7 @@ async def resend_verification(
         )
 
 @router.get("/verification-status")
-async def get_verification_status(
+def get_verification_status(
     email: str,
     db: Session = Depends(get_db)
 ):
@@ -476,9 +528,9 @@ async def get_verification_status(
         )
 
 @router.post("/change-password")
-async def change_password(
+def change_password(
     password_data: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -486,15 +538,17 @@ async def change_password(
     Requires current password verification and sends email notification.
     """
     try:
+        user = db.query(User).filter(User.id == current_user.id).first()
+        
         # Verify current password
-        if not verify_password(password_data.current_password, current_user.password_hash):
+        if not verify_password(password_data.current_password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Current password is incorrect"
             )
         
         # Check if new password is different from current password
-        if verify_password(password_data.new_password, current_user.password_hash):
+        if verify_password(password_data.new_password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="New password must be different from current password"
@@ -503,26 +557,34 @@ async def change_password(
         # Hash new password
         new_password_hash = get_password_hash(password_data.new_password)
         
-        # Update password
-        current_user.password_hash = new_password_hash
-        current_user.updated_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(current_user)
+        # Update password and revoke every token issued with the old one
+        user.password_hash = new_password_hash
+        user.updated_at = datetime.now(timezone.utc)
+        user.token_version = (user.token_version or 0) + 1
         
-        # Send email notification
+        # Queue the email notification in the same transaction as the change
         user_name = f"{current_user.first_name} {current_user.last_name}".strip() or current_user.username
-        email_sent = send_password_change_email(
+        queue_email(
+            db, "password_change", current_user.email,
             email=current_user.email,
-            name=user_name
+            name=user_name,
+            changed_at=user.updated_at.isoformat()
         )
+        db.commit()
+        evict_principal(user.id)
         
-        if not email_sent:
-            # Log warning but don't fail the request
-            print(f"Warning: Failed to send password change email to {current_user.email}")
+        # Keep the caller signed in on this device
+        access_token = create_access_token(
+            data={"sub": str(user.id), "email": user.email},
+            user=user
+        )
         
         return {
             "success": True,
-            "message": "Password changed successfully. A confirmation email has been sent."
+            "message": "Password changed successfully. A confirmation email has been sent.",
+            "access_token": access_token,
+            "token_type": "bearer",
+            "expires_in": 30 * 60  # 30 minutes
         }
         
     except HTTPException:
@@ -535,9 +597,9 @@ async def change_password(
         )
 
 @router.post("/delete-account")
-async def delete_account(
+def delete_account(
     delete_data: DeleteAccountRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -545,15 +607,17 @@ async def delete_account(
     Requires password verification, sets 14-day grace period, and sends email notification.
     """
     try:
+        user = db.query(User).filter(User.id == current_user.id).first()
+        
         # Verify password
-        if not verify_password(delete_data.password, current_user.password_hash):
+        if not verify_password(delete_data.password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect password"
             )
         
         # Check if already pending deletion
-        if current_user.status == 'pending_deletion':
+        if user.status == 'pending_deletion':
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Account deletion is already scheduled"
@@ -565,12 +629,14 @@ async def delete_account(
         hard_delete_at = now + timedelta(days=14)
         
         # Update user status and dates
-        current_user.status = 'pending_deletion'
-        current_user.deletion_requested_at = deletion_requested_at
-        current_user.hard_delete_at = hard_delete_at
-        current_user.updated_at = now
+        user.status = 'pending_deletion'
+        user.deletion_requested_at = deletion_requested_at
+        user.hard_delete_at = hard_delete_at
+        user.updated_at = now
+        # Tokens claim the old status; pending deletion signs the user out everywhere
+        user.token_version = (user.token_version or 0) + 1
         db.commit()
-        db.refresh(current_user)
+        evict_principal(user.id)
         
         # Generate cancellation token
         cancellation_token = generate_secure_token(32)
@@ -584,19 +650,17 @@ async def delete_account(
             is_used=False
         )
         db.add(cancellation_token_record)
-        db.commit()
         
-        # Send email notification
+        # Queue the email notification with the token it carries
         user_name = f"{current_user.first_name} {current_user.last_name}".strip() or current_user.username
-        email_sent = send_deletion_scheduled_email(
+        queue_email(
+            db, "deletion_scheduled", current_user.email,
             email=current_user.email,
             name=user_name,
-            hard_delete_at=hard_delete_at,
+            hard_delete_at=hard_delete_at.isoformat(),
             cancellation_token=cancellation_token
         )
-        
-        if not email_sent:
-            print(f"Warning: Failed to send deletion scheduled email to {current_user.email}")
+        db.commit()
         
         return {
             "success": True,
@@ -614,8 +678,24 @@ async def delete_account(
             detail=f"Internal server error: {str(e)}"
         )
 
+def find_legacy_cancellation_token(db: Session, token: str) -> Optional[DeletionCancellationToken]:
+    """
+    Match a token issued before cancellation tokens were HMAC-hashed (bcrypt digests).
+    Only unused, unexpired legacy rows are checked; none are created anymore and they
+    all expire with their 14-day grace period.
+    """
+    candidates = db.query(DeletionCancellationToken).filter(
+        DeletionCancellationToken.is_used == False,
+        DeletionCancellationToken.expires_at > datetime.now(timezone.utc),
+        DeletionCancellationToken.token_hash.like("$2%")  # bcrypt digests
+    ).all()
+    for token_record in candidates:
+        if verify_password(token, token_record.token_hash):
+            return token_record
+    return None
+
 @router.post("/cancel-deletion")
-async def cancel_deletion(
+def cancel_deletion(
     cancel_data: CancelDeletionRequest,
     db: Session = Depends(get_db)
 ):
@@ -624,17 +704,15 @@ async def cancel_deletion(
     Public endpoint (no auth required).
     """
     try:
-        # Find token by hashing the provided token and comparing
-        # We need to check all tokens for this user and verify
-        tokens = db.query(DeletionCancellationToken).filter(
-            DeletionCancellationToken.is_used == False
-        ).all()
-        
-        matching_token = None
-        for token_record in tokens:
-            if verify_password(cancel_data.token, token_record.token_hash):
-                matching_token = token_record
-                break
+        # Tokens are stored as keyed digests: one indexed lookup, then a constant-time check
+        matching_token = db.query(DeletionCancellationToken).filter(
+            DeletionCancellationToken.token_hash == hash_token(cancel_data.token)
+        ).first()
+        if matching_token and not verify_token_hash(cancel_data.token, matching_token.token_hash):
+            matching_token = None
+        
+        if not matching_token:
+            matching_token = find_legacy_cancellation_token(db, cancel_data.token)
         
         if not matching_token:
             raise HTTPException(
@@ -681,6 +759,7 @@ async def cancel_deletion(
         matching_token.is_used = True
         
         db.commit()
+        evict_principal(user.id)
         
         return {
             "success": True,
@@ -697,8 +776,8 @@ async def cancel_deletion(
         )
 
 @router.get("/deletion-status", response_model=DeletionStatusResponse)
-async def get_deletion_status(
-    current_user: User = Depends(get_current_user),
+def get_deletion_status(
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
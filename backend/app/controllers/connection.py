@@ -11,15 +11,16 @@ from app.schemas.connection import (
     ConnectionWithUser,
     UserSearchResponse
 )
-from app.controllers.auth import get_current_user
+from app.controllers.auth import get_current_principal
+from app.utils.principal import TokenPrincipal
 from typing import List, Optional
 
 router = APIRouter(prefix="/connections", tags=["connections"])
 
 @router.get("/search", response_model=List[UserSearchResponse])
-async def search_users(
+def search_users(
     query: str = Query(..., min_length=1, description="Search by username, first name, or last name"),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Search for users by username, first name, or last name."""
@@ -73,9 +74,9 @@ async def search_users(
     return result
 
 @router.post("/request", response_model=ConnectionResponse)
-async def send_connection_request(
+def send_connection_request(
     connection_data: ConnectionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Send a connection request to another user."""
@@ -148,10 +149,10 @@ async def send_connection_request(
     )
 
 @router.put("/{connection_id}", response_model=ConnectionResponse)
-async def update_connection(
+def update_connection(
     connection_id: str,
     connection_update: ConnectionUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Accept, reject, or block a connection request."""
@@ -201,9 +202,9 @@ async def update_connection(
     )
 
 @router.get("/", response_model=List[ConnectionWithUser])
-async def get_connections(
+def get_connections(
     status_filter: Optional[ConnectionStatus] = Query(None, description="Filter by connection status"),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get all connections for the current user."""
@@ -270,9 +271,9 @@ async def get_connections(
     return result
 
 @router.delete("/{connection_id}")
-async def delete_connection(
+def delete_connection(
     connection_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a connection."""
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr, Field
+from sqlalchemy.orm import Session
 from typing import Optional
-from app.utils.email import send_contact_email
+from app.database import get_db
+from app.mail.outbox import queue_email
+from app.utils.email import CONTACT_EMAIL
 
 router = APIRouter(prefix="/contact", tags=["contact"])
 
@@ -17,19 +20,13 @@ class ContactResponse(BaseModel):
     message: str
 
 @router.post("/", response_model=ContactResponse)
-async def submit_contact_form(contact_data: ContactForm):
+def submit_contact_form(contact_data: ContactForm, db: Session = Depends(get_db)):
     """
-    Submit a contact form. 
-    This endpoint receives the form data and can be integrated with n8n or email service
-    to send emails to contact@synvoy.com
+    Submit a contact form.
+    The submission is stored in the email outbox and delivered to contact@synvoy.com
+    in the background, so it survives mail provider outages.
     """
     try:
-        # For now, we'll just validate and return success
-        # In production, this would:
-        # 1. Send email via SMTP/SendGrid/etc to contact@synvoy.com
-        # 2. Or trigger an n8n workflow to send the email
-        # 3. Or store in database for processing
-        
         # Validate the data (Pydantic already does this, but we can add custom validation)
         if not contact_data.name.strip():
             raise HTTPException(
@@ -43,28 +40,26 @@ async def submit_contact_form(contact_data: ContactForm):
                 detail="Message cannot be empty"
             )
         
-        # Send email to contact@synvoy.com
-        email_sent = send_contact_email(
+        # Queue the email to contact@synvoy.com
+        queue_email(
+            db, "contact", CONTACT_EMAIL,
             name=contact_data.name,
             email=contact_data.email,
             subject=contact_data.subject,
             message=contact_data.message,
             phone=contact_data.phone
         )
-        
-        if not email_sent:
-            # Log the error but still return success to user
-            # In production, you might want to store failed submissions in database
-            print(f"Warning: Failed to send contact email from {contact_data.email}")
-            # You can choose to raise an error or just log it
-            # For now, we'll return success but log the issue
+        db.commit()
         
         return ContactResponse(
             success=True,
             message="Thank you for contacting us! We'll get back to you soon."
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to submit contact form: {str(e)}"
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, desc, func
 from app.database import get_db
 from app.models.user import User
 from app.models.trip import Trip, TripParticipant
@@ -11,14 +11,24 @@ from app.schemas.expense import (
     ExpenseResponse,
     ExpenseSplitResponse,
     SettlementCreate,
-    SettlementResponse
+    SettlementResponse,
+    MemberBalanceResponse,
+    TripBalancesResponse,
+    SettlementTransferResponse,
+    SettlementPlanResponse
 )
-from app.controllers.auth import get_current_user
+from app.controllers.auth import get_current_principal
+from app.utils.principal import TokenPrincipal
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from uuid import UUID as UUIDType
+from datetime import datetime, timedelta, timezone
+from uuid import UUID as UUIDType, uuid4
 from decimal import Decimal
 from app.utils.money import parse_money_to_cents
+from app.utils.pagination import CURSOR_HEADER, encode_cursor, keyset_filter
+from app.utils.sql import dialect_insert
+from app.utils.balances import trip_balances, evict_trip_balances
+from app.utils.settlement_plan import PLAN_MODES, plan_settlement
+from app.utils.trip_ledger import LedgerEntry, apply_entries, expense_entries
 from sqlalchemy.exc import IntegrityError
 
 def format_cents_to_string(cents: int) -> str:
@@ -31,6 +41,8 @@ def format_cents_to_string(cents: int) -> str:
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
+splits_table = ExpenseSplit.__table__
+
 def get_trip_participant(trip_id: UUIDType, user_id: UUIDType, db: Session) -> Optional[TripParticipant]:
     """Get trip participant record for a user."""
     return db.query(TripParticipant).filter(
@@ -137,11 +149,120 @@ def create_audit_log(
     db.add(audit_log)
     return audit_log
 
+def expenses_with_splits(db: Session):
+    """Expenses with their splits eager-loaded: one query for the splits however many expenses."""
+    return db.query(Expense).options(selectinload(Expense.splits))
+
+def load_user_map(db: Session, expenses: List[Expense]) -> Dict[UUIDType, User]:
+    """Creators, payers and split users of the given expenses, fetched in one query."""
+    user_ids = set()
+    for expense in expenses:
+        user_ids.add(expense.created_by_user_id)
+        user_ids.add(expense.payer_user_id)
+        user_ids.update(split.user_id for split in expense.splits)
+    if not user_ids:
+        return {}
+    return {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()}
+
+def user_summary(user: Optional[User]) -> Optional[Dict[str, Any]]:
+    if not user:
+        return None
+    return {
+        "id": str(user.id),
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name
+    }
+
+def expense_response(expense: Expense, users: Dict[UUIDType, Any], splits=None) -> ExpenseResponse:
+    """
+    Response for an expense. splits defaults to expense.splits; anything with id,
+    user_id and share_cents works, such as the rows write_splits() returns.
+    """
+    return ExpenseResponse(
+        id=str(expense.id),
+        trip_id=str(expense.trip_id),
+        created_by_user_id=str(expense.created_by_user_id),
+        payer_user_id=str(expense.payer_user_id),
+        amount=format_cents_to_string(expense.amount_cents),
+        amount_cents=expense.amount_cents,
+        description=expense.description,
+        type=expense.type,
+        adjusts_expense_id=str(expense.adjusts_expense_id) if expense.adjusts_expense_id else None,
+        status=expense.status,
+        voided_at=expense.voided_at,
+        voided_by_user_id=str(expense.voided_by_user_id) if expense.voided_by_user_id else None,
+        is_locked=expense.is_locked,
+        created_at=expense.created_at,
+        updated_at=expense.updated_at,
+        splits=[
+            ExpenseSplitResponse(
+                id=str(split.id),
+                user_id=str(split.user_id),
+                share=format_cents_to_string(split.share_cents),
+                share_cents=split.share_cents,
+                user=user_summary(users.get(split.user_id))
+            )
+            for split in (expense.splits if splits is None else splits)
+        ],
+        creator=user_summary(users.get(expense.created_by_user_id)),
+        payer=user_summary(users.get(expense.payer_user_id))
+    )
+
+def parse_participant_ids(user_id_strs: List[str]) -> List[UUIDType]:
+    """Participant UUIDs in request order, without duplicates; 400 for a malformed one."""
+    participant_uuids = []
+    for user_id_str in user_id_strs:
+        try:
+            participant_uuids.append(UUIDType(user_id_str))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid participant user ID: {user_id_str}")
+    return list(dict.fromkeys(participant_uuids))
+
+def accepted_participant_users(db: Session, trip_id: UUIDType, user_ids: List[UUIDType]) -> Dict[UUIDType, User]:
+    """The users among user_ids who are accepted participants of the trip, in one query."""
+    if not user_ids:
+        return {}
+    members = db.query(User).join(TripParticipant, TripParticipant.user_id == User.id).filter(
+        TripParticipant.trip_id == trip_id,
+        TripParticipant.status == 'accepted',
+        User.id.in_(set(user_ids))
+    ).all()
+    return {user.id: user for user in members}
+
+def write_splits(db: Session, expense_id: UUIDType, user_ids: List[UUIDType], shares: List[int], replace: bool = False):
+    """
+    Upsert an expense's splits in one INSERT ... ON CONFLICT (expense_id, user_id)
+    statement and, with replace, delete everyone else's in one DELETE. Returns the
+    written (id, user_id, share_cents) rows in user_ids order.
+    """
+    rows = [
+        {"id": uuid4(), "expense_id": expense_id, "user_id": user_id, "share_cents": share_cents}
+        for user_id, share_cents in zip(user_ids, shares)
+    ]
+    stmt = dialect_insert(db, splits_table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["expense_id", "user_id"],
+        set_={"share_cents": stmt.excluded.share_cents}
+    ).returning(splits_table.c.id, splits_table.c.user_id, splits_table.c.share_cents)
+    written = {row.user_id: row for row in db.execute(stmt)}
+    if replace:
+        db.execute(splits_table.delete().where(
+            splits_table.c.expense_id == expense_id,
+            splits_table.c.user_id.notin_(user_ids)
+        ))
+    return [written[user_id] for user_id in user_ids]
+
+def single_expense_response(db: Session, expense_uuid: UUIDType) -> ExpenseResponse:
+    """Reload a just-written expense with its splits and users and build its response."""
+    expense = expenses_with_splits(db).filter(Expense.id == expense_uuid).one()
+    return expense_response(expense, load_user_map(db, [expense]))
+
 @router.post("/trips/{trip_id}/expenses", response_model=ExpenseResponse)
-async def create_expense(
+def create_expense(
     trip_id: str,
     expense_data: ExpenseCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new expense for a trip (equal split only)."""
@@ -186,28 +307,19 @@ async def create_expense(
     # Check currency lock (if this is the first expense, currency is locked)
     # This check is informational - we'll enforce it in trip update endpoint
     
-    # Validate payer is a participant
+    # Validate payer and participants are accepted participants (one query for all of them)
     try:
         payer_uuid = UUIDType(expense_data.payer_user_id)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid payer user ID")
+    participant_uuids = parse_participant_ids(expense_data.participant_user_ids)
+    members = accepted_participant_users(db, trip_uuid, [payer_uuid] + participant_uuids)
     
-    payer_participant = get_trip_participant(trip_uuid, payer_uuid, db)
-    if not payer_participant:
+    if payer_uuid not in members:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payer must be an accepted trip participant")
-    
-    # Validate all participants are accepted participants
-    participant_uuids = []
     for user_id_str in expense_data.participant_user_ids:
-        try:
-            user_id_uuid = UUIDType(user_id_str)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid participant user ID: {user_id_str}")
-        
-        part = get_trip_participant(trip_uuid, user_id_uuid, db)
-        if not part:
+        if UUIDType(user_id_str) not in members:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"User {user_id_str} is not an accepted participant")
-        participant_uuids.append(user_id_uuid)
     
     # Validate payer is in participant list
     if payer_uuid not in participant_uuids:
@@ -254,27 +366,15 @@ async def create_expense(
         is_locked=False
     )
     db.add(expense)
-    db.flush()  # Get expense.id
-    
-    # Create splits (upsert to handle unique constraint)
-    for i, participant_uuid in enumerate(participant_uuids):
-        # Check if split already exists (shouldn't for new expense, but handle gracefully)
-        existing_split = db.query(ExpenseSplit).filter(
-            ExpenseSplit.expense_id == expense.id,
-            ExpenseSplit.user_id == participant_uuid
-        ).first()
-        
-        if existing_split:
-            # Update existing split
-            existing_split.share_cents = share_cents_list[i]
-        else:
-            # Create new split
-            split = ExpenseSplit(
-                expense_id=expense.id,
-                user_id=participant_uuid,
-                share_cents=share_cents_list[i]
-            )
-            db.add(split)
+    db.flush()  # Get expense.id (and created_at, returned by the INSERT)
+    
+    # Create splits in one statement
+    splits = write_splits(db, expense.id, participant_uuids, share_cents_list)
+    
+    # Add to the trip's balance ledger
+    apply_entries(db, trip_uuid, added=[
+        LedgerEntry(payer_uuid, amount_cents, tuple(zip(participant_uuids, share_cents_list)))
+    ])
     
     # Create audit log
     create_audit_log(
@@ -290,68 +390,20 @@ async def create_expense(
         }
     )
     
-    db.commit()
-    db.refresh(expense)
-    
-    # Load relationships
-    expense.splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-    
-    # Build response
-    splits_response = []
-    for split in expense.splits:
-        split_user = db.query(User).filter(User.id == split.user_id).first()
-        splits_response.append(ExpenseSplitResponse(
-            id=str(split.id),
-            user_id=str(split.user_id),
-            share=format_cents_to_string(split.share_cents),
-            share_cents=split.share_cents,
-            user={
-                "id": str(split_user.id),
-                "username": split_user.username,
-                "first_name": split_user.first_name,
-                "last_name": split_user.last_name
-            } if split_user else None
-        ))
+    # Build the response before committing: everything it needs is in memory
+    members.setdefault(user_uuid, current_user)
+    response = expense_response(expense, members, splits)
     
-    creator = db.query(User).filter(User.id == expense.created_by_user_id).first()
-    payer = db.query(User).filter(User.id == expense.payer_user_id).first()
+    db.commit()
+    evict_trip_balances(trip_uuid)
     
-    return ExpenseResponse(
-        id=str(expense.id),
-        trip_id=str(expense.trip_id),
-        created_by_user_id=str(expense.created_by_user_id),
-        payer_user_id=str(expense.payer_user_id),
-        amount=format_cents_to_string(expense.amount_cents),
-        amount_cents=expense.amount_cents,
-        description=expense.description,
-        type=expense.type,
-        adjusts_expense_id=str(expense.adjusts_expense_id) if expense.adjusts_expense_id else None,
-        status=expense.status,
-        voided_at=expense.voided_at,
-        voided_by_user_id=str(expense.voided_by_user_id) if expense.voided_by_user_id else None,
-        is_locked=expense.is_locked,
-        created_at=expense.created_at,
-        updated_at=expense.updated_at,
-        splits=splits_response,
-        creator={
-            "id": str(creator.id),
-            "username": creator.username,
-            "first_name": creator.first_name,
-            "last_name": creator.last_name
-        } if creator else None,
-        payer={
-            "id": str(payer.id),
-            "username": payer.username,
-            "first_name": payer.first_name,
-            "last_name": payer.last_name
-        } if payer else None
-    )
+    return response
 
 @router.patch("/{expense_id}", response_model=ExpenseResponse)
-async def update_expense(
+def update_expense(
     expense_id: str,
     expense_update: ExpenseUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update an expense (only creator or trip owner, if not locked)."""
@@ -360,8 +412,8 @@ async def update_expense(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expense ID")
     
-    # Get expense
-    expense = db.query(Expense).filter(Expense.id == expense_uuid).first()
+    # Get expense (row-locked so concurrent edits can't apply ledger deltas twice)
+    expense = db.query(Expense).filter(Expense.id == expense_uuid).with_for_update().first()
     if not expense:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Expense not found")
     
@@ -379,6 +431,12 @@ async def update_expense(
     # Get old splits for audit log (before any updates)
     old_splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
     old_participant_ids = [str(split.user_id) for split in old_splits]
+    # Plain values: the split rows are rewritten below
+    old_entry = LedgerEntry(
+        expense.payer_user_id,
+        expense.amount_cents,
+        tuple((split.user_id, split.share_cents) for split in old_splits)
+    )
     
     # Store old values for audit log
     old_values = {
@@ -400,32 +458,26 @@ async def update_expense(
         expense.description = expense_update.description
     if expense_update.payer_user_id is not None:
         try:
-            new_payer_uuid = UUIDType(expense_update.payer_user_id)
+            expense.payer_user_id = UUIDType(expense_update.payer_user_id)
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid payer user ID")
-        
-        # Validate payer is a participant
-        payer_participant = get_trip_participant(expense.trip_id, new_payer_uuid, db)
-        if not payer_participant:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payer must be an accepted trip participant")
-        
-        expense.payer_user_id = new_payer_uuid
     
-    # If participants changed, recalculate splits
+    # Validate a new payer and participants (one query for all of them)
     if expense_update.participant_user_ids is not None:
-        # Validate all participants
-        participant_uuids = []
-        for user_id_str in expense_update.participant_user_ids:
-            try:
-                user_id_uuid = UUIDType(user_id_str)
-            except ValueError:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid participant user ID: {user_id_str}")
-            
-            part = get_trip_participant(expense.trip_id, user_id_uuid, db)
-            if not part:
+        participant_uuids = parse_participant_ids(expense_update.participant_user_ids)
+    else:
+        participant_uuids = [split.user_id for split in old_splits]
+    if expense_update.payer_user_id is not None or expense_update.participant_user_ids is not None:
+        members = accepted_participant_users(db, expense.trip_id, [expense.payer_user_id] + participant_uuids)
+        if expense_update.payer_user_id is not None and expense.payer_user_id not in members:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payer must be an accepted trip participant")
+        for user_id_str in expense_update.participant_user_ids or []:
+            if UUIDType(user_id_str) not in members:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"User {user_id_str} is not an accepted participant")
-            participant_uuids.append(user_id_uuid)
-        
+    
+    # Recalculate splits whenever the amount, payer or participants change
+    if expense.amount_cents != old_entry.amount_cents or expense.payer_user_id != old_entry.payer_user_id \
+            or expense_update.participant_user_ids is not None:
         # Validate payer is in participant list
         if expense.payer_user_id not in participant_uuids:
             raise HTTPException(
@@ -440,34 +492,24 @@ async def update_expense(
         num_participants = len(participant_uuids)
         share_cents_list = calculate_equal_split(expense.amount_cents, num_participants, payer_index)
         
-        # Get existing splits to update/delete
-        existing_splits = db.query(ExpenseSplit).filter(
-            ExpenseSplit.expense_id == expense.id
-        ).all()
-        existing_split_map = {str(split.user_id): split for split in existing_splits}
-        
-        # Update or create splits (handle unique constraint)
-        for i, participant_uuid in enumerate(participant_uuids):
-            participant_uuid_str = str(participant_uuid)
-            if participant_uuid_str in existing_split_map:
-                # Update existing split
-                existing_split_map[participant_uuid_str].share_cents = share_cents_list[i]
-            else:
-                # Create new split
-                split = ExpenseSplit(
-                    expense_id=expense.id,
-                    user_id=participant_uuid,
-                    share_cents=share_cents_list[i]
-                )
-                db.add(split)
-        
-        # Delete splits for participants no longer in the list
-        participant_uuid_set = {str(u) for u in participant_uuids}
-        for user_id_str, split in existing_split_map.items():
-            if user_id_str not in participant_uuid_set:
-                db.delete(split)
-    
-    expense.updated_at = datetime.utcnow()
+        # Upsert the new splits and delete the dropped participants' in two statements
+        splits = write_splits(db, expense.id, participant_uuids, share_cents_list, replace=True)
+    else:
+        splits = old_splits
+    
+    expense.updated_at = datetime.now(timezone.utc)
+    
+    # Swap the old entry for the new one in the trip's balance ledger
+    apply_entries(
+        db,
+        expense.trip_id,
+        added=[LedgerEntry(
+            expense.payer_user_id,
+            expense.amount_cents,
+            tuple((split.user_id, split.share_cents) for split in splits)
+        )],
+        removed=[old_entry]
+    )
     
     # Create audit log
     new_values = {
@@ -488,67 +530,21 @@ async def update_expense(
         reason=expense_update.reason
     )
     
-    db.commit()
-    db.refresh(expense)
-    
-    # Load relationships
-    expense.splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-    
-    # Build response (same as create)
-    splits_response = []
-    for split in expense.splits:
-        split_user = db.query(User).filter(User.id == split.user_id).first()
-        splits_response.append(ExpenseSplitResponse(
-            id=str(split.id),
-            user_id=str(split.user_id),
-            share=format_cents_to_string(split.share_cents),
-            share_cents=split.share_cents,
-            user={
-                "id": str(split_user.id),
-                "username": split_user.username,
-                "first_name": split_user.first_name,
-                "last_name": split_user.last_name
-            } if split_user else None
-        ))
+    # Build the response before committing: only the users still need a query
+    user_ids = {expense.created_by_user_id, expense.payer_user_id} | {split.user_id for split in splits}
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()}
+    response = expense_response(expense, users, splits)
+    trip_uuid = expense.trip_id
     
-    creator = db.query(User).filter(User.id == expense.created_by_user_id).first()
-    payer = db.query(User).filter(User.id == expense.payer_user_id).first()
+    db.commit()
+    evict_trip_balances(trip_uuid)
     
-    return ExpenseResponse(
-        id=str(expense.id),
-        trip_id=str(expense.trip_id),
-        created_by_user_id=str(expense.created_by_user_id),
-        payer_user_id=str(expense.payer_user_id),
-        amount=format_cents_to_string(expense.amount_cents),
-        amount_cents=expense.amount_cents,
-        description=expense.description,
-        type=expense.type,
-        adjusts_expense_id=str(expense.adjusts_expense_id) if expense.adjusts_expense_id else None,
-        status=expense.status,
-        voided_at=expense.voided_at,
-        voided_by_user_id=str(expense.voided_by_user_id) if expense.voided_by_user_id else None,
-        is_locked=expense.is_locked,
-        created_at=expense.created_at,
-        updated_at=expense.updated_at,
-        splits=splits_response,
-        creator={
-            "id": str(creator.id),
-            "username": creator.username,
-            "first_name": creator.first_name,
-            "last_name": creator.last_name
-        } if creator else None,
-        payer={
-            "id": str(payer.id),
-            "username": payer.username,
-            "first_name": payer.first_name,
-            "last_name": payer.last_name
-        } if payer else None
-    )
+    return response
 
 @router.post("/{expense_id}/void", response_model=ExpenseResponse)
-async def void_expense(
+def void_expense(
     expense_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Void an expense (creator within 15 min, or trip owner anytime, if not locked)."""
@@ -557,8 +553,8 @@ async def void_expense(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expense ID")
     
-    # Get expense
-    expense = db.query(Expense).filter(Expense.id == expense_uuid).first()
+    # Get expense (row-locked so concurrent edits can't apply ledger deltas twice)
+    expense = db.query(Expense).filter(Expense.id == expense_uuid).with_for_update().first()
     if not expense:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Expense not found")
     
@@ -578,6 +574,9 @@ async def void_expense(
         'status': expense.status
     }
     
+    # Take it out of the trip's balance ledger
+    apply_entries(db, expense.trip_id, removed=expense_entries(db, [expense]))
+    
     # Void the expense
     expense.status = 'VOID'
     expense.voided_at = datetime.utcnow()
@@ -594,75 +593,50 @@ async def void_expense(
         new_values={'status': 'VOID'}
     )
     
+    trip_uuid = expense.trip_id
     db.commit()
-    db.refresh(expense)
-    
-    # Build response (same as create)
-    expense.splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-    
-    splits_response = []
-    for split in expense.splits:
-        split_user = db.query(User).filter(User.id == split.user_id).first()
-        splits_response.append(ExpenseSplitResponse(
-            id=str(split.id),
-            user_id=str(split.user_id),
-            share=format_cents_to_string(split.share_cents),
-            share_cents=split.share_cents,
-            user={
-                "id": str(split_user.id),
-                "username": split_user.username,
-                "first_name": split_user.first_name,
-                "last_name": split_user.last_name
-            } if split_user else None
-        ))
-    
-    creator = db.query(User).filter(User.id == expense.created_by_user_id).first()
-    payer = db.query(User).filter(User.id == expense.payer_user_id).first()
+    evict_trip_balances(trip_uuid)
     
-    return ExpenseResponse(
-        id=str(expense.id),
-        trip_id=str(expense.trip_id),
-        created_by_user_id=str(expense.created_by_user_id),
-        payer_user_id=str(expense.payer_user_id),
-        amount=format_cents_to_string(expense.amount_cents),
-        amount_cents=expense.amount_cents,
-        description=expense.description,
-        type=expense.type,
-        adjusts_expense_id=str(expense.adjusts_expense_id) if expense.adjusts_expense_id else None,
-        status=expense.status,
-        voided_at=expense.voided_at,
-        voided_by_user_id=str(expense.voided_by_user_id) if expense.voided_by_user_id else None,
-        is_locked=expense.is_locked,
-        created_at=expense.created_at,
-        updated_at=expense.updated_at,
-        splits=splits_response,
-        creator={
-            "id": str(creator.id),
-            "username": creator.username,
-            "first_name": creator.first_name,
-            "last_name": creator.last_name
-        } if creator else None,
-        payer={
-            "id": str(payer.id),
-            "username": payer.username,
-            "first_name": payer.first_name,
-            "last_name": payer.last_name
-        } if payer else None
-    )
+    return single_expense_response(db, expense_uuid)
 
 @router.get("/trips/{trip_id}/expenses", response_model=List[ExpenseResponse])
-async def get_trip_expenses(
+def get_trip_expenses(
     trip_id: str,
+    response: Response,
     include_void: bool = Query(default=False, description="Include voided expenses"),
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=100),
+    before: Optional[str] = Query(None, description="Cursor: return expenses created before this one"),
+    start_date: Optional[datetime] = Query(None, description="Only expenses created on or after this time"),
+    end_date: Optional[datetime] = Query(None, description="Only expenses created on or before this time"),
+    payer_user_id: Optional[str] = Query(None, description="Only expenses paid by this user"),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get all expenses for a trip (default: active only)."""
+    """
+    Get a trip's expenses, newest first (default: active only).
+    
+    Pages are `limit` expenses long; when there may be more, the X-Next-Cursor
+    response header carries the `before` value for the next page. A page costs
+    the same handful of queries however many expenses and splits it holds.
+    """
     try:
         trip_uuid = UUIDType(trip_id)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid trip ID")
     
+    payer_uuid = None
+    if payer_user_id is not None:
+        try:
+            payer_uuid = UUIDType(payer_user_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid payer user ID")
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must be on or before end_date")
+    try:
+        cursor_filter = keyset_filter(Expense.created_at, Expense.id, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     # Get trip
     trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
     if not trip:
@@ -678,76 +652,91 @@ async def get_trip_expenses(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You must be a trip participant to view expenses")
     
     # Query expenses
-    query = db.query(Expense).filter(Expense.trip_id == trip_uuid)
+    query = expenses_with_splits(db).filter(Expense.trip_id == trip_uuid)
     if not include_void:
         query = query.filter(Expense.status == 'ACTIVE')
+    if payer_uuid is not None:
+        query = query.filter(Expense.payer_user_id == payer_uuid)
+    if start_date is not None:
+        query = query.filter(Expense.created_at >= start_date)
+    if end_date is not None:
+        query = query.filter(Expense.created_at <= end_date)
+    if cursor_filter is not None:
+        query = query.filter(cursor_filter)
+    
+    expenses = query.order_by(desc(Expense.created_at), desc(Expense.id)).limit(limit).all()
+    users = load_user_map(db, expenses)
+    
+    if len(expenses) == limit:
+        response.headers[CURSOR_HEADER] = encode_cursor(expenses[-1].created_at, expenses[-1].id)
+    return [expense_response(expense, users) for expense in expenses]
+
+@router.get("/trips/{trip_id}/balances", response_model=TripBalancesResponse)
+def get_trip_balances(
+    trip_id: str,
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Net balance of every member over the trip's outstanding expenses (ACTIVE and
+    not in a PAID settlement). Computed in one grouped query and cached per trip
+    until the next expense or settlement write.
+    """
+    try:
+        trip_uuid = UUIDType(trip_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid trip ID")
     
-    expenses = query.order_by(Expense.created_at.desc()).all()
+    # Get trip
+    trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
     
-    # Build response
-    result = []
-    for expense in expenses:
-        expense.splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-        
-        splits_response = []
-        for split in expense.splits:
-            split_user = db.query(User).filter(User.id == split.user_id).first()
-            splits_response.append(ExpenseSplitResponse(
-                id=str(split.id),
-                user_id=str(split.user_id),
-                share=format_cents_to_string(split.share_cents),
-                share_cents=split.share_cents,
-                user={
-                    "id": str(split_user.id),
-                    "username": split_user.username,
-                    "first_name": split_user.first_name,
-                    "last_name": split_user.last_name
-                } if split_user else None
-            ))
-        
-        creator = db.query(User).filter(User.id == expense.created_by_user_id).first()
-        payer = db.query(User).filter(User.id == expense.payer_user_id).first()
-        
-        result.append(ExpenseResponse(
-            id=str(expense.id),
-            trip_id=str(expense.trip_id),
-            created_by_user_id=str(expense.created_by_user_id),
-            payer_user_id=str(expense.payer_user_id),
-            amount=format_cents_to_string(expense.amount_cents),
-            amount_cents=expense.amount_cents,
-            description=expense.description,
-            type=expense.type,
-            adjusts_expense_id=str(expense.adjusts_expense_id) if expense.adjusts_expense_id else None,
-            status=expense.status,
-            voided_at=expense.voided_at,
-            voided_by_user_id=str(expense.voided_by_user_id) if expense.voided_by_user_id else None,
-            is_locked=expense.is_locked,
-            created_at=expense.created_at,
-            updated_at=expense.updated_at,
-            splits=splits_response,
-            creator={
-                "id": str(creator.id),
-                "username": creator.username,
-                "first_name": creator.first_name,
-                "last_name": creator.last_name
-            } if creator else None,
-            payer={
-                "id": str(payer.id),
-                "username": payer.username,
-                "first_name": payer.first_name,
-                "last_name": payer.last_name
-            } if payer else None
+    # Check if user is a participant
+    user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
+    participant = db.query(TripParticipant).filter(
+        TripParticipant.trip_id == trip_uuid,
+        TripParticipant.user_id == user_uuid
+    ).first()
+    if not participant:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You must be a trip participant to view balances")
+    
+    balances = {balance.user_id: balance for balance in trip_balances(db, trip_uuid)}
+    
+    # Accepted members are listed even when square; people who left still show while they have expenses
+    member_ids = [user_id for (user_id,) in db.query(TripParticipant.user_id).filter(
+        TripParticipant.trip_id == trip_uuid,
+        TripParticipant.status == 'accepted'
+    ).all()]
+    user_ids = set(member_ids) | set(balances)
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    
+    members = []
+    for user_id in user_ids:
+        balance = balances.get(user_id)
+        paid_cents = balance.paid_cents if balance else 0
+        share_cents = balance.share_cents if balance else 0
+        members.append(MemberBalanceResponse(
+            user_id=str(user_id),
+            paid=format_cents_to_string(paid_cents),
+            paid_cents=paid_cents,
+            share=format_cents_to_string(share_cents),
+            share_cents=share_cents,
+            net=format_cents_to_string(paid_cents - share_cents),
+            net_cents=paid_cents - share_cents,
+            user=user_summary(users.get(user_id))
         ))
+    members.sort(key=lambda member: (-member.net_cents, member.user["username"] if member.user else member.user_id))
     
-    return result
+    return TripBalancesResponse(trip_id=str(trip_uuid), members=members)
 
 # Settlement endpoints
 settlement_router = APIRouter(prefix="/settlements", tags=["settlements"])
 
 @settlement_router.post("/", response_model=SettlementResponse)
-async def create_settlement(
+def create_settlement(
     settlement_data: SettlementCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new settlement."""
@@ -821,9 +810,9 @@ async def create_settlement(
     )
 
 @settlement_router.get("/trips/{trip_id}/settlements", response_model=List[SettlementResponse])
-async def get_trip_settlements(
+def get_trip_settlements(
     trip_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get all settlements for a trip."""
@@ -869,10 +858,68 @@ async def get_trip_settlements(
     
     return result
 
+@settlement_router.post("/trips/{trip_id}/plan", response_model=SettlementPlanResponse)
+def plan_trip_settlement(
+    trip_id: str,
+    mode: str = Query("auto", description="auto, greedy or exact (fewest transfers; small groups only)"),
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Payments that settle the trip's outstanding balances (see GET
+    /expenses/trips/{trip_id}/balances). Nothing is saved: the plan only says
+    who should pay whom.
+    """
+    try:
+        trip_uuid = UUIDType(trip_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid trip ID")
+    if mode not in PLAN_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"mode must be one of: {', '.join(PLAN_MODES)}"
+        )
+    
+    # Get trip
+    trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    
+    # Check if user is a participant
+    user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
+    participant = get_trip_participant(trip_uuid, user_uuid, db)
+    if not participant:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You must be a trip participant to plan settlements")
+    
+    balances = {balance.user_id: balance.net_cents for balance in trip_balances(db, trip_uuid)}
+    try:
+        mode, transfers = plan_settlement(balances, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_ids = {transfer.from_user_id for transfer in transfers} | {transfer.to_user_id for transfer in transfers}
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    
+    return SettlementPlanResponse(
+        trip_id=str(trip_uuid),
+        mode=mode,
+        transfers=[
+            SettlementTransferResponse(
+                from_user_id=str(transfer.from_user_id),
+                to_user_id=str(transfer.to_user_id),
+                amount=format_cents_to_string(transfer.amount_cents),
+                amount_cents=transfer.amount_cents,
+                from_user=user_summary(users.get(transfer.from_user_id)),
+                to_user=user_summary(users.get(transfer.to_user_id))
+            )
+            for transfer in transfers
+        ]
+    )
+
 @settlement_router.post("/{settlement_id}/mark-paid", response_model=SettlementResponse)
-async def mark_settlement_paid(
+def mark_settlement_paid(
     settlement_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Mark a settlement as paid (locks all linked expenses)."""
@@ -881,8 +928,8 @@ async def mark_settlement_paid(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid settlement ID")
     
-    # Get settlement
-    settlement = db.query(Settlement).filter(Settlement.id == settlement_uuid).first()
+    # Get settlement (row-locked so a double submit can't settle it twice)
+    settlement = db.query(Settlement).filter(Settlement.id == settlement_uuid).with_for_update().first()
     if not settlement:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Settlement not found")
     
@@ -914,7 +961,7 @@ async def mark_settlement_paid(
         
         # Validate all expenses exist and are not already locked in incompatible way
         for se in settlement_expenses:
-            expense = db.query(Expense).filter(Expense.id == se.expense_id).first()
+            expense = db.query(Expense).filter(Expense.id == se.expense_id).with_for_update().first()
             if not expense:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Expense {se.expense_id} not found")
             
@@ -936,11 +983,14 @@ async def mark_settlement_paid(
             expense_ids.append(str(expense.id))
         
         # All validations passed - perform atomic update
-        # 1. Mark settlement as paid
+        # 1. Settled expenses leave the trip's balance ledger
+        apply_entries(db, settlement.trip_id, removed=expense_entries(db, expenses_to_lock))
+        
+        # 2. Mark settlement as paid
         settlement.status = 'PAID'
         settlement.paid_at = datetime.utcnow()
         
-        # 2. Lock all expenses
+        # 3. Lock all expenses
         for expense in expenses_to_lock:
             expense.is_locked = True
         
@@ -960,6 +1010,8 @@ async def mark_settlement_paid(
             detail=f"Failed to mark settlement as paid: {str(e)}"
         )
     
+    evict_trip_balances(settlement.trip_id)
+    
     return SettlementResponse(
         id=str(settlement.id),
         trip_id=str(settlement.trip_id),
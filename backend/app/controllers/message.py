@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, or_, desc, func, tuple_, update
 from app.database import get_db
 from app.models.user import User
 from app.models.message import Message
@@ -13,20 +14,153 @@ from app.schemas.message import (
     MessageWithUser,
     ChatConversation,
     ClearChatRequest,
+    ReadUpToRequest,
     DeleteMessageRequest,
     LeaveGroupRequest
 )
-from app.controllers.auth import get_current_user
+from app.controllers.auth import get_current_principal
+from app.utils.principal import TokenPrincipal
+from app.utils.pagination import CURSOR_HEADER, encode_cursor, keyset_filter
+from app.utils.inbox import build_inbox, get_trip_read_at, get_trip_read_cursors
+from app.utils.conversation_summary import (
+    record_message,
+    record_read,
+    clear_summary,
+    remove_summary,
+    refresh_summary,
+    refresh_message_summaries
+)
+from app.utils.realtime import (
+    publish_message_created,
+    publish_message_deleted,
+    publish_messages_read,
+    publish_trip_member_left
+)
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timezone, timedelta
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
+def direct_messages_query(db: Session, user_id, other_user_id):
+    """
+    All 1-on-1 messages between two users, as a UNION ALL of the two directions.
+    An OR across the pair can't use idx_messages_pair_created for ordering; two
+    range scans on it can be merged in (created_at, id) order instead of sorted.
+    """
+    sent = db.query(Message).filter(
+        Message.sender_id == user_id,
+        Message.receiver_id == other_user_id,
+        Message.trip_id.is_(None)
+    )
+    received = db.query(Message).filter(
+        Message.sender_id == other_user_id,
+        Message.receiver_id == user_id,
+        Message.trip_id.is_(None)
+    )
+    return sent.union_all(received)
+
+def advance_trip_read_cursor(db: Session, user_id, trip_id, high_water_mark) -> int:
+    """
+    Move user_id's read cursor in a trip chat forward to high_water_mark (created_at, id).
+    Writes one conversation_participants row; returns how many messages from others
+    became read.
+    """
+    participant_filter = and_(
+        ConversationParticipant.user_id == user_id,
+        ConversationParticipant.trip_id == trip_id,
+        ConversationParticipant.other_user_id.is_(None)
+    )
+    mark = (high_water_mark.created_at, high_water_mark.id)
+    cursor = db.query(
+        ConversationParticipant.last_read_at, ConversationParticipant.last_read_message_id
+    ).filter(participant_filter).first()
+    if cursor and cursor.last_read_at is not None and cursor.last_read_message_id is not None:
+        # Compare (created_at, id) like keyset_filter, so messages sharing the cursor's timestamp count
+        if mark <= (cursor.last_read_at, cursor.last_read_message_id):
+            return 0
+        unread = tuple_(Message.created_at, Message.id) > tuple_(cursor.last_read_at, cursor.last_read_message_id)
+    else:
+        # No message-level cursor: read up to when they joined (or nothing)
+        read_at = get_trip_read_at(db, user_id, trip_id)
+        if read_at is not None and high_water_mark.created_at <= read_at:
+            return 0
+        unread = Message.created_at > read_at if read_at is not None else None
+    
+    newly_read = db.query(func.count(Message.id)).filter(
+        Message.trip_id == trip_id,
+        Message.sender_id != user_id,
+        Message.deleted_for_everyone_at.is_(None),
+        tuple_(Message.created_at, Message.id) <= tuple_(*mark)
+    )
+    if unread is not None:
+        newly_read = newly_read.filter(unread)
+    newly_read = newly_read.scalar()
+    
+    # Only ever forward, even if a concurrent request already moved it further
+    moved = db.query(ConversationParticipant).filter(
+        participant_filter,
+        or_(
+            ConversationParticipant.last_read_at.is_(None),
+            and_(
+                ConversationParticipant.last_read_message_id.is_(None),
+                ConversationParticipant.last_read_at < high_water_mark.created_at
+            ),
+            tuple_(ConversationParticipant.last_read_at, ConversationParticipant.last_read_message_id) < tuple_(*mark)
+        )
+    ).update({
+        ConversationParticipant.last_read_at: high_water_mark.created_at,
+        ConversationParticipant.last_read_message_id: high_water_mark.id
+    }, synchronize_session=False)
+    if not moved and not cursor:
+        db.add(ConversationParticipant(
+            user_id=user_id,
+            other_user_id=None,
+            trip_id=trip_id,
+            last_read_at=high_water_mark.created_at,
+            last_read_message_id=high_water_mark.id
+        ))
+        db.flush()
+    return newly_read
+
+def fetch_message_page(message_query, response: Response, limit: int, offset: int,
+                       before: Optional[str], after: Optional[str]) -> List[Message]:
+    """
+    One page of a chat history, newest first, using (created_at, id) keyset cursors.
+    Sets X-Next-Cursor when there may be more messages in the same direction.
+    """
+    try:
+        cursor_filter = keyset_filter(Message.created_at, Message.id, before=before, after=after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if cursor_filter is not None:
+        message_query = message_query.filter(cursor_filter)
+    
+    if after:
+        # Catching up: oldest unseen messages first, then flip to newest first
+        messages = message_query.order_by(Message.created_at, Message.id).limit(limit).all()
+        messages.reverse()
+    else:
+        message_query = message_query.order_by(desc(Message.created_at), desc(Message.id)).limit(limit)
+        if offset and not before:
+            # Deprecated: deep offsets scan and discard every skipped row
+            message_query = message_query.offset(offset)
+        messages = message_query.all()
+    
+    if len(messages) == limit:
+        edge = messages[0] if after else messages[-1]
+        response.headers[CURSOR_HEADER] = encode_cursor(edge.created_at, edge.id)
+    return messages
+
+
 @router.post("/", response_model=MessageResponse)
-async def send_message(
+def send_message(
     message_data: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Send a message to another user or to a trip group chat."""
@@ -85,10 +219,12 @@ async def send_message(
         )
         
         db.add(new_message)
+        db.flush()
+        record_message(db, new_message)
         db.commit()
         db.refresh(new_message)
         
-        return MessageResponse(
+        response = MessageResponse(
             id=str(new_message.id),
             sender_id=str(new_message.sender_id),
             receiver_id=None,
@@ -100,6 +236,8 @@ async def send_message(
             deleted_for_everyone_by=str(new_message.deleted_for_everyone_by) if new_message.deleted_for_everyone_by else None,
             created_at=new_message.created_at
         )
+        publish_message_created(new_message, response)
+        return response
     
     # Handle 1-on-1 chat
     # Convert string receiver_id to UUID for database queries
@@ -159,10 +297,12 @@ async def send_message(
     )
     
     db.add(new_message)
+    db.flush()
+    record_message(db, new_message)
     db.commit()
     db.refresh(new_message)
     
-    return MessageResponse(
+    response = MessageResponse(
         id=str(new_message.id),
         sender_id=str(new_message.sender_id),
         receiver_id=str(new_message.receiver_id),
@@ -174,16 +314,24 @@ async def send_message(
         deleted_for_everyone_by=str(new_message.deleted_for_everyone_by) if new_message.deleted_for_everyone_by else None,
         created_at=new_message.created_at
     )
+    publish_message_created(new_message, response)
+    return response
 
 @router.get("/trip/{trip_id}", response_model=List[MessageWithUser])
-async def get_trip_messages(
+def get_trip_messages(
     trip_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Deprecated, use before"),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get messages for a trip group chat."""
+    """
+    Get messages for a trip group chat, oldest first within the page.
+    Page backwards with ?before=<X-Next-Cursor>; catch up with ?after=<cursor>.
+    """
     try:
         trip_uuid = UUID(trip_id) if isinstance(trip_id, str) else trip_id
     except ValueError:
@@ -239,16 +387,7 @@ async def get_trip_messages(
     if cleared_at:
         message_query = message_query.filter(Message.created_at > cleared_at)
     
-    messages = message_query.order_by(desc(Message.created_at)).limit(limit).offset(offset).all()
-    
-    # Mark messages as delivered and read if they were sent to current user
-    # Note: Trip messages are already marked as delivered when created
-    for message in messages:
-        if message.sender_id != current_user.id:
-            # Mark as read when participant views the conversation
-            if not message.is_read:
-                message.is_read = True
-    db.commit()
+    messages = fetch_message_page(message_query, response, limit, offset, before, after)
     
     # Get all participants for user info
     participants = db.query(TripParticipant).filter(
@@ -263,6 +402,9 @@ async def get_trip_messages(
     
     user_map = {str(u.id): u for u in participant_users}
     
+    # Group reads are per-member cursors: a message shows as read once another member read past it
+    read_cursors = get_trip_read_cursors(db, trip_uuid)
+    
     result = []
     for msg in reversed(messages):  # Reverse to show oldest first
         sender = user_map.get(str(msg.sender_id))
@@ -273,7 +415,10 @@ async def get_trip_messages(
             trip_id=str(msg.trip_id),
             content=msg.content if not msg.deleted_for_everyone_at else "Message deleted",
             is_delivered=msg.is_delivered,
-            is_read=msg.is_read,
+            is_read=any(
+                read_at >= msg.created_at
+                for reader_id, read_at in read_cursors.items() if reader_id != msg.sender_id
+            ),
             deleted_for_everyone_at=msg.deleted_for_everyone_at,
             deleted_for_everyone_by=str(msg.deleted_for_everyone_by) if msg.deleted_for_everyone_by else None,
             created_at=msg.created_at,
@@ -291,14 +436,20 @@ async def get_trip_messages(
     return result
 
 @router.get("/conversation/{user_id}", response_model=List[MessageWithUser])
-async def get_conversation(
+def get_conversation(
     user_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Deprecated, use before"),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get conversation messages with a specific user."""
+    """
+    Get conversation messages with a specific user, oldest first within the page.
+    Page backwards with ?before=<X-Next-Cursor>; catch up with ?after=<cursor>.
+    """
     # Convert string user_id to UUID for database queries
     try:
         target_user_uuid = UUID(user_id) if isinstance(user_id, str) else user_id
@@ -342,38 +493,27 @@ async def get_conversation(
     
     # Get messages between current user and target user (only 1-on-1, not trip messages)
     # Include deleted messages (they will show "Message deleted" in UI)
-    message_query = db.query(Message).filter(
-        and_(
-            or_(
-                and_(
-                    Message.sender_id == current_user.id,
-                    Message.receiver_id == target_user_uuid
-                ),
-                and_(
-                    Message.sender_id == target_user_uuid,
-                    Message.receiver_id == current_user.id
-                )
-            ),
-            Message.trip_id.is_(None)  # Only 1-on-1 messages
-        )
-    )
+    message_query = direct_messages_query(db, current_user.id, target_user_uuid)
     
     # Filter by cleared_at if user has cleared the chat
     if cleared_at:
         message_query = message_query.filter(Message.created_at > cleared_at)
     
-    messages = message_query.order_by(desc(Message.created_at)).limit(limit).offset(offset).all()
-    
-    # Mark messages as delivered and read if they were sent to current user
-    for message in messages:
-        if message.receiver_id == current_user.id:
-            # Mark as delivered when receiver fetches the conversation
-            if not message.is_delivered:
-                message.is_delivered = True
-            # Mark as read when receiver views the conversation
-            if not message.is_read:
-                message.is_read = True
-    db.commit()
+    messages = fetch_message_page(message_query, response, limit, offset, before, after)
+    
+    # Mark messages as delivered when the receiver fetches the conversation (one UPDATE).
+    # Reads are explicit: POST /messages/read-up-to
+    undelivered_ids = [
+        message.id for message in messages
+        if message.receiver_id == current_user.id and not message.is_delivered
+    ]
+    if undelivered_ids:
+        db.query(Message).filter(Message.id.in_(undelivered_ids)).update(
+            {Message.is_delivered: True}, synchronize_session=False
+        )
+        for message in messages:
+            if message.id in undelivered_ids:
+                set_committed_value(message, "is_delivered", True)
     
     # Get user info
     other_user = db.query(User).filter(User.id == target_user_uuid).first()
@@ -409,190 +549,28 @@ async def get_conversation(
             } if other_user else None
         ))
     
+    if undelivered_ids:
+        db.commit()
+    
     return result
 
 @router.get("/conversations", response_model=List[ChatConversation])
-async def get_conversations(
-    current_user: User = Depends(get_current_user),
+def get_conversations(
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get all conversations for the current user (both 1-on-1 and trip group chats)."""
-    conversations = []
-    
-    # Convert current_user.id to string for comparison (UserConnection uses String columns)
-    user_id_str = str(current_user.id)
-    
-    # Get all accepted connections for 1-on-1 chats
-    connections = db.query(UserConnection).filter(
-        or_(
-            UserConnection.user_id == user_id_str,
-            UserConnection.connected_user_id == user_id_str
-        ),
-        UserConnection.status == ConnectionStatus.ACCEPTED.value
-    ).all()
-    
-    # Convert current_user.id to UUID once for Message queries (Message uses UUID columns)
+    # Constant number of queries regardless of how many connections/trips the user has
     user_uuid = UUID(current_user.id) if isinstance(current_user.id, str) else current_user.id
-    
-    for conn in connections:
-        # Determine the other user - ensure we're comparing strings correctly
-        # UserConnection stores IDs as strings, so convert both to strings for comparison
-        conn_user_id_str = str(conn.user_id).strip() if conn.user_id else None
-        conn_connected_id_str = str(conn.connected_user_id).strip() if conn.connected_user_id else None
-        
-        # Ensure we have valid IDs
-        if not conn_user_id_str or not conn_connected_id_str:
-            continue
-        
-        # Determine which one is the other user (not the current user)
-        if conn_user_id_str == user_id_str:
-            other_user_id_str = conn_connected_id_str
-        elif conn_connected_id_str == user_id_str:
-            other_user_id_str = conn_user_id_str
-        else:
-            # This shouldn't happen, but skip if neither matches
-            continue
-        
-        # Safety check: make sure we're not using the same user (string comparison)
-        if other_user_id_str == user_id_str:
-            continue
-        
-        # Convert to UUID for User query
-        try:
-            other_user_id = UUID(other_user_id_str)
-        except (ValueError, TypeError):
-            continue
-        
-        # Final safety check: ensure other_user_id is different from user_uuid (UUID comparison)
-        if other_user_id == user_uuid:
-            continue
-        
-        other_user = db.query(User).filter(User.id == other_user_id).first()
-        if not other_user:
-            continue
-        
-        # Get last message in conversation (only 1-on-1, excluding deleted messages)
-        last_message = db.query(Message).filter(
-            and_(
-                or_(
-                    and_(
-                        Message.sender_id == user_uuid,
-                        Message.receiver_id == other_user_id
-                    ),
-                    and_(
-                        Message.sender_id == other_user_id,
-                        Message.receiver_id == user_uuid
-                    )
-                ),
-                Message.trip_id.is_(None),  # Only 1-on-1 messages
-                Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
-            )
-        ).order_by(desc(Message.created_at)).first()
-        
-        # Count unread messages (excluding deleted)
-        unread_count = db.query(Message).filter(
-            Message.sender_id == other_user_id,
-            Message.receiver_id == user_uuid,
-            Message.is_read == False,
-            Message.trip_id.is_(None),  # Only 1-on-1 messages
-            Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
-        ).count()
-        
-        # Anonymize deleted users
-        if other_user.status == 'pending_deletion':
-            user_name = "Deleted User"
-            user_avatar = None
-        else:
-            user_name = f"{other_user.first_name} {other_user.last_name}"
-            user_avatar = other_user.avatar_url
-        
-        conversations.append(ChatConversation(
-            user_id=str(other_user.id),
-            trip_id=None,
-            user_name=user_name,
-            trip_title=None,
-            user_avatar=user_avatar,
-            last_message=MessageResponse(
-                id=str(last_message.id),
-                sender_id=str(last_message.sender_id),
-                receiver_id=str(last_message.receiver_id),
-                trip_id=None,
-                content=last_message.content if not last_message.deleted_for_everyone_at else "Message deleted",
-                is_delivered=last_message.is_delivered,
-                is_read=last_message.is_read,
-                deleted_for_everyone_at=last_message.deleted_for_everyone_at,
-                deleted_for_everyone_by=str(last_message.deleted_for_everyone_by) if last_message.deleted_for_everyone_by else None,
-                created_at=last_message.created_at
-            ) if last_message and not last_message.deleted_for_everyone_at else None,
-            unread_count=unread_count
-        ))
-    
-    # Get all trips where user is a participant for group chats
-    # TripParticipant uses UUID columns, so use UUID
-    user_uuid = UUID(current_user.id) if isinstance(current_user.id, str) else current_user.id
-    trip_participants = db.query(TripParticipant).filter(
-        TripParticipant.user_id == user_uuid,
-        TripParticipant.status == "accepted"
-    ).all()
-    
-    for participant in trip_participants:
-        trip = db.query(Trip).filter(Trip.id == participant.trip_id).first()
-        if not trip:
-            continue
-        
-        # Get last message in trip (excluding deleted messages)
-        last_message = db.query(Message).filter(
-            and_(
-                Message.trip_id == trip.id,
-                Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
-            )
-        ).order_by(desc(Message.created_at)).first()
-        
-        # Count unread messages (messages not sent by current user, excluding deleted)
-        unread_count = db.query(Message).filter(
-            Message.trip_id == trip.id,
-            Message.sender_id != user_uuid,
-            Message.is_read == False,
-            Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
-        ).count()
-        
-        conversations.append(ChatConversation(
-            user_id=None,
-            trip_id=str(trip.id),
-            user_name=None,
-            trip_title=trip.title,
-            user_avatar=None,
-            last_message=MessageResponse(
-                id=str(last_message.id),
-                sender_id=str(last_message.sender_id),
-                receiver_id=None,
-                trip_id=str(last_message.trip_id),
-                content=last_message.content if not last_message.deleted_for_everyone_at else "Message deleted",
-                is_delivered=last_message.is_delivered,
-                is_read=last_message.is_read,
-                deleted_for_everyone_at=last_message.deleted_for_everyone_at,
-                deleted_for_everyone_by=str(last_message.deleted_for_everyone_by) if last_message.deleted_for_everyone_by else None,
-                created_at=last_message.created_at
-            ) if last_message and not last_message.deleted_for_everyone_at else None,
-            unread_count=unread_count
-        ))
-    
-    # Sort by last message time (most recent first)
-    # Conversations with messages come first, then those without
-    conversations.sort(
-        key=lambda x: x.last_message.created_at if x.last_message else datetime(1970, 1, 1, tzinfo=timezone.utc),
-        reverse=True
-    )
-    
-    return conversations
+    return build_inbox(db, user_uuid)
 
-@router.put("/{message_id}/read")
-async def mark_message_read(
+@router.put("/{message_id}/read", deprecated=True)
+def mark_message_read(
     message_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Mark a message as read."""
+    """Mark a message as read. Deprecated: one request per message, use POST /messages/read-up-to."""
     message = db.query(Message).filter(
         Message.id == message_id,
         Message.receiver_id == current_user.id
@@ -604,15 +582,113 @@ async def mark_message_read(
             detail="Message not found"
         )
     
-    message.is_read = True
+    newly_read = not message.is_read
+    if newly_read:
+        message.is_read = True
+        record_read(db, message, message.receiver_id)
     db.commit()
+    if newly_read:
+        publish_messages_read(message.receiver_id, [str(message.id)], peer_id=message.sender_id)
     
     return {"message": "Message marked as read"}
 
+@router.post("/read-up-to", status_code=status.HTTP_200_OK)
+def mark_read_up_to(
+    request: ReadUpToRequest,
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark every message of a conversation up to and including message_id as read,
+    in one set-based UPDATE. Pass user_id for a 1-on-1 chat or trip_id for a group chat.
+    """
+    user_uuid = UUID(current_user.id) if isinstance(current_user.id, str) else current_user.id
+    
+    if bool(request.user_id) == bool(request.trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either user_id or trip_id"
+        )
+    
+    try:
+        message_uuid = UUID(request.message_id)
+        other_user_uuid = UUID(request.user_id) if request.user_id else None
+        trip_uuid = UUID(request.trip_id) if request.trip_id else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid ID format"
+        )
+    
+    if trip_uuid:
+        participant = db.query(TripParticipant).filter(
+            TripParticipant.trip_id == trip_uuid,
+            TripParticipant.user_id == user_uuid,
+            TripParticipant.status == "accepted"
+        ).first()
+        if not participant:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You must be a participant of this trip to read messages"
+            )
+        in_conversation = Message.trip_id == trip_uuid
+    else:
+        in_conversation = and_(
+            or_(
+                and_(Message.sender_id == user_uuid, Message.receiver_id == other_user_uuid),
+                and_(Message.sender_id == other_user_uuid, Message.receiver_id == user_uuid)
+            ),
+            Message.trip_id.is_(None)
+        )
+        # Matches idx_messages_unread_direct
+        unread = and_(
+            Message.receiver_id == user_uuid,
+            Message.sender_id == other_user_uuid,
+            Message.trip_id.is_(None)
+        )
+    
+    # The high-water mark must belong to this conversation
+    high_water_mark = db.query(Message.created_at, Message.id).filter(
+        Message.id == message_uuid,
+        in_conversation
+    ).first()
+    if not high_water_mark:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Message not found"
+        )
+    
+    if trip_uuid:
+        # Group chats: one cursor row per reader, messages are not touched
+        read_ids = []
+        read_count = advance_trip_read_cursor(db, user_uuid, trip_uuid, high_water_mark)
+    else:
+        read_ids = db.execute(
+            update(Message).where(
+                unread,
+                Message.is_read == False,
+                Message.deleted_for_everyone_at.is_(None),
+                tuple_(Message.created_at, Message.id) <= tuple_(high_water_mark.created_at, high_water_mark.id)
+            ).values(is_read=True, is_delivered=True).returning(Message.id),
+            execution_options={"synchronize_session": False}
+        ).scalars().all()
+        read_count = len(read_ids)
+    
+    if read_count:
+        refresh_summary(db, user_uuid, peer_id=other_user_uuid, trip_id=trip_uuid)
+    db.commit()
+    if read_count:
+        publish_messages_read(
+            user_uuid, [str(message_id) for message_id in read_ids],
+            peer_id=other_user_uuid, trip_id=trip_uuid, up_to_message_id=high_water_mark.id
+        )
+    
+    return {"message": "Messages marked as read", "read_count": read_count}
+
 @router.post("/clear-chat", status_code=status.HTTP_200_OK)
-async def clear_chat(
+def clear_chat(
     request: ClearChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Clear chat for the current user (does not delete messages, only hides them)."""
@@ -668,6 +744,7 @@ async def clear_chat(
         else:
             conv_participant.cleared_at = datetime.now(timezone.utc)
         
+        clear_summary(db, user_uuid, peer_id=other_user_uuid)
         db.commit()
         return {"message": "Chat cleared successfully"}
     
@@ -712,6 +789,7 @@ async def clear_chat(
         else:
             conv_participant.cleared_at = datetime.now(timezone.utc)
         
+        clear_summary(db, user_uuid, trip_id=trip_uuid)
         db.commit()
         return {"message": "Chat cleared successfully"}
     
@@ -722,9 +800,9 @@ async def clear_chat(
         )
 
 @router.post("/delete-for-everyone", status_code=status.HTTP_200_OK)
-async def delete_message_for_everyone(
+def delete_message_for_everyone(
     request: DeleteMessageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a message for everyone (soft delete/tombstone). Only allowed within 7 days."""
@@ -774,13 +852,16 @@ async def delete_message_for_everyone(
     message.deleted_for_everyone_by = user_uuid
     # Optionally clear content for privacy (but keep it for now for potential recovery)
     
+    db.flush()
+    refresh_message_summaries(db, message)
     db.commit()
+    publish_message_deleted(message)
     return {"message": "Message deleted for everyone"}
 
 @router.post("/leave-group", status_code=status.HTTP_200_OK)
-async def leave_group(
+def leave_group(
     request: LeaveGroupRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Leave a group chat. User can no longer post/read new messages."""
@@ -839,14 +920,16 @@ async def leave_group(
     # Update participant status to declined (or remove, depending on your business logic)
     # For now, we'll keep them as declined so they can't rejoin without a new invitation
     participant.status = "declined"
+    remove_summary(db, user_uuid, trip_uuid)
     
     db.commit()
+    publish_trip_member_left(trip_uuid, user_uuid, "left")
     return {"message": "Left group successfully"}
 
 @router.post("/admin/delete-message", status_code=status.HTTP_200_OK)
-async def admin_delete_message(
+def admin_delete_message(
     request: DeleteMessageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Admin delete a message (for group admins/creators)."""
@@ -910,6 +993,9 @@ async def admin_delete_message(
     message.deleted_for_everyone_at = datetime.now(timezone.utc)
     message.deleted_for_everyone_by = user_uuid
     
+    db.flush()
+    refresh_message_summaries(db, message)
     db.commit()
+    publish_message_deleted(message)
     return {"message": "Message deleted by admin"}
 
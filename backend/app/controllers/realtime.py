@@ -0,0 +1,71 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.models.trip import TripParticipant
+from app.utils.auth import verify_token
+from app.utils.realtime import manager, user_channel, trip_channel
+from typing import List, Optional
+from uuid import UUID
+import asyncio
+
+router = APIRouter(tags=["realtime"])
+
+def _bearer_token(websocket: WebSocket) -> Optional[str]:
+    """Token from ?token=... (browsers can't set headers on WebSockets) or an Authorization header."""
+    token = websocket.query_params.get("token")
+    if token:
+        return token
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return None
+
+async def _load_channels(user_id: str, token_version: int = 0) -> Optional[List[str]]:
+    """
+    The user's channels, or None if the user doesn't exist or the token was revoked
+    (issued before the user's current token_version). Uses a short-lived async session.
+    """
+    try:
+        user_uuid = UUID(user_id)
+    except ValueError:
+        return None
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_uuid)
+        if user is None or (user.token_version or 0) != token_version:
+            return None
+        trip_ids = (await db.execute(
+            select(TripParticipant.trip_id).where(
+                TripParticipant.user_id == user.id,
+                TripParticipant.status == "accepted"
+            )
+        )).scalars().all()
+    return [user_channel(user.id)] + [trip_channel(trip_id) for trip_id in trip_ids]
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """
+    Push channel for chat events (message.created, message.deleted, message.read).
+    Authenticate with the usual access token; send "ping" to get {"type": "pong"}.
+    """
+    token = _bearer_token(websocket)
+    payload = verify_token(token) if token else None
+    user_id = payload.get("sub") if payload else None
+    channels = await _load_channels(user_id, payload.get("ver", 0)) if user_id else None
+    if channels is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscriber = manager.connect(websocket, user_id, channels)
+    writer = asyncio.create_task(subscriber.run())
+    try:
+        while True:
+            if await websocket.receive_text() == "ping":
+                subscriber.offer({"type": "pong"})
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the writer already closed a socket that fell behind
+        pass
+    finally:
+        manager.disconnect(subscriber)
+        writer.cancel()
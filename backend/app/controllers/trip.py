@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy import or_, and_, desc
 from app.database import get_db
-from app.models.user import User
 from app.models.trip import Trip, TripParticipant
 from app.models.connection import UserConnection, ConnectionStatus
 from app.schemas.trip import (
@@ -13,17 +12,78 @@ from app.schemas.trip import (
     TripParticipantUpdate,
     TripParticipantResponse
 )
-from app.controllers.auth import get_current_user
+from app.controllers.auth import get_current_principal
+from app.utils.principal import TokenPrincipal
+from app.utils.conversation_summary import refresh_summary, remove_summary
+from app.utils.pagination import CURSOR_HEADER, encode_cursor, keyset_filter
+from app.utils.realtime import (
+    publish_trip_member_joined,
+    publish_trip_member_left,
+    publish_trip_invited,
+    publish_trip_deleted
+)
 from typing import List, Optional
 from datetime import datetime
 from uuid import UUID as UUIDType
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
+TRIP_STATUSES = ("planning", "active", "completed", "cancelled")
+PARTICIPANT_ROLES = ("creator", "member")
+
+def trips_with_participants(db: Session):
+    """
+    Trips with their participants and the participants' users eager-loaded: one
+    query for the trips plus one per relationship, however many trips and people.
+    """
+    return db.query(Trip).options(
+        selectinload(Trip.participants).selectinload(TripParticipant.user)
+    )
+
+def load_trip(db: Session, trip_uuid: UUIDType) -> Optional[Trip]:
+    return trips_with_participants(db).filter(Trip.id == trip_uuid).first()
+
+def participant_response(participant: TripParticipant) -> TripParticipantResponse:
+    user = participant.user
+    return TripParticipantResponse(
+        id=str(participant.id),
+        user_id=str(participant.user_id),
+        role=participant.role,
+        status=participant.status,
+        invited_at=participant.invited_at,
+        joined_at=participant.joined_at,
+        user={
+            "id": str(user.id),
+            "email": user.email,
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "phone": user.phone,
+            "avatar_url": user.avatar_url
+        } if user else None
+    )
+
+def trip_response(trip: Trip, include_participants: bool = True) -> TripResponse:
+    return TripResponse(
+        id=str(trip.id),
+        user_id=str(trip.user_id),
+        title=trip.title,
+        description=trip.description,
+        budget=float(trip.budget) if trip.budget else None,
+        budget_currency=trip.budget_currency,
+        start_date=trip.start_date,
+        end_date=trip.end_date,
+        status=trip.status,
+        created_at=trip.created_at,
+        updated_at=trip.updated_at,
+        participants=[participant_response(participant) for participant in trip.participants]
+        if include_participants else None
+    )
+
 @router.post("/", response_model=TripResponse)
-async def create_trip(
+def create_trip(
     trip_data: TripCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new trip."""
@@ -60,6 +120,7 @@ async def create_trip(
     
     # Fetch trip with participants
     db.refresh(new_trip)
+    publish_trip_member_joined(new_trip.id, user_uuid)
     
     return TripResponse(
         id=str(new_trip.id),
@@ -76,74 +137,79 @@ async def create_trip(
     )
 
 @router.get("/", response_model=List[TripResponse])
-async def get_trips(
-    current_user: User = Depends(get_current_user),
+def get_trips(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    before: Optional[str] = Query(None, description="Cursor: return trips created before this one"),
+    trip_status: Optional[str] = Query(None, alias="status", description="Trip status: planning, active, completed or cancelled"),
+    start_date: Optional[datetime] = Query(None, description="Only trips still running on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only trips starting on or before this date"),
+    role: Optional[str] = Query(None, description="Your role in the trip: creator or member"),
+    include_participants: bool = Query(True, description="Set to false to leave out participant lists"),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get all trips where the current user is a participant (accepted or pending)."""
-    # Get all trips where user is a participant (both accepted and pending)
+    """
+    Get trips where the current user is a participant (accepted or pending), newest first.
+    Page with ?before=<X-Next-Cursor>. start_date/end_date select trips overlapping that
+    window; trips without dates are left out when either is given.
+    """
+    if trip_status is not None and trip_status not in TRIP_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Status must be one of: {', '.join(TRIP_STATUSES)}"
+        )
+    if role is not None and role not in PARTICIPANT_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Role must be one of: {', '.join(PARTICIPANT_ROLES)}"
+        )
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before end_date"
+        )
+    try:
+        cursor_filter = keyset_filter(Trip.created_at, Trip.id, before=before)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
     user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
-    participants = db.query(TripParticipant).filter(
+    my_trip_ids = db.query(TripParticipant.trip_id).filter(
         TripParticipant.user_id == user_uuid,
         TripParticipant.status.in_(["accepted", "pending"])
-    ).all()
-    
-    trip_ids = [p.trip_id for p in participants]
-    
-    if not trip_ids:
-        return []
-    
-    trips = db.query(Trip).filter(Trip.id.in_(trip_ids)).all()
-    
-    result = []
-    for trip in trips:
-        # Get participants for each trip
-        trip_participants = db.query(TripParticipant).filter(
-            TripParticipant.trip_id == trip.id
-        ).all()
-        
-        participants_data = []
-        for participant in trip_participants:
-            user = db.query(User).filter(User.id == participant.user_id).first()
-        participants_data.append(TripParticipantResponse(
-            id=str(participant.id),
-            user_id=str(participant.user_id),
-            role=participant.role,
-            status=participant.status,
-            invited_at=participant.invited_at,
-            joined_at=participant.joined_at,
-            user={
-                "id": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "phone": user.phone,
-                "avatar_url": user.avatar_url
-            } if user else None
-        ))
-        
-        result.append(TripResponse(
-            id=str(trip.id),
-            user_id=str(trip.user_id),
-            title=trip.title,
-            description=trip.description,
-            budget=float(trip.budget) if trip.budget else None,
-            budget_currency=trip.budget_currency,
-            start_date=trip.start_date,
-            end_date=trip.end_date,
-            status=trip.status,
-            created_at=trip.created_at,
-            updated_at=trip.updated_at,
-            participants=participants_data
+    )
+    if role is not None:
+        my_trip_ids = my_trip_ids.filter(TripParticipant.role == role)
+    
+    trip_query = trips_with_participants(db) if include_participants else db.query(Trip)
+    trip_query = trip_query.filter(Trip.id.in_(my_trip_ids))
+    if trip_status is not None:
+        trip_query = trip_query.filter(Trip.status == trip_status)
+    if start_date is not None:
+        # Still running on start_date; trips without an end date count as their start day
+        trip_query = trip_query.filter(or_(
+            Trip.end_date >= start_date,
+            and_(Trip.end_date.is_(None), Trip.start_date >= start_date)
         ))
+    if end_date is not None:
+        trip_query = trip_query.filter(Trip.start_date <= end_date)
+    if cursor_filter is not None:
+        trip_query = trip_query.filter(cursor_filter)
+    
+    trips = trip_query.order_by(desc(Trip.created_at), desc(Trip.id)).limit(limit).all()
     
-    return result
+    if len(trips) == limit:
+        response.headers[CURSOR_HEADER] = encode_cursor(trips[-1].created_at, trips[-1].id)
+    return [trip_response(trip, include_participants) for trip in trips]
 
 @router.get("/{trip_id}", response_model=TripResponse)
-async def get_trip(
+def get_trip(
     trip_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get a specific trip by ID."""
@@ -155,7 +221,7 @@ async def get_trip(
             detail="Invalid trip ID format"
         )
     
-    trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
+    trip = load_trip(db, trip_uuid)
     
     if not trip:
         raise HTTPException(
@@ -165,66 +231,24 @@ async def get_trip(
     
     # Check if user is a participant OR the trip creator
     user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
-    participant = db.query(TripParticipant).filter(
-        TripParticipant.trip_id == trip_uuid,
-        TripParticipant.user_id == user_uuid
-    ).first()
+    is_participant = any(participant.user_id == user_uuid for participant in trip.participants)
     
     # Allow trip creator even if not a participant (shouldn't happen, but safety check)
     is_creator = str(trip.user_id) == str(user_uuid)
     
-    if not participant and not is_creator:
+    if not is_participant and not is_creator:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this trip"
         )
     
-    # Get participants
-    trip_participants = db.query(TripParticipant).filter(
-        TripParticipant.trip_id == trip_uuid
-    ).all()
-    
-    participants_data = []
-    for participant in trip_participants:
-        user = db.query(User).filter(User.id == participant.user_id).first()
-        participants_data.append(TripParticipantResponse(
-            id=str(participant.id),
-            user_id=str(participant.user_id),
-            role=participant.role,
-            status=participant.status,
-            invited_at=participant.invited_at,
-            joined_at=participant.joined_at,
-            user={
-                "id": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "phone": user.phone,
-                "avatar_url": user.avatar_url
-            } if user else None
-        ))
-    
-    return TripResponse(
-        id=str(trip.id),
-        user_id=str(trip.user_id),
-        title=trip.title,
-        description=trip.description,
-        budget=float(trip.budget) if trip.budget else None,
-        budget_currency=trip.budget_currency,
-        start_date=trip.start_date,
-        end_date=trip.end_date,
-        status=trip.status,
-        created_at=trip.created_at,
-        updated_at=trip.updated_at,
-        participants=participants_data
-    )
+    return trip_response(trip)
 
 @router.put("/{trip_id}", response_model=TripResponse)
-async def update_trip(
+def update_trip(
     trip_id: str,
     trip_update: TripUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update a trip (only creator can update)."""
@@ -235,7 +259,7 @@ async def update_trip(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid trip ID format"
         )
-    trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
+    trip = load_trip(db, trip_uuid)
     
     if not trip:
         raise HTTPException(
@@ -282,54 +306,15 @@ async def update_trip(
         trip.status = trip_update.status
     
     db.commit()
-    db.refresh(trip)
     
-    # Get participants
-    trip_participants = db.query(TripParticipant).filter(
-        TripParticipant.trip_id == trip_uuid
-    ).all()
-    
-    participants_data = []
-    for participant in trip_participants:
-        user = db.query(User).filter(User.id == participant.user_id).first()
-        participants_data.append(TripParticipantResponse(
-            id=str(participant.id),
-            user_id=str(participant.user_id),
-            role=participant.role,
-            status=participant.status,
-            invited_at=participant.invited_at,
-            joined_at=participant.joined_at,
-            user={
-                "id": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "phone": user.phone,
-                "avatar_url": user.avatar_url
-            } if user else None
-        ))
-    
-    return TripResponse(
-        id=str(trip.id),
-        user_id=str(trip.user_id),
-        title=trip.title,
-        description=trip.description,
-        budget=float(trip.budget) if trip.budget else None,
-        budget_currency=trip.budget_currency,
-        start_date=trip.start_date,
-        end_date=trip.end_date,
-        status=trip.status,
-        created_at=trip.created_at,
-        updated_at=trip.updated_at,
-        participants=participants_data
-    )
+    # The commit expired the trip; reload it with its participants in one round
+    return trip_response(load_trip(db, trip_uuid))
 
 @router.post("/{trip_id}/invite", response_model=List[TripParticipantResponse])
-async def invite_users_to_trip(
+def invite_users_to_trip(
     trip_id: str,
     invite_data: TripInviteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Invite users to a trip (only creator can invite)."""
@@ -340,7 +325,7 @@ async def invite_users_to_trip(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid trip ID format"
         )
-    trip = db.query(Trip).filter(Trip.id == trip_uuid).first()
+    trip = load_trip(db, trip_uuid)
     
     if not trip:
         raise HTTPException(
@@ -357,87 +342,62 @@ async def invite_users_to_trip(
             detail="Only the trip creator can invite users"
         )
     
-    new_participants = []
+    # Unknown ids and malformed ids are skipped, like users who aren't connected
+    requested_ids = []
     for user_id in invite_data.user_ids:
-        # Check if user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        try:
+            requested_ids.append(UUIDType(user_id))
+        except ValueError:
             continue
-        
-        # Check if user is connected (accepted connection)
-        connection = db.query(UserConnection).filter(
+    user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
+    
+    # Requested users with an accepted connection to the inviter (either direction), in one query
+    connected_ids = set()
+    if requested_ids:
+        connections = db.query(UserConnection.user_id, UserConnection.connected_user_id).filter(
             or_(
                 and_(
-                    UserConnection.user_id == str(current_user.id),
-                    UserConnection.connected_user_id == user_id,
-                    UserConnection.status == ConnectionStatus.ACCEPTED.value
+                    UserConnection.user_id == user_uuid,
+                    UserConnection.connected_user_id.in_(requested_ids)
                 ),
                 and_(
-                    UserConnection.user_id == user_id,
-                    UserConnection.connected_user_id == str(current_user.id),
-                    UserConnection.status == ConnectionStatus.ACCEPTED.value
+                    UserConnection.user_id.in_(requested_ids),
+                    UserConnection.connected_user_id == user_uuid
                 )
-            )
-        ).first()
-        
-        if not connection:
-            continue  # Skip users who are not connected
-        
-        # Check if already a participant
-        existing = db.query(TripParticipant).filter(
-            TripParticipant.trip_id == trip_uuid,
-            TripParticipant.user_id == user_id
-        ).first()
-        
-        if existing:
-            continue  # Skip if already invited
-        
-        # Create participant
-        participant = TripParticipant(
+            ),
+            UserConnection.status == ConnectionStatus.ACCEPTED.value
+        ).all()
+        for requester_id, addressee_id in connections:
+            connected_ids.add(addressee_id if requester_id == user_uuid else requester_id)
+    
+    # Skip anyone already invited; the trip's participants are already loaded
+    existing_ids = {participant.user_id for participant in trip.participants}
+    
+    invited_user_ids = []
+    for invited_id in dict.fromkeys(requested_ids):
+        if invited_id not in connected_ids or invited_id in existing_ids:
+            continue
+        db.add(TripParticipant(
             trip_id=trip_uuid,
-            user_id=UUIDType(user_id) if isinstance(user_id, str) else user_id,
+            user_id=invited_id,
             role="member",
             status="pending"
-        )
-        db.add(participant)
-        new_participants.append(participant)
+        ))
+        invited_user_ids.append(str(invited_id))
     
     db.commit()
+    publish_trip_invited(trip_uuid, invited_user_ids)
     
     # Return all participants
-    all_participants = db.query(TripParticipant).filter(
-        TripParticipant.trip_id == trip_uuid
-    ).all()
-    
-    result = []
-    for participant in all_participants:
-        user = db.query(User).filter(User.id == participant.user_id).first()
-        result.append(TripParticipantResponse(
-            id=str(participant.id),
-            user_id=str(participant.user_id),
-            role=participant.role,
-            status=participant.status,
-            invited_at=participant.invited_at,
-            joined_at=participant.joined_at,
-            user={
-                "id": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "phone": user.phone,
-                "avatar_url": user.avatar_url
-            } if user else None
-        ))
-    
-    return result
+    trip = load_trip(db, trip_uuid)
+    return [participant_response(participant) for participant in trip.participants]
 
 @router.put("/{trip_id}/participants/{participant_id}", response_model=TripParticipantResponse)
-async def update_participant_status(
+def update_participant_status(
     trip_id: str,
     participant_id: str,
     update_data: TripParticipantUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Accept or decline a trip invitation."""
@@ -451,7 +411,7 @@ async def update_participant_status(
         )
     
     user_uuid = UUIDType(current_user.id) if isinstance(current_user.id, str) else current_user.id
-    participant = db.query(TripParticipant).filter(
+    participant = db.query(TripParticipant).options(joinedload(TripParticipant.user)).filter(
         TripParticipant.id == participant_uuid,
         TripParticipant.trip_id == trip_uuid,
         TripParticipant.user_id == user_uuid
@@ -469,35 +429,34 @@ async def update_participant_status(
             detail="Status must be 'accepted' or 'declined'"
         )
     
+    previous_status = participant.status
     participant.status = update_data.status
     if update_data.status == "accepted":
         participant.joined_at = datetime.utcnow()
+        # The group chat shows up in the new member's inbox with its latest message;
+        # flushed first so messages from before joined_at don't count as unread
+        db.flush()
+        refresh_summary(db, user_uuid, trip_id=trip_uuid)
+    else:
+        remove_summary(db, user_uuid, trip_uuid)
     
     db.commit()
-    db.refresh(participant)
     
-    user = db.query(User).filter(User.id == participant.user_id).first()
-    return TripParticipantResponse(
-        id=str(participant.id),
-        user_id=str(participant.user_id),
-        role=participant.role,
-        status=participant.status,
-        invited_at=participant.invited_at,
-        joined_at=participant.joined_at,
-        user={
-            "id": str(user.id),
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "phone": user.phone,
-            "avatar_url": user.avatar_url
-        } if user else None
-    )
+    if update_data.status == "accepted" and previous_status != "accepted":
+        publish_trip_member_joined(trip_uuid, user_uuid)
+    elif update_data.status == "declined" and previous_status == "accepted":
+        publish_trip_member_left(trip_uuid, user_uuid, "declined")
+    
+    # Refresh the participant and its user together after the commit
+    participant = db.query(TripParticipant).options(joinedload(TripParticipant.user)).filter(
+        TripParticipant.id == participant_uuid
+    ).first()
+    return participant_response(participant)
 
 @router.delete("/{trip_id}")
-async def delete_trip(
+def delete_trip(
     trip_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a trip (only creator can delete)."""
@@ -527,14 +486,15 @@ async def delete_trip(
     
     db.delete(trip)
     db.commit()
+    publish_trip_deleted(trip_uuid)
     
     return {"message": "Trip deleted successfully"}
 
 @router.delete("/{trip_id}/participants/{participant_id}")
-async def remove_participant(
+def remove_participant(
     trip_id: str,
     participant_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Remove a participant from a trip (only creator can remove participants)."""
@@ -582,8 +542,11 @@ async def remove_participant(
             detail="Cannot remove the trip creator"
         )
     
+    removed_user_id = participant.user_id
+    remove_summary(db, removed_user_id, trip_uuid)
     db.delete(participant)
     db.commit()
+    publish_trip_member_left(trip_uuid, removed_user_id, "removed")
     
     return {"message": "Participant removed successfully"}
 
@@ -1,7 +1,8 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool
 import os
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
@@ -29,16 +30,82 @@ if not DATABASE_URL:
     encoded_password = quote_plus(db_password)
     DATABASE_URL = f"postgresql://{db_user}:{encoded_password}@{db_host}:{db_port}/{db_name}"
 
+# Connection pool settings
+# Defaults depend on ENVIRONMENT; every value can be overridden with a DB_POOL_* variable.
+# Size the pools so that (pool_size + max_overflow) * workers, for the sync engine plus the
+# async one, stays below Postgres max_connections.
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
+
+POOL_DEFAULTS = {
+    "development": {"pool_size": 5, "max_overflow": 5},
+    "test": {"pool_size": 2, "max_overflow": 0},
+    "production": {"pool_size": 10, "max_overflow": 20},
+}
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def get_pool_settings() -> dict:
+    """Resolve pool settings from ENVIRONMENT defaults and DB_POOL_* overrides."""
+    defaults = POOL_DEFAULTS.get(ENVIRONMENT, POOL_DEFAULTS["development"])
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", defaults["pool_size"]),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", defaults["max_overflow"]),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+
+def get_async_pool_settings() -> dict:
+    """
+    Pool settings of the async engine: its own, smaller pool (DB_ASYNC_POOL_SIZE and
+    DB_ASYNC_MAX_OVERFLOW) on top of the sync one. It only serves short WebSocket lookups.
+    """
+    settings = get_pool_settings()
+    settings["pool_size"] = _env_int("DB_ASYNC_POOL_SIZE", 2)
+    settings["max_overflow"] = _env_int("DB_ASYNC_MAX_OVERFLOW", 2)
+    return settings
+
+POOL_SETTINGS = get_pool_settings()
+ASYNC_POOL_SETTINGS = get_async_pool_settings()
+
 # Create SQLAlchemy engine
 engine = create_engine(
     DATABASE_URL,
-    poolclass=StaticPool,
-    echo=True  # Set to False in production
+    poolclass=QueuePool,
+    echo=_env_bool("SQL_ECHO", False),  # Log every SQL statement (debugging only)
+    **POOL_SETTINGS
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) for code running on the event loop (e.g. WebSocket handlers).
+# HTTP route handlers are plain `def` functions: FastAPI runs them in its threadpool,
+# so blocking SessionLocal queries never stall the event loop.
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://", 1).replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=_env_bool("SQL_ECHO", False),
+    **ASYNC_POOL_SETTINGS
+)
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -48,4 +115,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_pool_status() -> dict:
+    """Snapshot of the connection pool for monitoring."""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": POOL_SETTINGS["max_overflow"],
+        "max_connections": POOL_SETTINGS["pool_size"] + POOL_SETTINGS["max_overflow"],
+    }
@@ -0,0 +1,32 @@
+"""
+Outbound email: transports and the transactional outbox.
+
+EMAIL_TRANSPORT selects how queued emails leave the process:
+- graph (default): Microsoft Graph sendMail with the MSAL app credentials
+- file: JSON files in EMAIL_FILE_DIR; local development, load tests
+- smtp: a plain SMTP server at EMAIL_SMTP_HOST:EMAIL_SMTP_PORT, e.g. a local debugging server
+"""
+import os
+from app.mail.base import MailTransport, MailDeliveryError
+from app.mail.graph import GraphTransport
+from app.mail.file import FileTransport
+from app.mail.smtp import SmtpTransport
+from app.mail.render import render_email
+from app.mail.outbox import OutboxSender, queue_email
+
+def create_transport(backend: str = None) -> MailTransport:
+    backend = (backend or os.getenv("EMAIL_TRANSPORT", "graph")).lower()
+    if backend == "graph":
+        return GraphTransport()
+    if backend == "file":
+        return FileTransport(os.getenv("EMAIL_FILE_DIR", "outbox_mail"))
+    if backend == "smtp":
+        return SmtpTransport(os.getenv("EMAIL_SMTP_HOST", "localhost"), int(os.getenv("EMAIL_SMTP_PORT", "1025")))
+    raise ValueError(f"EMAIL_TRANSPORT must be 'graph', 'file' or 'smtp', got {backend!r}")
+
+outbox_sender = OutboxSender(create_transport())
+
+__all__ = [
+    "MailTransport", "MailDeliveryError", "GraphTransport", "FileTransport", "SmtpTransport",
+    "render_email", "OutboxSender", "queue_email", "create_transport", "outbox_sender"
+]
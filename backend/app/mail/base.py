@@ -0,0 +1,49 @@
+"""
+Transport interface shared by the outbound mail backends.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+
+class MailDeliveryError(Exception):
+    """A message could not be sent; retryable errors are tried again later by the outbox."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MailTransport(ABC):
+    """
+    Delivers Graph sendMail payloads ({"message": {...}, "saveToSentItems": ...}).
+
+    Messages are built once in the Graph format by render_email() (app/mail/render.py)
+    whatever the transport; non-Graph transports translate them. send_batch() lets a backend
+    deliver several messages per round-trip; the default sends them one by one.
+    """
+    name = "base"
+
+    @abstractmethod
+    def send(self, payload: dict):
+        """Deliver one message; raises MailDeliveryError on failure."""
+
+    def send_batch(self, payloads: List[Tuple[str, dict]]) -> Dict[str, Optional[MailDeliveryError]]:
+        """
+        Deliver (key, payload) pairs; returns key -> None when sent, else the error.
+        Unexpected exceptions become retryable MailDeliveryErrors for their message only.
+        """
+        results = {}
+        for key, payload in payloads:
+            try:
+                self.send(payload)
+                results[key] = None
+            except MailDeliveryError as e:
+                results[key] = e
+            except Exception as e:
+                results[key] = MailDeliveryError(f"Unexpected {self.name} error: {e}")
+        return results
+
+
+def recipients(payload: dict) -> List[str]:
+    """Addresses a Graph payload is sent to."""
+    return [r["emailAddress"]["address"] for r in payload["message"].get("toRecipients", [])]
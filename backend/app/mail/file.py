@@ -0,0 +1,28 @@
+"""
+File transport: writes each message to a JSON file instead of sending it.
+
+For local development and load tests without network access; the files hold the
+exact Graph payload the graph transport would have sent.
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from app.mail.base import MailTransport, MailDeliveryError
+
+
+class FileTransport(MailTransport):
+    name = "file"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def send(self, payload: dict):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            path = os.path.join(self.directory, f"{stamp}-{uuid.uuid4().hex[:8]}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            raise MailDeliveryError(f"Could not write {self.directory}: {e}")
@@ -0,0 +1,93 @@
+"""
+Microsoft Graph transport: sendMail through the shared MSAL token and HTTP session.
+"""
+import requests
+from typing import Dict, List, Optional, Tuple
+from app.mail.base import MailTransport, MailDeliveryError
+from app.utils import email
+
+# Graph JSON batching accepts at most 20 requests per call
+GRAPH_BATCH_LIMIT = 20
+
+
+def _error(status_code: int, detail: str) -> MailDeliveryError:
+    """
+    Throttling, server errors and expired tokens are worth retrying; other 4xx are not.
+    A 401 also drops the cached token, so the retry signs in again instead of resending it.
+    """
+    if status_code == 401:
+        email.reset_access_token()
+    retryable = status_code in (401, 408, 429) or status_code >= 500
+    return MailDeliveryError(f"Graph returned {status_code}: {detail}", retryable=retryable)
+
+
+class GraphTransport(MailTransport):
+    name = "graph"
+
+    def _headers(self) -> dict:
+        if not all([email.TENANT_ID, email.CLIENT_ID, email.CLIENT_SECRET, email.SENDER_USER]):
+            raise MailDeliveryError(
+                "MSAL not configured: set MSAL_TENANT_ID, MSAL_CLIENT_ID, MSAL_CLIENT_SECRET and MSAL_SENDER_USER",
+                retryable=False
+            )
+        access_token = email.get_access_token()
+        if not access_token:
+            raise MailDeliveryError("Failed to get access token")
+        return {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+
+    def _post(self, url: str, body: dict) -> requests.Response:
+        try:
+            return email.graph_session.post(url, json=body, headers=self._headers(), timeout=email.GRAPH_TIMEOUT_SECONDS)
+        except requests.exceptions.RequestException as e:
+            raise MailDeliveryError(f"Request error: {e}")
+
+    def send(self, payload: dict):
+        response = self._post(f"{email.GRAPH_API_ENDPOINT}/users/{email.SENDER_USER}/sendMail", payload)
+        if response.status_code != 202:
+            raise _error(response.status_code, response.text)
+
+    def send_batch(self, payloads: List[Tuple[str, dict]]) -> Dict[str, Optional[MailDeliveryError]]:
+        """
+        Send up to GRAPH_BATCH_LIMIT messages per $batch request. A chunk that fails,
+        however it fails, only fails its own messages.
+        """
+        results = {}
+        for start in range(0, len(payloads), GRAPH_BATCH_LIMIT):
+            chunk = payloads[start:start + GRAPH_BATCH_LIMIT]
+            if len(chunk) == 1:
+                results.update(super().send_batch(chunk))
+                continue
+            try:
+                results.update(self._send_chunk(chunk))
+            except MailDeliveryError as e:
+                results.update({key: e for key, _ in chunk})
+            except Exception as e:
+                error = MailDeliveryError(f"Unexpected Graph batch error: {e}")
+                results.update({key: error for key, _ in chunk})
+        return results
+
+    def _send_chunk(self, chunk: List[Tuple[str, dict]]) -> Dict[str, Optional[MailDeliveryError]]:
+        body = {"requests": [
+            {
+                "id": str(index),
+                "method": "POST",
+                "url": f"/users/{email.SENDER_USER}/sendMail",
+                "headers": {"Content-Type": "application/json"},
+                "body": payload
+            }
+            for index, (_, payload) in enumerate(chunk)
+        ]}
+        response = self._post(f"{email.GRAPH_API_ENDPOINT}/$batch", body)
+        if response.status_code != 200:
+            raise _error(response.status_code, response.text)
+        statuses = {item["id"]: item for item in response.json().get("responses", [])}
+        results = {}
+        for index, (key, _) in enumerate(chunk):
+            item = statuses.get(str(index))
+            if item is None:
+                results[key] = MailDeliveryError("Missing from Graph batch response")
+            elif item["status"] == 202:
+                results[key] = None
+            else:
+                results[key] = _error(item["status"], str(item.get("body", "")))
+        return results
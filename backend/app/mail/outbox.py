@@ -0,0 +1,160 @@
+"""
+Transactional email outbox.
+
+Request handlers call queue_email() before their commit, so an email is queued if
+and only if the change that triggers it is committed, and the request never waits
+on the mail provider. OutboxSender.run_once() runs every OUTBOX_POLL_SECONDS on the
+background scheduler: it claims up to OUTBOX_BATCH_SIZE due rows (FOR UPDATE SKIP
+LOCKED, so several workers never claim the same row), renders them, hands them to
+the transport in one batch and deletes the ones that were sent - verification codes
+and cancellation tokens don't outlive their delivery. Failed rows are retried with
+exponential backoff and jitter; after OUTBOX_MAX_ATTEMPTS, or on a permanent error,
+they are marked 'dead' and kept for inspection with their kind, recipient, attempts
+and last error, but not their context - the secrets go with the last attempt too.
+"""
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.mail.base import MailTransport, MailDeliveryError
+from app.models.email_outbox import OutboxEmail
+from app.mail.render import EMAIL_TEMPLATES, render_email
+
+OUTBOX_POLL_SECONDS = int(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+
+PENDING = "pending"
+DEAD = "dead"
+
+
+def queue_email(db: Session, kind: str, recipient: str, **context) -> OutboxEmail:
+    """
+    Queue an email in the caller's transaction; it is sent after the caller commits.
+
+    context holds the fields of EMAIL_TEMPLATES[kind] and must be JSON-serialisable
+    (pass datetimes as ISO strings).
+    """
+    if kind not in EMAIL_TEMPLATES:
+        raise ValueError(f"Unknown email kind {kind!r}")
+    email = OutboxEmail(
+        kind=kind,
+        recipient=recipient,
+        context=context,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc)
+    )
+    db.add(email)
+    return email
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts`: doubling from the base, capped, with jitter."""
+    delay = min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    # Spread retries so a provider outage doesn't end in a synchronized burst
+    return delay * random.uniform(0.5, 1.0)
+
+
+class OutboxSender:
+    """Delivers due outbox rows through a transport; one run_once() per scheduler tick."""
+
+    def __init__(self, transport: MailTransport, session_factory=SessionLocal,
+                 batch_size: int = OUTBOX_BATCH_SIZE, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.transport = transport
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+        self._last_run_at = None
+
+    def run_once(self) -> int:
+        """Send one batch of due emails; returns how many were sent."""
+        db = self.session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            rows = db.query(OutboxEmail).filter(
+                OutboxEmail.status == PENDING,
+                OutboxEmail.next_attempt_at <= now
+            ).order_by(OutboxEmail.next_attempt_at).limit(self.batch_size).with_for_update(skip_locked=True).all()
+
+            payloads = []
+            errors = {}
+            for row in rows:
+                try:
+                    payloads.append((row.id, render_email(row.kind, row.context)))
+                except Exception as e:
+                    # A row that can't be rendered never will be
+                    errors[row.id] = MailDeliveryError(f"Could not render {row.kind!r}: {e}", retryable=False)
+            if payloads:
+                errors.update(self.transport.send_batch(payloads))
+
+            sent = retried = dead = 0
+            for row in rows:
+                error = errors.get(row.id)
+                if error is None:
+                    db.delete(row)
+                    sent += 1
+                    continue
+                row.attempts += 1
+                row.last_error = str(error)[:2000]
+                if not error.retryable or row.attempts >= self.max_attempts:
+                    row.status = DEAD
+                    row.context = {}  # Drop codes and tokens; the row is never rendered again
+                    dead += 1
+                    print(f"Outbox: giving up on {row.kind} email {row.id} after {row.attempts} attempt(s): {error}")
+                else:
+                    row.next_attempt_at = now + timedelta(seconds=backoff_seconds(row.attempts))
+                    retried += 1
+            db.commit()
+
+            with self._lock:
+                self._sent += sent
+                self._retried += retried
+                self._dead += dead
+                self._last_run_at = now
+            return sent
+        except Exception as e:
+            db.rollback()
+            print(f"Error sending outbox emails: {e}")
+            import traceback
+            traceback.print_exc()
+            return 0
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        """Queue depth from the table plus this process's delivery counters."""
+        db = self.session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            counts = dict(db.query(OutboxEmail.status, func.count(OutboxEmail.id)).group_by(OutboxEmail.status).all())
+            due = db.query(func.count(OutboxEmail.id)).filter(
+                OutboxEmail.status == PENDING,
+                OutboxEmail.next_attempt_at <= now
+            ).scalar()
+            oldest = db.query(func.min(OutboxEmail.created_at)).filter(OutboxEmail.status == PENDING).scalar()
+        finally:
+            db.close()
+        if oldest is not None and oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        with self._lock:
+            return {
+                "transport": self.transport.name,
+                "pending": counts.get(PENDING, 0),
+                "due": due,
+                "dead": counts.get(DEAD, 0),
+                "oldest_pending_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+                "sent": self._sent,
+                "retried": self._retried,
+                "gave_up": self._dead,
+                "last_run_at": self._last_run_at.isoformat() if self._last_run_at else None
+            }
@@ -0,0 +1,172 @@
+"""
+Email rendering: Graph sendMail payloads from precompiled templates.
+
+Templates live in app/mail/templates/ and are read and compiled once, when this
+module is imported at startup. The branded emails share layout.html (header, greeting
+and footer) and only keep their own content; the layout is merged into each of them
+at load time, so a render is one string.Template substitution. Every field is
+HTML-escaped when substituted; values wrapped in Markup are trusted HTML built here
+from escaped parts.
+
+An email is described by its kind and a small JSON context (what the outbox stores):
+render_email("verification", {"email": ..., "name": ..., "code": ...}).
+"""
+import html
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from string import Template
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+from app.utils.email import FROM_ALIAS, CONTACT_EMAIL, NO_REPLY_ALIAS, NOTIFICATIONS_ALIAS
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+FRONTEND_URL = os.getenv("FRONTEND_URL", "https://www.synvoy.com")
+
+
+class Markup(str):
+    """Trusted HTML: substituted as is instead of escaped."""
+
+
+def _read(filename: str) -> str:
+    with open(os.path.join(TEMPLATE_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+_LAYOUT = Template(_read("layout.html"))
+
+
+def _compile(filename: str, heading: Optional[str] = None, header_colors: Optional[str] = None) -> Template:
+    """A standalone template, or content merged into the shared layout when a heading is given."""
+    content = _read(filename)
+    if heading is None:
+        return Template(content)
+    return Template(_LAYOUT.safe_substitute(
+        heading=heading,
+        header_colors=header_colors,
+        content=content.rstrip("\n")
+    ))
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    subject: Template  # Plain text; fields are not escaped
+    body: Template
+    from_address: str
+    from_name: str
+    fields: Callable[..., dict]  # context -> template fields
+    to_contact_inbox: bool = False  # Send to CONTACT_EMAIL and reply to the context's email
+
+
+def _contact_fields(name: str, email: str, subject: str, message: str, phone: Optional[str] = None) -> dict:
+    return {
+        "name": name,
+        "email": email,
+        "subject": subject,
+        "message": Markup(html.escape(message).replace("\n", "<br>")),
+        "phone_line": Markup(f"<p><strong>Phone:</strong> {html.escape(phone)}</p>") if phone else ""
+    }
+
+
+def _verification_fields(email: str, name: str, code: str) -> dict:
+    return {"email": email, "name": name, "code": code}
+
+
+def _password_change_fields(email: str, name: str, changed_at: str) -> dict:
+    """changed_at: ISO 8601, UTC."""
+    changed_on = datetime.fromisoformat(changed_at).strftime('%B %d, %Y at %I:%M %p')
+    return {"email": email, "name": name, "changed_on": changed_on}
+
+
+def _deletion_scheduled_fields(email: str, name: str, hard_delete_at: str, cancellation_token: str) -> dict:
+    """hard_delete_at: ISO 8601 with an offset."""
+    hard_delete_at = datetime.fromisoformat(hard_delete_at)
+    return {
+        "email": email,
+        "name": name,
+        "deletion_date": hard_delete_at.strftime('%B %d, %Y at %I:%M %p UTC'),
+        "days_remaining": (hard_delete_at - datetime.now(timezone.utc)).days,
+        "cancel_url": f"{FRONTEND_URL}/cancel-deletion?token={quote(cancellation_token, safe='')}"
+    }
+
+
+def _deletion_complete_fields(email: str, name: str) -> dict:
+    return {"email": email, "name": name}
+
+
+# Email kinds the outbox can send (see app/mail/outbox.py)
+EMAIL_TEMPLATES: Dict[str, EmailTemplate] = {
+    "contact": EmailTemplate(
+        subject=Template("Contact Form: $subject"),
+        body=_compile("contact.html"),
+        from_address=FROM_ALIAS,
+        from_name="Synvoy Contact Form",
+        fields=_contact_fields,
+        to_contact_inbox=True
+    ),
+    "verification": EmailTemplate(
+        subject=Template("Verify Your Synvoy Email Address"),
+        body=_compile("verification.html", "Verify Your Email", "#2563eb 0%, #06b6d4 100%"),
+        from_address=NO_REPLY_ALIAS,
+        from_name="Synvoy",
+        fields=_verification_fields
+    ),
+    "password_change": EmailTemplate(
+        subject=Template("Password Changed - Synvoy"),
+        body=_compile("password_change.html", "Password Changed", "#2563eb 0%, #06b6d4 100%"),
+        from_address=NOTIFICATIONS_ALIAS,
+        from_name="Synvoy Notifications",
+        fields=_password_change_fields
+    ),
+    "deletion_scheduled": EmailTemplate(
+        subject=Template("Your Synvoy account is scheduled for deletion"),
+        body=_compile("deletion_scheduled.html", "Account Deletion Scheduled", "#dc2626 0%, #ef4444 100%"),
+        from_address=NOTIFICATIONS_ALIAS,
+        from_name="Synvoy Notifications",
+        fields=_deletion_scheduled_fields
+    ),
+    "deletion_complete": EmailTemplate(
+        subject=Template("Your Synvoy account has been deleted"),
+        body=_compile("deletion_complete.html", "Account Deletion Complete", "#6b7280 0%, #9ca3af 100%"),
+        from_address=NOTIFICATIONS_ALIAS,
+        from_name="Synvoy Notifications",
+        fields=_deletion_complete_fields
+    ),
+}
+
+
+def _escape(value) -> str:
+    return value if isinstance(value, Markup) else html.escape(str(value))
+
+
+def render_email(kind: str, context: dict) -> dict:
+    """
+    Graph sendMail payload for an email kind and its context.
+
+    Raises KeyError for an unknown kind and TypeError when the context doesn't
+    match the kind's fields.
+    """
+    template = EMAIL_TEMPLATES[kind]
+    fields = template.fields(**context)
+    fields["year"] = datetime.now(timezone.utc).year
+
+    message = {
+        "subject": template.subject.substitute(fields),
+        "body": {
+            "contentType": "HTML",
+            "content": template.body.substitute({key: _escape(value) for key, value in fields.items()})
+        },
+        "from": {
+            "emailAddress": {
+                "address": template.from_address,
+                "name": template.from_name
+            }
+        }
+    }
+    if template.to_contact_inbox:
+        message["toRecipients"] = [{"emailAddress": {"address": CONTACT_EMAIL}}]
+        message["replyTo"] = [{"emailAddress": {"address": fields["email"], "name": fields["name"]}}]
+    else:
+        message["toRecipients"] = [{"emailAddress": {"address": fields["email"], "name": fields["name"]}}]
+
+    return {"message": message, "saveToSentItems": "true"}
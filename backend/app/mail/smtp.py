@@ -0,0 +1,45 @@
+"""
+SMTP transport: relays messages to a plain SMTP server.
+
+Meant for a local debugging server (MailHog, `python -m aiosmtpd -n -l localhost:1025`)
+so mails can be inspected end to end without Graph credentials.
+"""
+import smtplib
+from email.message import EmailMessage
+from email.utils import formataddr
+from app.mail.base import MailTransport, MailDeliveryError, recipients
+
+
+def _address(entry: dict) -> str:
+    address = entry["emailAddress"]
+    return formataddr((address.get("name", ""), address["address"]))
+
+
+def to_mime(payload: dict) -> EmailMessage:
+    """Translate a Graph sendMail payload into a MIME message."""
+    message = payload["message"]
+    mime = EmailMessage()
+    mime["Subject"] = message["subject"]
+    mime["From"] = _address(message["from"])
+    mime["To"] = ", ".join(_address(r) for r in message.get("toRecipients", []))
+    if message.get("replyTo"):
+        mime["Reply-To"] = ", ".join(_address(r) for r in message["replyTo"])
+    body = message["body"]
+    mime.set_content(body["content"], subtype="html" if body["contentType"].upper() == "HTML" else "plain")
+    return mime
+
+
+class SmtpTransport(MailTransport):
+    name = "smtp"
+
+    def __init__(self, host: str, port: int, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, payload: dict):
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+                server.send_message(to_mime(payload), to_addrs=recipients(payload))
+        except (OSError, smtplib.SMTPException) as e:
+            raise MailDeliveryError(f"SMTP {self.host}:{self.port}: {e}")
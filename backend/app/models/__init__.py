@@ -5,6 +5,9 @@ from .trip import Trip, TripParticipant
 from .verification_token import VerificationToken
 from .deletion_cancellation_token import DeletionCancellationToken
 from .conversation_participant import ConversationParticipant
+from .conversation_summary import ConversationSummary
+from .email_outbox import OutboxEmail
 from .expense import Expense, ExpenseSplit, ExpenseAuditLog, Settlement, SettlementExpense
+from .trip_member_balance import TripMemberBalance
 
-__all__ = ["User", "UserConnection", "ConnectionStatus", "Message", "Trip", "TripParticipant", "VerificationToken", "DeletionCancellationToken", "ConversationParticipant", "Expense", "ExpenseSplit", "ExpenseAuditLog", "Settlement", "SettlementExpense"] 
\ No newline at end of file
+__all__ = ["User", "UserConnection", "ConnectionStatus", "Message", "Trip", "TripParticipant", "VerificationToken", "DeletionCancellationToken", "ConversationParticipant", "ConversationSummary", "Expense", "ExpenseSplit", "ExpenseAuditLog", "Settlement", "SettlementExpense", "TripMemberBalance", "OutboxEmail"] 
\ No newline at end of file
@@ -14,6 +14,9 @@ class ConversationParticipant(Base):
     trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=True, index=True)  # For group chats
     cleared_at = Column(DateTime(timezone=True), nullable=True)  # When user cleared chat for themselves
     left_at = Column(DateTime(timezone=True), nullable=True)  # When user left group (only for group chats)
+    # Group chat read cursor: the user has read every trip message up to this point
+    last_read_at = Column(DateTime(timezone=True), nullable=True)
+    last_read_message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+import uuid
+
+class ConversationSummary(Base):
+    """Per-user inbox row for one conversation, maintained on every message write."""
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (
+        # One row per (user, peer) for 1-on-1 chats and per (user, trip) for group chats
+        Index(
+            "uq_conversation_summaries_direct", "user_id", "peer_user_id", unique=True,
+            postgresql_where=text("trip_id IS NULL"), sqlite_where=text("trip_id IS NULL")
+        ),
+        Index(
+            "uq_conversation_summaries_trip", "user_id", "trip_id", unique=True,
+            postgresql_where=text("trip_id IS NOT NULL"), sqlite_where=text("trip_id IS NOT NULL")
+        ),
+        Index("idx_conversation_summaries_trip_id", "trip_id", postgresql_where=text("trip_id IS NOT NULL")),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Inbox owner
+    peer_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # For 1-on-1 chats
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=True)  # For group chats
+    last_message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    last_message = relationship("Message")
+
+    def __repr__(self):
+        return f"<ConversationSummary(user_id={self.user_id}, peer_user_id={self.peer_user_id}, trip_id={self.trip_id}, unread_count={self.unread_count})>"
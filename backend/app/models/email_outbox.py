@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, DateTime, Integer, JSON, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+import uuid
+
+class OutboxEmail(Base):
+    """
+    An email waiting to be sent, written in the same transaction as the change that
+    triggers it. The outbox sender (app/mail/outbox.py) delivers it and deletes the
+    row; rows that keep failing stay behind with status 'dead' for inspection.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The sender only ever looks for due pending rows
+        Index(
+            "idx_email_outbox_due", "next_attempt_at",
+            postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(50), nullable=False)  # Key of app.mail.render.EMAIL_TEMPLATES
+    recipient = Column(String(255), nullable=False)
+    context = Column(JSON, nullable=False)  # Template fields
+    status = Column(String(20), nullable=False, default="pending")  # pending, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<OutboxEmail(id={self.id}, kind={self.kind}, status={self.status}, attempts={self.attempts})>"
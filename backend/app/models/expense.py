@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, Boolean, Text
+from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, Boolean, Text, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,6 +7,10 @@ import uuid
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # A trip's expense list, newest first, paged by (created_at, id)
+        Index("idx_expenses_trip_created", "trip_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
@@ -59,6 +63,10 @@ class Expense(Base):
 
 class ExpenseSplit(Base):
     __tablename__ = "expense_splits"
+    __table_args__ = (
+        # One split per member; split writes upsert on it
+        UniqueConstraint("expense_id", "user_id", name="expense_splits_expense_user_unique"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     expense_id = Column(UUID(as_uuid=True), ForeignKey("expenses.id"), nullable=False)
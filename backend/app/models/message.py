@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,14 +7,29 @@ import uuid
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of chat histories by (created_at, id)
+        Index("idx_messages_trip_created", "trip_id", "created_at", "id"),
+        Index("idx_messages_pair_created", "sender_id", "receiver_id", "created_at", "id"),
+        # Unread 1-on-1 messages per receiver (unread counts, read-up-to updates)
+        Index(
+            "idx_messages_unread_direct", "receiver_id", "sender_id", "created_at",
+            postgresql_where=text("is_read = FALSE AND deleted_for_everyone_at IS NULL AND trip_id IS NULL")
+        ),
+        # Visible trip timeline (last message per trip, unread counts past a read cursor)
+        Index(
+            "idx_messages_trip_visible", "trip_id", "created_at", "id",
+            postgresql_where=text("deleted_for_everyone_at IS NULL")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)  # Leads idx_messages_pair_created
     receiver_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)  # Nullable for group chats
-    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=True, index=True)  # For group chats
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=True)  # For group chats; leads idx_messages_trip_created
     content = Column(Text, nullable=False)
     is_delivered = Column(Boolean, default=False, nullable=False)  # Message delivered to receiver
-    is_read = Column(Boolean, default=False, nullable=False)  # Message read by receiver
+    is_read = Column(Boolean, default=False, nullable=False)  # Message read by receiver (1-on-1; group reads use ConversationParticipant.last_read_at)
     deleted_for_everyone_at = Column(DateTime(timezone=True), nullable=True)  # When message was deleted for everyone
     deleted_for_everyone_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # Who deleted it
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
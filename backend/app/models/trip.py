@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, JSON, Text, Integer, Numeric, ForeignKey, Table
+from sqlalchemy import Column, String, DateTime, Boolean, JSON, Text, Integer, Numeric, ForeignKey, Table, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,6 +7,10 @@ import uuid
 
 class Trip(Base):
     __tablename__ = "trips"
+    __table_args__ = (
+        # Date-range filters on the trip list
+        Index("idx_trips_start_date", "start_date"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -33,6 +37,12 @@ class Trip(Base):
 
 class TripParticipant(Base):
     __tablename__ = "trip_participants"
+    __table_args__ = (
+        # "My trips": a user's accepted/pending participations
+        Index("idx_trip_participants_user_status", "user_id", "status"),
+        # Participants of a page of trips
+        Index("idx_trip_participants_trip_id", "trip_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
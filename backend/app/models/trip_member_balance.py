@@ -0,0 +1,22 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class TripMemberBalance(Base):
+    """Running paid/share totals of one member over a trip's outstanding expenses, maintained on every expense write."""
+    __tablename__ = "trip_member_balances"
+
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Cents, like Expense.amount_cents; only ACTIVE expenses outside PAID settlements count
+    paid_cents = Column(BigInteger, default=0, nullable=False)
+    share_cents = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def net_cents(self) -> int:
+        return self.paid_cents - self.share_cents
+
+    def __repr__(self):
+        return f"<TripMemberBalance(trip_id={self.trip_id}, user_id={self.user_id}, paid_cents={self.paid_cents}, share_cents={self.share_cents})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, JSON, Text
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, JSON, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -24,6 +24,8 @@ class User(Base):
     deletion_requested_at = Column(DateTime(timezone=True), nullable=True)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     hard_delete_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped to revoke every access token issued before (password change, deletion)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     trips = relationship("Trip", foreign_keys="Trip.user_id", back_populates="creator", cascade="all, delete-orphan")
@@ -0,0 +1,24 @@
+"""
+Pub/sub bus for real-time events across worker processes.
+
+PUBSUB_BACKEND selects the backend:
+- memory (default): in-process only; one worker, tests
+- postgres: LISTEN/NOTIFY on the application database; any number of workers
+"""
+import os
+from app.pubsub.base import MessageBus
+from app.pubsub.memory import InMemoryBus
+from app.pubsub.postgres import PostgresBus
+
+def create_bus(backend: str = None) -> MessageBus:
+    backend = (backend or os.getenv("PUBSUB_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return InMemoryBus()
+    if backend == "postgres":
+        from app.database import engine
+        return PostgresBus(engine)
+    raise ValueError(f"PUBSUB_BACKEND must be 'memory' or 'postgres', got {backend!r}")
+
+bus = create_bus()
+
+__all__ = ["MessageBus", "InMemoryBus", "PostgresBus", "create_bus", "bus"]
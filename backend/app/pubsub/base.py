@@ -0,0 +1,62 @@
+"""
+Bus interface shared by the pub/sub backends.
+"""
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, List
+
+# handler(channels, event); called once per event in every process
+Handler = Callable[[List[str], dict], None]
+
+
+class MessageBus(ABC):
+    """
+    Fan-out of real-time events to every worker process.
+
+    publish() is called by route handlers after their commit and may be called
+    from any thread. Every process registers handlers with subscribe(); the
+    backend calls them for each event published by any process, including
+    its own, so local delivery always goes through the bus.
+    """
+    name = "base"
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+
+    def subscribe(self, handler: Handler):
+        self._handlers.append(handler)
+
+    @abstractmethod
+    def publish(self, channels: Iterable[str], event: dict):
+        """Send an event to every process's handlers."""
+
+    def start(self):
+        """Begin receiving events (no-op for backends without a listener)."""
+
+    def stop(self):
+        """Stop receiving events."""
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "published": self._published,
+                "delivered": self._delivered,
+                "dropped": self._dropped
+            }
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _deliver(self, channels: List[str], event: dict):
+        self._count("_delivered")
+        for handler in list(self._handlers):
+            try:
+                handler(channels, event)
+            except Exception as e:
+                print(f"Error in pub/sub handler for {event.get('type')}: {e}")
@@ -0,0 +1,14 @@
+"""
+In-process bus: events go straight to this process's handlers.
+Use for a single worker and in tests.
+"""
+from typing import Iterable
+from app.pubsub.base import MessageBus
+
+
+class InMemoryBus(MessageBus):
+    name = "memory"
+
+    def publish(self, channels: Iterable[str], event: dict):
+        self._count("_published")
+        self._deliver(list(channels), event)
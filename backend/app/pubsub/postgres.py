@@ -0,0 +1,125 @@
+"""
+Postgres LISTEN/NOTIFY bus: fan-out between worker processes through the
+existing database, so no extra service is needed.
+
+Each process publishes with pg_notify() on a pooled connection and keeps one
+dedicated (unpooled) connection LISTENing in a daemon thread. NOTIFY is
+fire-and-forget: events sent while a listener is reconnecting are lost, and
+clients re-sync over HTTP when their socket reconnects.
+"""
+import json
+import select
+import threading
+import time
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from typing import Iterable, Optional
+from app.pubsub.base import MessageBus
+
+NOTIFY_CHANNEL = "synvoy_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+MAX_RECONNECT_DELAY = 30
+
+
+def encode_payload(channels: Iterable[str], event: dict) -> Optional[str]:
+    """
+    JSON payload for NOTIFY. Oversized events lose their message content and are
+    flagged as truncated (clients fetch the message over HTTP); None if still too big.
+    """
+    payload = json.dumps({"channels": list(channels), "event": event}, separators=(",", ":"))
+    if len(payload.encode("utf-8")) <= MAX_PAYLOAD_BYTES:
+        return payload
+
+    data = {k: v for k, v in event.get("data", {}).items() if k != "content"}
+    event = {**event, "data": data, "truncated": True}
+    payload = json.dumps({"channels": list(channels), "event": event}, separators=(",", ":"))
+    if len(payload.encode("utf-8")) <= MAX_PAYLOAD_BYTES:
+        return payload
+    return None
+
+
+class PostgresBus(MessageBus):
+    name = "postgres"
+
+    def __init__(self, engine: Engine, channel: str = NOTIFY_CHANNEL):
+        super().__init__()
+        self._engine = engine
+        self._channel = channel
+        self._dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listening = False
+
+    def publish(self, channels: Iterable[str], event: dict):
+        payload = encode_payload(channels, event)
+        if payload is None:
+            self._count("_dropped")
+            print(f"Dropped oversized {event.get('type')} event")
+            return
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self._channel, "payload": payload})
+            self._count("_published")
+        except Exception as e:
+            # The write itself already committed; losing the push only delays clients
+            self._count("_dropped")
+            print(f"Error publishing {event.get('type')} event: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="pubsub-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["listening"] = self._listening
+        return stats
+
+    def _listen_forever(self):
+        delay = 1
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+                delay = 1
+            except Exception as e:
+                self._listening = False
+                print(f"Pub/sub listener disconnected: {e}; reconnecting in {delay}s")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _listen(self):
+        conn = psycopg2.connect(self._dsn)
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self._channel}"')
+            self._listening = True
+            while not self._stopping.is_set():
+                # Wake up every second to notice stop()
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._handle(conn.notifies.pop(0).payload)
+        finally:
+            self._listening = False
+            conn.close()
+
+    def _handle(self, payload: str):
+        try:
+            message = json.loads(payload)
+            channels, event = message["channels"], message["event"]
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring malformed pub/sub payload: {e}")
+            return
+        self._deliver(channels, event)
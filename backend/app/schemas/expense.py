@@ -120,6 +120,33 @@ class SettlementResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MemberBalanceResponse(BaseModel):
+    user_id: str
+    paid: str = Field(..., description="Total paid for the trip's outstanding expenses")
+    paid_cents: int
+    share: str = Field(..., description="Total of this member's shares of those expenses")
+    share_cents: int
+    net: str = Field(..., description="paid - share: positive when the others owe this member, negative when they owe")
+    net_cents: int
+    user: Optional[Dict[str, Any]] = None
+
+class TripBalancesResponse(BaseModel):
+    trip_id: str
+    members: List[MemberBalanceResponse] = Field(..., description="Accepted participants and anyone else with outstanding expenses, largest net first")
+
+class SettlementTransferResponse(BaseModel):
+    from_user_id: str
+    to_user_id: str
+    amount: str = Field(..., description="Amount to pay as string with 2 decimals (e.g., '12.30')")
+    amount_cents: int
+    from_user: Optional[Dict[str, Any]] = None
+    to_user: Optional[Dict[str, Any]] = None
+
+class SettlementPlanResponse(BaseModel):
+    trip_id: str
+    mode: str = Field(..., description="Planner used: 'exact' (fewest transfers) or 'greedy'")
+    transfers: List[SettlementTransferResponse]
+
 class ExpenseAuditLogResponse(BaseModel):
     id: str
     expense_id: str
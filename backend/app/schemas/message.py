@@ -52,6 +52,11 @@ class ClearChatRequest(BaseModel):
     user_id: Optional[str] = None  # For 1-on-1 chats
     trip_id: Optional[str] = None  # For group chats
 
+class ReadUpToRequest(BaseModel):
+    user_id: Optional[str] = None  # For 1-on-1 chats
+    trip_id: Optional[str] = None  # For group chats
+    message_id: str  # Newest message the reader has seen; it and everything older is read
+
 class DeleteMessageRequest(BaseModel):
     message_id: str
 
@@ -2,8 +2,11 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 import os
-import bcrypt
+import hmac
+import hashlib
 from dotenv import load_dotenv
+from app.utils.kdf_pool import kdf_pool
+from app.utils.password_policy import password_policy
 
 load_dotenv()
 
@@ -11,33 +14,48 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Key for digests of emailed one-time tokens (see hash_token); changing it invalidates pending ones
+TOKEN_HASH_KEY = os.getenv("TOKEN_HASH_KEY", SECRET_KEY)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    try:
-        # Handle both string and bytes
-        if isinstance(hashed_password, str):
-            hashed_password = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password)
-    except Exception:
-        return False
+    """Verify a password against its hash (in the KDF pool; raises KdfPoolBusy when saturated)."""
+    return kdf_pool.run(password_policy.verify, plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Generate password hash."""
-    # Bcrypt has a 72-byte limit, truncate if necessary
-    password_bytes = password.encode('utf-8')
-    if len(password_bytes) > 72:
-        # Truncate to 72 bytes
-        password_bytes = password_bytes[:72]
-    
-    # Use bcrypt directly
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
+    """Generate password hash per the hashing policy (in the KDF pool; raises KdfPoolBusy when saturated)."""
+    return kdf_pool.run(password_policy.hash, password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash predates the current hashing policy (cheap, no KDF work)."""
+    return password_policy.needs_rehash(hashed_password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token."""
+def principal_claims(user) -> dict:
+    """Signed claims describing user, enough to authenticate a request without loading it."""
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "avatar_url": user.avatar_url,
+        "status": user.status,
+        "is_verified": bool(user.is_verified),
+        "ver": user.token_version or 0
+    }
+
+def has_principal_claims(payload: dict) -> bool:
+    """Whether a verified token payload was issued in signed-claims mode."""
+    return "ver" in payload and "username" in payload
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, user=None):
+    """
+    Create JWT access token.
+    Passing user switches to signed-claims mode: the token also carries the user's
+    display fields, status and token_version (see principal_claims).
+    """
     to_encode = data.copy()
+    if user is not None:
+        to_encode.update(principal_claims(user))
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -61,5 +79,13 @@ def generate_secure_token(length: int = 32) -> str:
     return secrets.token_urlsafe(length)
 
 def hash_token(token: str) -> str:
-    """Hash a token using bcrypt for storage."""
-    return get_password_hash(token) 
\ No newline at end of file
+    """
+    Digest of a high-entropy token for storage: keyed HMAC-SHA256 (hex).
+    Deterministic, so a presented token is found with one indexed equality lookup;
+    the key keeps a leaked table from being checked against guesses offline.
+    """
+    return hmac.new(TOKEN_HASH_KEY.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def verify_token_hash(token: str, token_hash: str) -> bool:
+    """Constant-time check of a token against a hash_token() digest."""
+    return hmac.compare_digest(hash_token(token), token_hash)
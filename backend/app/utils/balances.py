@@ -0,0 +1,120 @@
+"""
+Trip balance engine: what each member is owed or owes, in integer cents.
+
+A member's net is what they paid for the trip's outstanding expenses minus their
+shares of them: positive when the others owe them, negative when they owe. VOID
+expenses and expenses covered by a PAID settlement are not outstanding.
+
+Reads come from trip_member_balances, the per-(trip, member) ledger that expense
+and settlement writes keep up to date (see app/utils/trip_ledger.py), so they cost
+one row per member however many expenses the trip has. aggregate_balances()
+computes the same totals from expenses and expense_splits in one grouped query;
+the ledger rebuild uses it as the source of truth.
+
+Balances are cached per trip for TRIP_BALANCE_CACHE_TTL_SECONDS. Every write that
+moves them (creating, editing or voiding an expense, paying a settlement) must call
+evict_trip_balances() after its commit; like principal evictions, it is fanned out
+over the pub/sub bus so every worker drops its copy.
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+from uuid import UUID
+from sqlalchemy import and_, exists, func, literal_column, or_, select, union_all
+from sqlalchemy.orm import Session
+from app.models.expense import Expense, ExpenseSplit, Settlement, SettlementExpense
+from app.models.trip_member_balance import TripMemberBalance
+from app.pubsub import bus
+from app.utils.principal import PrincipalCache
+
+TRIP_BALANCE_CACHE_TTL_SECONDS = float(os.getenv("TRIP_BALANCE_CACHE_TTL_SECONDS", "300"))
+TRIP_BALANCE_CACHE_MAX_ENTRIES = int(os.getenv("TRIP_BALANCE_CACHE_MAX_ENTRIES", "2000"))
+
+TRIP_BALANCES_CHANGED = "trip.balances_changed"
+
+
+@dataclass(frozen=True)
+class MemberBalance:
+    user_id: UUID
+    paid_cents: int
+    share_cents: int
+
+    @property
+    def net_cents(self) -> int:
+        return self.paid_cents - self.share_cents
+
+
+def outstanding_expenses(trip_ids: Iterable[UUID]):
+    """Filter on Expense: the trips' ACTIVE expenses not covered by a PAID settlement."""
+    settled = exists().where(
+        SettlementExpense.expense_id == Expense.id,
+        Settlement.id == SettlementExpense.settlement_id,
+        Settlement.status == 'PAID'
+    )
+    return and_(Expense.trip_id.in_(list(trip_ids)), Expense.status == 'ACTIVE', ~settled)
+
+
+def aggregate_balances(db: Session, trip_ids: Iterable[UUID]) -> Dict[UUID, Tuple[MemberBalance, ...]]:
+    """
+    Paid and share totals of everyone in the trips' outstanding expenses, from
+    expenses and expense_splits in one grouped query. Trips without any are left out.
+    """
+    outstanding = outstanding_expenses(trip_ids)
+    paid = select(
+        Expense.trip_id.label("trip_id"),
+        Expense.payer_user_id.label("user_id"),
+        Expense.amount_cents.label("paid_cents"),
+        literal_column("0").label("share_cents")
+    ).where(outstanding)
+    shares = select(
+        Expense.trip_id.label("trip_id"),
+        ExpenseSplit.user_id.label("user_id"),
+        literal_column("0").label("paid_cents"),
+        ExpenseSplit.share_cents.label("share_cents")
+    ).join(Expense, Expense.id == ExpenseSplit.expense_id).where(outstanding)
+    entries = union_all(paid, shares).subquery()
+
+    rows = db.execute(
+        select(entries.c.trip_id, entries.c.user_id, func.sum(entries.c.paid_cents), func.sum(entries.c.share_cents))
+        .group_by(entries.c.trip_id, entries.c.user_id)
+        .order_by(entries.c.trip_id, entries.c.user_id)
+    ).all()
+    totals: Dict[UUID, list] = {}
+    for trip_id, user_id, paid_cents, share_cents in rows:
+        totals.setdefault(trip_id, []).append(MemberBalance(user_id, int(paid_cents), int(share_cents)))
+    return {trip_id: tuple(members) for trip_id, members in totals.items()}
+
+
+def load_trip_balances(db: Session, trip_id: UUID) -> Tuple[MemberBalance, ...]:
+    """The trip's members with outstanding expenses, read from the ledger."""
+    rows = db.query(TripMemberBalance).filter(
+        TripMemberBalance.trip_id == trip_id,
+        or_(TripMemberBalance.paid_cents != 0, TripMemberBalance.share_cents != 0)
+    ).order_by(TripMemberBalance.user_id).all()
+    return tuple(MemberBalance(row.user_id, row.paid_cents, row.share_cents) for row in rows)
+
+
+class TripBalanceCache(PrincipalCache):
+    """Per-trip balances, with the TTL, LRU bound and eviction rules of PrincipalCache."""
+
+    def dispatch(self, channels, event: dict):
+        """Bus handler: drop balances of trips changed by any worker."""
+        if event.get("type") == TRIP_BALANCES_CHANGED:
+            self.evict(event["data"]["trip_id"])
+
+
+trip_balance_cache = TripBalanceCache(
+    max_entries=TRIP_BALANCE_CACHE_MAX_ENTRIES,
+    ttl=TRIP_BALANCE_CACHE_TTL_SECONDS
+)
+
+
+def trip_balances(db: Session, trip_id: UUID) -> Tuple[MemberBalance, ...]:
+    """Cached load_trip_balances()."""
+    return trip_balance_cache.get_or_load(trip_id, lambda: load_trip_balances(db, trip_id))
+
+
+def evict_trip_balances(trip_id):
+    """Forget a trip's cached balances in every worker (call after committing the change)."""
+    trip_balance_cache.evict(trip_id)
+    bus.publish([], {"type": TRIP_BALANCES_CHANGED, "data": {"trip_id": str(trip_id)}})
@@ -6,7 +6,8 @@ from app.database import SessionLocal
 from app.models.user import User
 from app.models.verification_token import VerificationToken
 from app.models.deletion_cancellation_token import DeletionCancellationToken
-from app.utils.email import send_deletion_complete_email
+from app.mail.outbox import queue_email
+from app.utils.principal import evict_principal
 from datetime import datetime, timedelta, timezone
 
 def cleanup_unverified_accounts():
@@ -23,6 +24,7 @@ def cleanup_unverified_accounts():
         ).all()
         
         deleted_count = 0
+        deleted_ids = []
         for user in unverified_users:
             # Delete associated verification tokens first (cascade should handle this, but explicit is better)
             db.query(VerificationToken).filter(
@@ -30,12 +32,15 @@ def cleanup_unverified_accounts():
             ).delete()
             
             # Delete the user
+            deleted_ids.append(user.id)
             db.delete(user)
             deleted_count += 1
             print(f"Deleted unverified account: {user.email} (created at {user.created_at})")
         
         if deleted_count > 0:
             db.commit()
+            for user_id in deleted_ids:
+                evict_principal(user_id)
             print(f"Cleanup completed: Deleted {deleted_count} unverified account(s)")
         else:
             db.commit()
@@ -63,18 +68,13 @@ def hard_delete_pending_accounts():
         ).all()
         
         deleted_count = 0
+        deleted_ids = []
         for user in users_to_delete:
             user_email = user.email
             user_name = f"{user.first_name} {user.last_name}".strip() or user.username
             
-            # Send deletion complete email BEFORE deleting
-            try:
-                send_deletion_complete_email(
-                    email=user_email,
-                    name=user_name
-                )
-            except Exception as e:
-                print(f"Warning: Failed to send deletion complete email to {user_email}: {e}")
+            # Queue the deletion complete email; it is only sent if the deletion commits
+            queue_email(db, "deletion_complete", user_email, email=user_email, name=user_name)
             
             # Delete associated tokens
             db.query(DeletionCancellationToken).filter(
@@ -86,12 +86,15 @@ def hard_delete_pending_accounts():
             ).delete()
             
             # Delete the user (cascade will handle related data)
+            deleted_ids.append(user.id)
             db.delete(user)
             deleted_count += 1
             print(f"Hard deleted account: {user_email} (deletion was scheduled for {user.hard_delete_at})")
         
         if deleted_count > 0:
             db.commit()
+            for user_id in deleted_ids:
+                evict_principal(user_id)
             print(f"Hard delete completed: Permanently deleted {deleted_count} account(s)")
         else:
             db.commit()
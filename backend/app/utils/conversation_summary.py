@@ -0,0 +1,253 @@
+"""
+Write-side maintenance of conversation_summaries (the materialized inbox).
+
+Every message write updates the affected summary rows in the same transaction,
+so GET /messages/conversations can read the inbox without touching messages.
+rebuild_summaries() recomputes rows from the messages table for backfills and
+drift repair (see rebuild_conversation_summaries.py).
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, case, func, desc
+from app.models.user import User
+from app.models.message import Message
+from app.models.trip import TripParticipant
+from app.models.conversation_participant import ConversationParticipant
+from app.models.conversation_summary import ConversationSummary
+from app.utils.inbox import (
+    get_connected_users,
+    get_last_direct_messages,
+    get_direct_unread_counts,
+    get_member_trips,
+    get_last_trip_messages,
+    get_trip_unread_counts,
+    get_trip_read_at
+)
+from app.utils.sql import dialect_insert
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+summaries = ConversationSummary.__table__
+
+
+def _summary_key(user_id: UUID, peer_id: Optional[UUID] = None, trip_id: Optional[UUID] = None):
+    """Filter selecting one summary row."""
+    if trip_id:
+        return and_(ConversationSummary.user_id == user_id, ConversationSummary.trip_id == trip_id)
+    return and_(
+        ConversationSummary.user_id == user_id,
+        ConversationSummary.peer_user_id == peer_id,
+        ConversationSummary.trip_id.is_(None)
+    )
+
+
+def _upsert(db: Session, rows: List[dict], trip: bool, add_unread: bool):
+    """
+    Insert summary rows, or merge them into existing ones.
+
+    The last message only moves forward in time, so concurrent sends in the same
+    conversation cannot leave an older message on top. With add_unread the new
+    unread_count is added to the stored one; otherwise it replaces it.
+    """
+    if not rows:
+        return
+    stmt = dialect_insert(db, summaries).values(rows)
+    excluded = stmt.excluded
+    is_newer = or_(
+        summaries.c.last_message_at.is_(None),
+        excluded.last_message_at >= summaries.c.last_message_at
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "trip_id"] if trip else ["user_id", "peer_user_id"],
+        index_where=summaries.c.trip_id.isnot(None) if trip else summaries.c.trip_id.is_(None),
+        set_={
+            "last_message_id": case((is_newer, excluded.last_message_id), else_=summaries.c.last_message_id),
+            "last_message_at": case((is_newer, excluded.last_message_at), else_=summaries.c.last_message_at),
+            "unread_count": summaries.c.unread_count + excluded.unread_count if add_unread else excluded.unread_count,
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt)
+
+
+def _row(user_id, peer_id, trip_id, message: Optional[Message], unread_count: int) -> dict:
+    return {
+        "id": uuid4(),
+        "user_id": user_id,
+        "peer_user_id": peer_id,
+        "trip_id": trip_id,
+        "last_message_id": message.id if message else None,
+        "last_message_at": message.created_at if message else None,
+        "unread_count": unread_count
+    }
+
+
+def record_message(db: Session, message: Message):
+    """
+    Account for a newly sent message (call after flush, before commit).
+
+    1-on-1: both parties get the message on top; the receiver's unread count goes up.
+    Trip: every accepted participant gets the message on top; everyone but the sender
+    gets one more unread.
+    """
+    if message.trip_id:
+        member_ids = [user_id for (user_id,) in db.query(TripParticipant.user_id).filter(
+            TripParticipant.trip_id == message.trip_id,
+            TripParticipant.status == "accepted"
+        ).all()]
+        rows = [
+            _row(member_id, None, message.trip_id, message, 0 if member_id == message.sender_id else 1)
+            for member_id in member_ids
+        ]
+        _upsert(db, rows, trip=True, add_unread=True)
+    else:
+        _upsert(db, [
+            _row(message.sender_id, message.receiver_id, None, message, 0),
+            _row(message.receiver_id, message.sender_id, None, message, 1)
+        ], trip=False, add_unread=True)
+
+
+def record_read(db: Session, message: Message, reader_id: UUID):
+    """Account for one previously unread message being read by reader_id."""
+    key = _summary_key(reader_id, peer_id=message.sender_id, trip_id=message.trip_id)
+    db.query(ConversationSummary).filter(key).update({
+        ConversationSummary.unread_count: case(
+            (ConversationSummary.unread_count > 0, ConversationSummary.unread_count - 1),
+            else_=0
+        )
+    }, synchronize_session=False)
+
+
+def clear_summary(db: Session, user_id: UUID, peer_id: Optional[UUID] = None, trip_id: Optional[UUID] = None):
+    """Empty a user's summary after they cleared the chat."""
+    db.query(ConversationSummary).filter(_summary_key(user_id, peer_id, trip_id)).update({
+        ConversationSummary.last_message_id: None,
+        ConversationSummary.last_message_at: None,
+        ConversationSummary.unread_count: 0
+    }, synchronize_session=False)
+
+
+def remove_summary(db: Session, user_id: UUID, trip_id: UUID):
+    """Drop a user's group chat summary after they left or were removed from the trip."""
+    db.query(ConversationSummary).filter(
+        _summary_key(user_id, trip_id=trip_id)
+    ).delete(synchronize_session=False)
+
+
+def _conversation_messages(db: Session, user_id: UUID, peer_id: Optional[UUID], trip_id: Optional[UUID]):
+    """Visible, non-deleted messages of one conversation for user_id (respects cleared_at)."""
+    if trip_id:
+        query = db.query(Message).filter(Message.trip_id == trip_id)
+        cleared = ConversationParticipant.trip_id == trip_id
+    else:
+        query = db.query(Message).filter(
+            or_(
+                and_(Message.sender_id == user_id, Message.receiver_id == peer_id),
+                and_(Message.sender_id == peer_id, Message.receiver_id == user_id)
+            ),
+            Message.trip_id.is_(None)
+        )
+        cleared = and_(ConversationParticipant.other_user_id == peer_id, ConversationParticipant.trip_id.is_(None))
+
+    cleared_at = db.query(ConversationParticipant.cleared_at).filter(
+        ConversationParticipant.user_id == user_id, cleared
+    ).scalar()
+    query = query.filter(Message.deleted_for_everyone_at.is_(None))
+    if cleared_at:
+        query = query.filter(Message.created_at > cleared_at)
+    return query
+
+
+def compute_summary(db: Session, user_id: UUID, peer_id: Optional[UUID] = None,
+                    trip_id: Optional[UUID] = None) -> Tuple[Optional[Message], int]:
+    """Last message and unread count of one conversation, computed from messages."""
+    messages = _conversation_messages(db, user_id, peer_id, trip_id)
+    last_message = messages.order_by(desc(Message.created_at), desc(Message.id)).first()
+    unread = messages.filter(Message.sender_id != user_id)
+    if trip_id:
+        # Group chats: everything past the user's read cursor
+        read_at = get_trip_read_at(db, user_id, trip_id)
+        if read_at:
+            unread = unread.filter(Message.created_at > read_at)
+    else:
+        unread = unread.filter(Message.is_read == False)
+    return last_message, unread.count()
+
+
+def refresh_summary(db: Session, user_id: UUID, peer_id: Optional[UUID] = None, trip_id: Optional[UUID] = None):
+    """Recompute one summary row from messages (pending changes must be flushed)."""
+    last_message, unread = compute_summary(db, user_id, peer_id, trip_id)
+    row = _row(user_id, peer_id, trip_id, last_message, unread)
+    existing = db.query(ConversationSummary.id).filter(_summary_key(user_id, peer_id, trip_id)).first()
+    if existing:
+        db.query(ConversationSummary).filter(ConversationSummary.id == existing.id).update({
+            ConversationSummary.last_message_id: row["last_message_id"],
+            ConversationSummary.last_message_at: row["last_message_at"],
+            ConversationSummary.unread_count: unread
+        }, synchronize_session=False)
+    elif last_message:
+        db.execute(summaries.insert().values(row))
+
+
+def refresh_message_summaries(db: Session, message: Message):
+    """Recompute every summary showing message's conversation, e.g. after delete-for-everyone."""
+    if message.trip_id:
+        user_ids = [user_id for (user_id,) in db.query(ConversationSummary.user_id).filter(
+            ConversationSummary.trip_id == message.trip_id
+        ).all()]
+        for user_id in user_ids:
+            refresh_summary(db, user_id, trip_id=message.trip_id)
+    else:
+        refresh_summary(db, message.sender_id, peer_id=message.receiver_id)
+        refresh_summary(db, message.receiver_id, peer_id=message.sender_id)
+
+
+def rebuild_user_summaries(db: Session, user_id: UUID) -> int:
+    """
+    Replace all of a user's summary rows with values computed from messages.
+
+    Uses the aggregate inbox queries for every conversation, then recomputes the
+    few conversations the user has cleared. Returns the number of rows written.
+    """
+    peer_ids = [peer.id for peer in get_connected_users(db, user_id)]
+    last_direct = get_last_direct_messages(db, user_id, peer_ids)
+    direct_unread = get_direct_unread_counts(db, user_id, peer_ids)
+    trip_ids = [trip.id for trip in get_member_trips(db, user_id)]
+    last_trip = get_last_trip_messages(db, trip_ids)
+    trip_unread = get_trip_unread_counts(db, user_id, trip_ids)
+
+    cleared = db.query(ConversationParticipant).filter(
+        ConversationParticipant.user_id == user_id,
+        ConversationParticipant.cleared_at.isnot(None)
+    ).all()
+    cleared_peers = {c.other_user_id for c in cleared if c.other_user_id}
+    cleared_trips = {c.trip_id for c in cleared if c.trip_id}
+
+    rows = []
+    for peer_id in peer_ids:
+        if peer_id in cleared_peers:
+            last_message, unread = compute_summary(db, user_id, peer_id=peer_id)
+        else:
+            last_message, unread = last_direct.get(peer_id), direct_unread.get(peer_id, 0)
+        if last_message:
+            rows.append(_row(user_id, peer_id, None, last_message, unread))
+    for trip_id in trip_ids:
+        if trip_id in cleared_trips:
+            last_message, unread = compute_summary(db, user_id, trip_id=trip_id)
+        else:
+            last_message, unread = last_trip.get(trip_id), trip_unread.get(trip_id, 0)
+        if last_message:
+            rows.append(_row(user_id, None, trip_id, last_message, unread))
+
+    db.query(ConversationSummary).filter(
+        ConversationSummary.user_id == user_id
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(summaries.insert(), rows)
+    return len(rows)
+
+
+def rebuild_summaries(db: Session, user_ids: Optional[Iterable[UUID]] = None) -> int:
+    """Rebuild summaries for the given users (all users by default). Caller commits."""
+    if user_ids is None:
+        user_ids = [user_id for (user_id,) in db.query(User.id).all()]
+    return sum(rebuild_user_summaries(db, user_id) for user_id in user_ids)
@@ -0,0 +1,301 @@
+"""
+Inbox queries for GET /messages/conversations.
+
+build_inbox() reads the precomputed conversation_summaries rows (see
+app.utils.conversation_summary). The aggregate helpers compute the same data
+straight from messages in a constant number of queries, independent of how many
+connections or trips the user has; they are used to rebuild summaries.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, case, func, desc
+from app.models.user import User
+from app.models.message import Message
+from app.models.trip import Trip, TripParticipant
+from app.models.connection import UserConnection, ConnectionStatus
+from app.models.conversation_participant import ConversationParticipant
+from app.models.conversation_summary import ConversationSummary
+from app.schemas.message import ChatConversation, MessageResponse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+
+
+def get_connected_users(db: Session, user_id: UUID) -> List[User]:
+    """All users with an accepted connection to user_id (one query)."""
+    other_user_id = case(
+        (UserConnection.user_id == user_id, UserConnection.connected_user_id),
+        else_=UserConnection.user_id
+    )
+    users = db.query(User).join(
+        UserConnection, User.id == other_user_id
+    ).filter(
+        or_(
+            UserConnection.user_id == user_id,
+            UserConnection.connected_user_id == user_id
+        ),
+        UserConnection.status == ConnectionStatus.ACCEPTED.value,
+        User.id != user_id
+    ).all()
+
+    # A pair can have connection rows in both directions; keep one entry per user
+    unique_users = {}
+    for user in users:
+        unique_users.setdefault(user.id, user)
+    return list(unique_users.values())
+
+
+def get_last_direct_messages(db: Session, user_id: UUID, peer_ids: List[UUID]) -> Dict[UUID, Message]:
+    """Latest non-deleted 1-on-1 message per peer, using a window function (one query)."""
+    if not peer_ids:
+        return {}
+
+    peer_id = case(
+        (Message.sender_id == user_id, Message.receiver_id),
+        else_=Message.sender_id
+    )
+    ranked = db.query(
+        Message.id.label("id"),
+        peer_id.label("peer_id"),
+        func.row_number().over(
+            partition_by=peer_id,
+            order_by=(desc(Message.created_at), desc(Message.id))
+        ).label("rank")
+    ).filter(
+        or_(
+            and_(Message.sender_id == user_id, Message.receiver_id.in_(peer_ids)),
+            and_(Message.sender_id.in_(peer_ids), Message.receiver_id == user_id)
+        ),
+        Message.trip_id.is_(None),  # Only 1-on-1 messages
+        Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
+    ).subquery()
+
+    rows = db.query(Message, ranked.c.peer_id).join(
+        ranked, Message.id == ranked.c.id
+    ).filter(ranked.c.rank == 1).all()
+
+    return {peer: message for message, peer in rows}
+
+
+def get_direct_unread_counts(db: Session, user_id: UUID, peer_ids: List[UUID]) -> Dict[UUID, int]:
+    """Unread 1-on-1 message count per sender (one grouped query)."""
+    if not peer_ids:
+        return {}
+
+    rows = db.query(Message.sender_id, func.count(Message.id)).filter(
+        Message.receiver_id == user_id,
+        Message.sender_id.in_(peer_ids),
+        Message.is_read == False,
+        Message.trip_id.is_(None),  # Only 1-on-1 messages
+        Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
+    ).group_by(Message.sender_id).all()
+
+    return {sender_id: count for sender_id, count in rows}
+
+
+def get_member_trips(db: Session, user_id: UUID) -> List[Trip]:
+    """Trips where user_id is an accepted participant (one query)."""
+    return db.query(Trip).join(
+        TripParticipant, TripParticipant.trip_id == Trip.id
+    ).filter(
+        TripParticipant.user_id == user_id,
+        TripParticipant.status == "accepted"
+    ).all()
+
+
+def get_last_trip_messages(db: Session, trip_ids: List[UUID]) -> Dict[UUID, Message]:
+    """Latest non-deleted message per trip, using a window function (one query)."""
+    if not trip_ids:
+        return {}
+
+    ranked = db.query(
+        Message.id.label("id"),
+        func.row_number().over(
+            partition_by=Message.trip_id,
+            order_by=(desc(Message.created_at), desc(Message.id))
+        ).label("rank")
+    ).filter(
+        Message.trip_id.in_(trip_ids),
+        Message.deleted_for_everyone_at.is_(None)  # Exclude deleted messages
+    ).subquery()
+
+    messages = db.query(Message).join(
+        ranked, Message.id == ranked.c.id
+    ).filter(ranked.c.rank == 1).all()
+
+    return {message.trip_id: message for message in messages}
+
+
+# Read position of a member who has neither a cursor nor a join time: everything is unread
+NEVER_READ = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _trip_read_at():
+    """
+    When a member last read a trip chat: their read cursor, else when they joined.
+    Never NULL, so `created_at > read_at` stays an index range condition.
+    Use with _trip_memberships().
+    """
+    return func.coalesce(ConversationParticipant.last_read_at, TripParticipant.joined_at, NEVER_READ)
+
+
+def _trip_memberships(db: Session, user_id: UUID):
+    """user_id's accepted trip memberships, joined to their group chat participant row."""
+    return db.query(TripParticipant).outerjoin(
+        ConversationParticipant, and_(
+            ConversationParticipant.user_id == TripParticipant.user_id,
+            ConversationParticipant.trip_id == TripParticipant.trip_id,
+            ConversationParticipant.other_user_id.is_(None)
+        )
+    ).filter(
+        TripParticipant.user_id == user_id,
+        TripParticipant.status == "accepted"
+    )
+
+
+def get_trip_read_at(db: Session, user_id: UUID, trip_id: UUID) -> Optional[datetime]:
+    """Position of user_id's read cursor in a trip chat (see _trip_read_at)."""
+    row = _trip_memberships(db, user_id).filter(
+        TripParticipant.trip_id == trip_id
+    ).with_entities(_trip_read_at()).first()
+    return row[0] if row else None
+
+
+def get_trip_read_cursors(db: Session, trip_id: UUID) -> Dict[UUID, datetime]:
+    """Explicit read cursors of a trip's members, by user id (one query)."""
+    rows = db.query(ConversationParticipant.user_id, ConversationParticipant.last_read_at).filter(
+        ConversationParticipant.trip_id == trip_id,
+        ConversationParticipant.other_user_id.is_(None),
+        ConversationParticipant.last_read_at.isnot(None)
+    ).all()
+    return {user_id: last_read_at for user_id, last_read_at in rows}
+
+
+def get_trip_unread_counts(db: Session, user_id: UUID, trip_ids: List[UUID]) -> Dict[UUID, int]:
+    """
+    Unread message count per trip for messages not sent by user_id (one query).
+    Each count is a range scan of idx_messages_trip_visible past the user's read cursor.
+    """
+    if not trip_ids:
+        return {}
+
+    read_at = _trip_read_at()
+    unread = db.query(func.count(Message.id)).filter(
+        Message.trip_id == TripParticipant.trip_id,
+        Message.sender_id != user_id,
+        Message.deleted_for_everyone_at.is_(None),  # Exclude deleted messages
+        Message.created_at > read_at
+    ).correlate(TripParticipant, ConversationParticipant).scalar_subquery()
+
+    rows = _trip_memberships(db, user_id).filter(
+        TripParticipant.trip_id.in_(trip_ids)
+    ).with_entities(TripParticipant.trip_id, unread).all()
+
+    return {trip_id: count for trip_id, count in rows if count}
+
+
+def message_to_response(message: Message) -> MessageResponse:
+    """Convert a Message row into the last_message payload of a conversation."""
+    return MessageResponse(
+        id=str(message.id),
+        sender_id=str(message.sender_id),
+        receiver_id=str(message.receiver_id) if message.receiver_id else None,
+        trip_id=str(message.trip_id) if message.trip_id else None,
+        content=message.content if not message.deleted_for_everyone_at else "Message deleted",
+        is_delivered=message.is_delivered,
+        is_read=message.is_read,
+        deleted_for_everyone_at=message.deleted_for_everyone_at,
+        deleted_for_everyone_by=str(message.deleted_for_everyone_by) if message.deleted_for_everyone_by else None,
+        created_at=message.created_at
+    )
+
+
+def sort_conversations(conversations: List[ChatConversation]) -> List[ChatConversation]:
+    """Sort by last message time (most recent first); conversations without messages go last."""
+    conversations.sort(
+        key=lambda x: (x.last_message is not None, x.last_message.created_at if x.last_message else 0),
+        reverse=True
+    )
+    return conversations
+
+
+def _conversation(user: User = None, trip: Trip = None, summary: ConversationSummary = None,
+                  last_message: Message = None) -> ChatConversation:
+    """One inbox entry for either a peer (1-on-1) or a trip (group chat)."""
+    user_name = user_avatar = None
+    # Anonymize deleted users
+    if user and user.status == 'pending_deletion':
+        user_name = "Deleted User"
+    elif user:
+        user_name = f"{user.first_name} {user.last_name}"
+        user_avatar = user.avatar_url
+    return ChatConversation(
+        user_id=str(user.id) if user else None,
+        trip_id=str(trip.id) if trip else None,
+        user_name=user_name,
+        trip_title=trip.title if trip else None,
+        user_avatar=user_avatar,
+        last_message=message_to_response(last_message) if last_message else None,
+        unread_count=summary.unread_count if summary else 0
+    )
+
+
+def build_inbox(db: Session, user_id: UUID) -> List[ChatConversation]:
+    """
+    Build the conversation list for a user from conversation_summaries.
+
+    Two indexed queries regardless of inbox size: connected users and member trips,
+    each left-joined to the user's summary row and its last message. Conversations
+    without a summary row have no visible messages yet.
+    """
+    conversations = []
+
+    # 1-on-1 chats
+    other_user_id = case(
+        (UserConnection.user_id == user_id, UserConnection.connected_user_id),
+        else_=UserConnection.user_id
+    )
+    rows = db.query(User, ConversationSummary, Message).join(
+        UserConnection, User.id == other_user_id
+    ).outerjoin(
+        ConversationSummary, and_(
+            ConversationSummary.user_id == user_id,
+            ConversationSummary.peer_user_id == User.id,
+            ConversationSummary.trip_id.is_(None)
+        )
+    ).outerjoin(
+        Message, Message.id == ConversationSummary.last_message_id
+    ).filter(
+        or_(
+            UserConnection.user_id == user_id,
+            UserConnection.connected_user_id == user_id
+        ),
+        UserConnection.status == ConnectionStatus.ACCEPTED.value,
+        User.id != user_id
+    ).all()
+
+    # A pair can have connection rows in both directions; keep one entry per user
+    seen = set()
+    for peer, summary, last_message in rows:
+        if peer.id not in seen:
+            seen.add(peer.id)
+            conversations.append(_conversation(user=peer, summary=summary, last_message=last_message))
+
+    # Trip group chats
+    rows = db.query(Trip, ConversationSummary, Message).join(
+        TripParticipant, TripParticipant.trip_id == Trip.id
+    ).outerjoin(
+        ConversationSummary, and_(
+            ConversationSummary.user_id == user_id,
+            ConversationSummary.trip_id == Trip.id
+        )
+    ).outerjoin(
+        Message, Message.id == ConversationSummary.last_message_id
+    ).filter(
+        TripParticipant.user_id == user_id,
+        TripParticipant.status == "accepted"
+    ).all()
+
+    for trip, summary, last_message in rows:
+        conversations.append(_conversation(trip=trip, summary=summary, last_message=last_message))
+
+    return sort_conversations(conversations)
@@ -0,0 +1,84 @@
+"""
+Bounded worker pool for password hashing (bcrypt).
+
+A bcrypt hash or check burns ~200 ms of CPU. Request handlers run in a large
+threadpool, so a burst of logins could otherwise run dozens of them at once and
+starve chat traffic on every core. verify_password/get_password_hash hand the
+work to this pool instead: at most KDF_MAX_CONCURRENCY run at a time, up to
+KDF_MAX_QUEUE more wait, and anything beyond that is refused right away with
+503 and Retry-After rather than piling up behind the queue.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from fastapi import HTTPException, status
+
+KDF_MAX_CONCURRENCY = int(os.getenv("KDF_MAX_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+KDF_MAX_QUEUE = int(os.getenv("KDF_MAX_QUEUE", "32"))
+KDF_RETRY_AFTER_SECONDS = int(os.getenv("KDF_RETRY_AFTER_SECONDS", "2"))
+
+
+class KdfPoolBusy(HTTPException):
+    """The pool and its queue are full; handlers re-raise it like any HTTPException."""
+
+    def __init__(self, retry_after: int = KDF_RETRY_AFTER_SECONDS):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class KdfPool:
+    """Size-limited executor for KDF calls with queue-depth counters."""
+
+    def __init__(self, max_concurrency: int = KDF_MAX_CONCURRENCY, max_queue: int = KDF_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="kdf")
+        self._lock = threading.Lock()
+        self._pending = 0  # Accepted and not finished (running + queued)
+        self._running = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def run(self, fn: Callable, *args):
+        """Run fn(*args) in the pool and wait for its result; raises KdfPoolBusy when saturated."""
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                raise KdfPoolBusy()
+            self._pending += 1
+            self._peak_queued = max(self._peak_queued, self._pending - self.max_concurrency)
+        try:
+            return self._executor.submit(self._call, fn, args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def _call(self, fn: Callable, args: tuple):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+
+kdf_pool = KdfPool()
@@ -0,0 +1,44 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token encoding the (timestamp, id) of the last
+row a client has seen. Filtering on the (timestamp, id) row value lets Postgres
+start from a composite (…, timestamp, id) index instead of counting past
+OFFSET rows, so every page costs the same no matter how deep it is.
+"""
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+from typing import Optional, Tuple
+from uuid import UUID
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, row_id) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(timestamp_column, id_column, before: Optional[str] = None, after: Optional[str] = None):
+    """
+    Row-value condition for rows strictly older than `before` or strictly newer
+    than `after` (None when neither is given). Raises ValueError for bad cursors.
+    """
+    if before and after:
+        raise ValueError("Use either before or after, not both")
+    if before:
+        return tuple_(timestamp_column, id_column) < tuple_(*decode_cursor(before))
+    if after:
+        return tuple_(timestamp_column, id_column) > tuple_(*decode_cursor(after))
+    return None
@@ -0,0 +1,84 @@
+"""
+Password hashing policy: which algorithm and work factor new hashes use.
+
+Configured with PASSWORD_HASH_ALGORITHM (bcrypt or pbkdf2_sha256) and its cost,
+PASSWORD_BCRYPT_ROUNDS or PASSWORD_PBKDF2_ITERATIONS. Stored hashes of any
+supported algorithm and cost keep verifying; needs_rehash() tells login when a
+stored hash differs from the policy so it can be replaced while the plain password
+is at hand. Pick the cost with benchmarks/benchmark_password_hashing.py.
+
+Hash formats:
+    bcrypt          $2b$<rounds>$<salt+hash>               (bcrypt's own format)
+    pbkdf2_sha256   pbkdf2_sha256$<iterations>$<salt>$<hash>  (salt and hash base64)
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import bcrypt
+
+BCRYPT = "bcrypt"
+PBKDF2_SHA256 = "pbkdf2_sha256"
+ALGORITHMS = (BCRYPT, PBKDF2_SHA256)
+
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", BCRYPT)
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordPolicy:
+    """Hashes with one algorithm and cost; verifies every supported format."""
+
+    def __init__(self, algorithm: str = PASSWORD_HASH_ALGORITHM, bcrypt_rounds: int = PASSWORD_BCRYPT_ROUNDS,
+                 pbkdf2_iterations: int = PASSWORD_PBKDF2_ITERATIONS):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"PASSWORD_HASH_ALGORITHM must be one of {', '.join(ALGORITHMS)}, got {algorithm!r}")
+        self.algorithm = algorithm
+        self.bcrypt_rounds = bcrypt_rounds
+        self.pbkdf2_iterations = pbkdf2_iterations
+
+    def hash(self, password: str) -> str:
+        if self.algorithm == PBKDF2_SHA256:
+            salt = secrets.token_bytes(16)
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, self.pbkdf2_iterations)
+            return f"{PBKDF2_SHA256}${self.pbkdf2_iterations}${_b64encode(salt)}${_b64encode(digest)}"
+        password_bytes = password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+        return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode("utf-8")
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        """Check password against a stored hash of any supported format (False if malformed)."""
+        try:
+            if stored_hash.startswith(PBKDF2_SHA256 + "$"):
+                _, iterations, salt, digest = stored_hash.split("$")
+                candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _b64decode(salt), int(iterations))
+                return hmac.compare_digest(candidate, _b64decode(digest))
+            password_bytes = password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+            return bcrypt.checkpw(password_bytes, stored_hash.encode("utf-8"))
+        except Exception:
+            return False
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """Whether stored_hash uses another algorithm or cost than this policy."""
+        try:
+            if stored_hash.startswith(PBKDF2_SHA256 + "$"):
+                return self.algorithm != PBKDF2_SHA256 or int(stored_hash.split("$")[1]) != self.pbkdf2_iterations
+            if stored_hash.startswith("$2"):
+                return self.algorithm != BCRYPT or int(stored_hash.split("$")[2]) != self.bcrypt_rounds
+        except (IndexError, ValueError):
+            pass
+        return True
+
+
+password_policy = PasswordPolicy()
@@ -0,0 +1,199 @@
+"""
+Authenticated-user principals and the per-process cache behind get_current_user.
+
+A Principal is an immutable snapshot of the users row without the password hash,
+safe to share between requests and threads. PrincipalCache keeps the most recently
+used ones for PRINCIPAL_CACHE_TTL_SECONDS, so a request with a warm token and cache
+does not touch the database.
+
+Anything that changes a user's row (password, status, verification, deletion) must
+call evict_principal() after its commit. Eviction is applied locally right away and
+fanned out over the pub/sub bus so every worker drops its copy; the TTL bounds how
+stale an entry can get if an eviction is missed.
+
+Tokens issued with signed claims (see create_access_token) carry the display
+fields themselves; get_current_principal builds a TokenPrincipal from them and only
+checks the user's token_version, kept in the small token_versions map. Bumping
+users.token_version revokes every token issued before the bump.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+from uuid import UUID
+from app.pubsub import bus
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+USER_CHANGED = "user.changed"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only view of a user, as returned by get_current_user."""
+    id: UUID
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    phone: Optional[str]
+    avatar_url: Optional[str]
+    is_verified: bool
+    status: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    deletion_requested_at: Optional[datetime]
+    deleted_at: Optional[datetime]
+    hard_delete_at: Optional[datetime]
+    token_version: int = 0
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            phone=user.phone,
+            avatar_url=user.avatar_url,
+            is_verified=user.is_verified,
+            status=user.status,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            deletion_requested_at=user.deletion_requested_at,
+            deleted_at=user.deleted_at,
+            hard_delete_at=user.hard_delete_at,
+            token_version=user.token_version or 0
+        )
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Identity and display fields of a user, read from signed token claims."""
+    id: UUID
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    avatar_url: Optional[str]
+    is_verified: bool
+    status: str
+    token_version: int
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "TokenPrincipal":
+        return cls(
+            id=UUID(claims["sub"]),
+            username=claims["username"],
+            email=claims["email"],
+            first_name=claims["first_name"],
+            last_name=claims["last_name"],
+            avatar_url=claims["avatar_url"],
+            is_verified=claims["is_verified"],
+            status=claims["status"],
+            token_version=claims["ver"]
+        )
+
+
+class PrincipalCache:
+    """Thread-safe LRU of per-user values (principals, token versions), each valid for ttl seconds."""
+
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # user id -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Bumped by every eviction; a load that started before one is not cached
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def get_or_load(self, user_id, load: Callable[[], object]):
+        """Cached value for user_id, else load() it (None: no such user, not cached)."""
+        value = self.get(user_id)
+        if value is not None:
+            return value
+        with self._lock:
+            generation = self._generation
+        value = load()
+        if value is not None:
+            self.put(user_id, value, generation)
+        return value
+
+    def put(self, user_id, value, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # Evicted while loading: the loaded row may predate the change
+            key = str(user_id)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(str(user_id), None) is not None:
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def dispatch(self, channels: List[str], event: dict):
+        """Bus handler: drop entries of users changed by any worker."""
+        if event.get("type") == USER_CHANGED:
+            self.evict(event["data"]["user_id"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions
+            }
+
+
+principal_cache = PrincipalCache()
+# user id -> users.token_version, for tokens with signed claims
+token_versions = PrincipalCache()
+
+
+def evict_principal(user_id):
+    """Forget a user's cached principal and token version in every worker (call after committing the change)."""
+    principal_cache.evict(user_id)
+    token_versions.evict(user_id)
+    bus.publish([], {"type": USER_CHANGED, "data": {"user_id": str(user_id)}})
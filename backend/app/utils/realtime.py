@@ -0,0 +1,230 @@
+"""
+Real-time push for chat events over WebSockets.
+
+Each open socket subscribes to its user's channel (1-on-1 messages, read
+receipts, trip invitations) and to one channel per trip group chat. Route
+handlers publish events through the pub/sub bus (app.pubsub) so they reach
+sockets held by any worker; each process's ConnectionManager receives them via
+dispatch() and hands them to the sockets' event loops, where a per-socket writer
+task sends them. Publish only after the database commit so clients never see
+writes that were rolled back.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+from fastapi import WebSocket
+from app.models.message import Message
+from app.schemas.message import MessageResponse
+from app.pubsub import bus
+
+# Events buffered per socket before it is considered too slow and disconnected
+SOCKET_QUEUE_SIZE = 256
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def trip_channel(trip_id) -> str:
+    return f"trip:{trip_id}"
+
+
+def message_channels(message: Message) -> List[str]:
+    """Channels that see events about message: the trip, or both 1-on-1 parties."""
+    if message.trip_id:
+        return [trip_channel(message.trip_id)]
+    return [user_channel(message.sender_id), user_channel(message.receiver_id)]
+
+
+class Subscriber:
+    """One open socket: its channels and a bounded queue drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, user_id: str, channels: Iterable[str]):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.channels: Set[str] = set(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SOCKET_QUEUE_SIZE)
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+
+    def offer(self, event: dict):
+        """Queue an event (event loop thread only); drop the socket if it can't keep up."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Discard the backlog and close; the client re-syncs over HTTP when it reconnects
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def run(self):
+        """Send queued events until the socket falls too far behind."""
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                await self.websocket.close(code=1013)  # Try again later
+                return
+            await self.websocket.send_json(event)
+
+
+class ConnectionManager:
+    """Registry of this process's open sockets, by channel and by user."""
+
+    def __init__(self):
+        self._channels: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._users: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def connect(self, websocket: WebSocket, user_id: str, channels: Iterable[str]) -> Subscriber:
+        """Register an accepted socket (call from the event loop that serves it)."""
+        subscriber = Subscriber(websocket, str(user_id), channels)
+        with self._lock:
+            self._users[subscriber.user_id].add(subscriber)
+            for channel in subscriber.channels:
+                self._channels[channel].add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        with self._lock:
+            self._discard(self._users, subscriber.user_id, subscriber)
+            for channel in subscriber.channels:
+                self._discard(self._channels, channel, subscriber)
+
+    def subscribe_user(self, user_id: str, channel: str):
+        """Add channel to all of a user's open sockets, e.g. after they join a trip."""
+        with self._lock:
+            for subscriber in self._users.get(str(user_id), ()):
+                subscriber.channels.add(channel)
+                self._channels[channel].add(subscriber)
+
+    def unsubscribe_user(self, user_id: str, channel: str):
+        with self._lock:
+            for subscriber in self._users.get(str(user_id), ()):
+                subscriber.channels.discard(channel)
+                self._discard(self._channels, channel, subscriber)
+
+    def close_channel(self, channel: str):
+        """Unsubscribe every socket from channel, e.g. after the trip was deleted."""
+        with self._lock:
+            for subscriber in self._channels.pop(channel, ()):
+                subscriber.channels.discard(channel)
+
+    def deliver(self, channels: Iterable[str], event: dict):
+        """Send event to every local socket on any of channels. Safe to call from any thread."""
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscriber in targets:
+            if not subscriber.loop.is_closed():
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+
+    def dispatch(self, channels: List[str], event: dict):
+        """Bus handler: apply trip membership changes to local sockets, then deliver."""
+        data = event.get("data") or {}
+        if event.get("type") == "trip.member_joined":
+            self.subscribe_user(data["user_id"], trip_channel(data["trip_id"]))
+        self.deliver(channels, event)
+        if event.get("type") == "trip.member_left":
+            self.unsubscribe_user(data["user_id"], trip_channel(data["trip_id"]))
+        elif event.get("type") == "trip.deleted":
+            self.close_channel(trip_channel(data["trip_id"]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": sum(len(sockets) for sockets in self._users.values()),
+                "users": len(self._users),
+                "channels": len(self._channels)
+            }
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[Subscriber]], key: str, subscriber: Subscriber):
+        members = index.get(key)
+        if members is not None:
+            members.discard(subscriber)
+            if not members:
+                del index[key]
+
+
+manager = ConnectionManager()
+
+
+def publish_message_created(message: Message, response: MessageResponse):
+    bus.publish(message_channels(message), {
+        "type": "message.created",
+        "data": response.model_dump(mode="json")
+    })
+
+
+def publish_message_deleted(message: Message):
+    bus.publish(message_channels(message), {
+        "type": "message.deleted",
+        "data": {
+            "id": str(message.id),
+            "sender_id": str(message.sender_id),
+            "receiver_id": str(message.receiver_id) if message.receiver_id else None,
+            "trip_id": str(message.trip_id) if message.trip_id else None,
+            "deleted_for_everyone_at": message.deleted_for_everyone_at.isoformat(),
+            "deleted_for_everyone_by": str(message.deleted_for_everyone_by)
+        }
+    })
+
+
+def publish_messages_read(reader_id, message_ids: List[str], peer_id=None, trip_id=None, up_to_message_id=None):
+    """
+    Read receipts. 1-on-1: tell the sender (peer_id) and the reader's other devices;
+    trip: tell the group. up_to_message_id is the reader's new high-water mark (group
+    reads only move a cursor, so message_ids is empty for them).
+    """
+    if not message_ids and not up_to_message_id:
+        return
+    if trip_id:
+        channels = [trip_channel(trip_id)]
+    else:
+        channels = [user_channel(reader_id), user_channel(peer_id)]
+    bus.publish(channels, {
+        "type": "message.read",
+        "data": {
+            "reader_id": str(reader_id),
+            "trip_id": str(trip_id) if trip_id else None,
+            "message_ids": message_ids,
+            "up_to_message_id": str(up_to_message_id) if up_to_message_id else None
+        }
+    })
+
+
+def publish_trip_member_joined(trip_id, user_id):
+    """The user's sockets join the trip channel, then the group hears about it."""
+    bus.publish([trip_channel(trip_id), user_channel(user_id)], {
+        "type": "trip.member_joined",
+        "data": {"trip_id": str(trip_id), "user_id": str(user_id)}
+    })
+
+
+def publish_trip_member_left(trip_id, user_id, reason: str):
+    """reason: left, removed or declined. The user's sockets leave the trip channel afterwards."""
+    bus.publish([trip_channel(trip_id), user_channel(user_id)], {
+        "type": "trip.member_left",
+        "data": {"trip_id": str(trip_id), "user_id": str(user_id), "reason": reason}
+    })
+
+
+def publish_trip_invited(trip_id, user_ids: List[str]):
+    if not user_ids:
+        return
+    bus.publish([user_channel(user_id) for user_id in user_ids], {
+        "type": "trip.invited",
+        "data": {"trip_id": str(trip_id)}
+    })
+
+
+def publish_trip_deleted(trip_id):
+    bus.publish([trip_channel(trip_id)], {
+        "type": "trip.deleted",
+        "data": {"trip_id": str(trip_id)}
+    })
@@ -0,0 +1,121 @@
+"""
+Settlement planner: the payments that bring every member's balance to zero.
+
+Input is net balances in integer cents (see app/utils/balances.py): positive
+members are owed, negative members owe, and the nets sum to zero. Output is a
+list of transfers from debtors to creditors.
+
+- greedy: repeatedly settle the largest debtor against the largest creditor.
+  Each transfer zeroes at least one of them, so a group of n members needs at
+  most n - 1 transfers. O(n log n).
+- exact: the fewest transfers possible. A group that splits into k disjoint
+  subgroups each summing to zero needs n - k transfers, so this finds the
+  largest such partition with a dynamic program over subsets (O(2^n * n)) and
+  settles each subgroup greedily. Only for groups of up to
+  SETTLEMENT_EXACT_MAX_MEMBERS members with a non-zero balance.
+- auto: exact when the group is small enough, greedy otherwise.
+"""
+import heapq
+import os
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+SETTLEMENT_EXACT_MAX_MEMBERS = int(os.getenv("SETTLEMENT_EXACT_MAX_MEMBERS", "12"))
+
+PLAN_MODES = ("auto", "greedy", "exact")
+
+
+@dataclass(frozen=True)
+class Transfer:
+    from_user_id: Hashable
+    to_user_id: Hashable
+    amount_cents: int
+
+
+def _open_balances(balances: Dict[Hashable, int]) -> List[Tuple[Hashable, int]]:
+    """Non-zero balances in a stable order; raises ValueError unless they sum to zero."""
+    if sum(balances.values()) != 0:
+        raise ValueError("Balances must sum to zero")
+    return sorted(((user_id, cents) for user_id, cents in balances.items() if cents), key=lambda item: str(item[0]))
+
+
+def _settle_greedy(members: Sequence[Tuple[Hashable, int]]) -> List[Transfer]:
+    # Max-heaps of (amount, tie-break, user id); the tie-break keeps plans deterministic
+    creditors = [(-cents, str(user_id), user_id) for user_id, cents in members if cents > 0]
+    debtors = [(cents, str(user_id), user_id) for user_id, cents in members if cents < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, credit_key, creditor = heapq.heappop(creditors)
+        debt, debt_key, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append(Transfer(from_user_id=debtor, to_user_id=creditor, amount_cents=amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, credit_key, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debt_key, debtor))
+    return transfers
+
+
+def plan_greedy(balances: Dict[Hashable, int]) -> List[Transfer]:
+    """At most n - 1 transfers, largest debtor to largest creditor first."""
+    return _settle_greedy(_open_balances(balances))
+
+
+def plan_exact(balances: Dict[Hashable, int]) -> List[Transfer]:
+    """The fewest transfers; raises ValueError beyond SETTLEMENT_EXACT_MAX_MEMBERS open balances."""
+    members = _open_balances(balances)
+    count = len(members)
+    if count > SETTLEMENT_EXACT_MAX_MEMBERS:
+        raise ValueError(f"Exact planning supports up to {SETTLEMENT_EXACT_MAX_MEMBERS} members with a balance")
+    if not count:
+        return []
+
+    full = (1 << count) - 1
+    totals = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        totals[mask] = totals[mask ^ low] + members[low.bit_length() - 1][1]
+
+    # groups[mask]: most zero-sum subgroups that mask's members can be split into
+    # (counting the leftover members as one more group when they sum to zero)
+    groups = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        best = 0
+        rest = mask
+        while rest:
+            low = rest & -rest
+            best = max(best, groups[mask ^ low])
+            rest ^= low
+        groups[mask] = best + (1 if totals[mask] == 0 else 0)
+
+    # Walk back down the DP, cutting a subgroup off at every zero-sum mask on the way
+    transfers = []
+    mask, start = full, full
+    while mask:
+        rest = mask
+        while rest:
+            low = rest & -rest
+            if groups[mask ^ low] + (1 if totals[mask] == 0 else 0) == groups[mask]:
+                break
+            rest ^= low
+        mask ^= low
+        if totals[mask] == 0:
+            subgroup = start ^ mask
+            transfers.extend(_settle_greedy([members[i] for i in range(count) if subgroup >> i & 1]))
+            start = mask
+    return transfers
+
+
+def plan_settlement(balances: Dict[Hashable, int], mode: str = "auto") -> Tuple[str, List[Transfer]]:
+    """(mode used, transfers) for the given net balances. Raises ValueError for bad input."""
+    if mode not in PLAN_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(PLAN_MODES)}")
+    if mode == "auto":
+        open_count = sum(1 for cents in balances.values() if cents)
+        mode = "exact" if open_count <= SETTLEMENT_EXACT_MAX_MEMBERS else "greedy"
+    if mode == "exact":
+        return mode, plan_exact(balances)
+    return mode, plan_greedy(balances)
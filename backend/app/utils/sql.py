@@ -0,0 +1,16 @@
+"""
+Small SQL helpers shared by the write paths that need dialect-specific statements.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(db: Session, table):
+    """
+    INSERT construct for the session's dialect, so callers can use
+    on_conflict_do_update / on_conflict_do_nothing (Postgres in production,
+    SQLite in the query-level tests).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
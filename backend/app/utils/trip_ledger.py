@@ -0,0 +1,120 @@
+"""
+Write-side maintenance of trip_member_balances (the per-trip balance ledger).
+
+Every write that moves a trip's balances applies its change as deltas in the same
+transaction: creating an expense adds the payer's amount and each member's share,
+voiding it or paying the settlement that covers it subtracts them, and editing it
+subtracts the old entry and adds the new one. rebuild_trip_ledger() recomputes
+rows from expenses and expense_splits for backfills and drift repair (see
+rebuild_trip_ledger.py).
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.trip import Trip
+from app.models.expense import Expense, ExpenseSplit
+from app.models.trip_member_balance import TripMemberBalance
+from app.utils.balances import aggregate_balances
+from app.utils.sql import dialect_insert
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+ledger = TripMemberBalance.__table__
+
+
+class LedgerEntry(NamedTuple):
+    """What one expense contributes to the ledger."""
+    payer_user_id: UUID
+    amount_cents: int
+    shares: Tuple[Tuple[UUID, int], ...]  # (user id, share cents)
+
+
+class LedgerDrift(NamedTuple):
+    trip_id: UUID
+    user_id: UUID
+    ledger: Tuple[int, int]  # (paid, share) stored in the ledger
+    actual: Tuple[int, int]  # (paid, share) computed from expenses
+
+
+def expense_entries(db: Session, expenses: Iterable[Expense]) -> List[LedgerEntry]:
+    """Ledger entries of the given ACTIVE expenses, loading their splits in one query."""
+    expenses = [expense for expense in expenses if expense.status == 'ACTIVE']
+    if not expenses:
+        return []
+    shares: Dict[UUID, list] = {expense.id: [] for expense in expenses}
+    for split in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id.in_(list(shares))).all():
+        shares[split.expense_id].append((split.user_id, split.share_cents))
+    return [
+        LedgerEntry(expense.payer_user_id, expense.amount_cents, tuple(shares[expense.id]))
+        for expense in expenses
+    ]
+
+
+def apply_entries(db: Session, trip_id: UUID, added: Iterable[LedgerEntry] = (),
+                  removed: Iterable[LedgerEntry] = ()):
+    """Add the added entries to the trip's ledger rows and subtract the removed ones. Caller commits."""
+    deltas: Dict[UUID, list] = {}
+    for entries, sign in ((added, 1), (removed, -1)):
+        for entry in entries:
+            deltas.setdefault(entry.payer_user_id, [0, 0])[0] += sign * entry.amount_cents
+            for user_id, share_cents in entry.shares:
+                deltas.setdefault(user_id, [0, 0])[1] += sign * share_cents
+
+    # Rows in user id order, so concurrent writers to one trip lock them in the same order
+    rows = [
+        {"trip_id": trip_id, "user_id": user_id, "paid_cents": paid_cents, "share_cents": share_cents}
+        for user_id, (paid_cents, share_cents) in sorted(deltas.items(), key=lambda item: str(item[0]))
+        if paid_cents or share_cents
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db, ledger).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["trip_id", "user_id"],
+        set_={
+            "paid_cents": ledger.c.paid_cents + stmt.excluded.paid_cents,
+            "share_cents": ledger.c.share_cents + stmt.excluded.share_cents,
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt)
+
+
+def rebuild_trip_ledger(db: Session, trip_ids: Optional[Iterable[UUID]] = None,
+                        repair: bool = True) -> List[LedgerDrift]:
+    """
+    Compare the trips' ledger rows (all trips by default) with totals computed from
+    expenses and return every member whose row is off. With repair, the trips' rows
+    are replaced by the computed ones. Caller commits.
+    """
+    if trip_ids is None:
+        trip_ids = [trip_id for (trip_id,) in db.query(Trip.id).all()]
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return []
+
+    actual = {
+        (trip_id, balance.user_id): (balance.paid_cents, balance.share_cents)
+        for trip_id, balances in aggregate_balances(db, trip_ids).items()
+        for balance in balances
+    }
+    stored = {
+        (row.trip_id, row.user_id): (row.paid_cents, row.share_cents)
+        for row in db.query(TripMemberBalance).filter(TripMemberBalance.trip_id.in_(trip_ids)).all()
+    }
+    drift = [
+        LedgerDrift(trip_id, user_id, stored.get((trip_id, user_id), (0, 0)), actual.get((trip_id, user_id), (0, 0)))
+        for trip_id, user_id in sorted(set(actual) | set(stored), key=lambda key: (str(key[0]), str(key[1])))
+        if stored.get((trip_id, user_id), (0, 0)) != actual.get((trip_id, user_id), (0, 0))
+    ]
+
+    if repair:
+        db.query(TripMemberBalance).filter(
+            TripMemberBalance.trip_id.in_(trip_ids)
+        ).delete(synchronize_session=False)
+        rows = [
+            {"trip_id": trip_id, "user_id": user_id, "paid_cents": paid_cents, "share_cents": share_cents}
+            for (trip_id, user_id), (paid_cents, share_cents) in actual.items()
+        ]
+        if rows:
+            db.execute(ledger.insert(), rows)
+    return drift
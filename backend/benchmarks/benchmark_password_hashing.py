@@ -0,0 +1,66 @@
+"""
+Benchmark: per-hash latency of each candidate password hashing setting.
+
+Times hashing and verification for bcrypt rounds and PBKDF2-SHA256 iteration
+counts on this machine, plus the login latency to expect once KDF_MAX_CONCURRENCY
+checks run in parallel and the queue holds more. Pick the highest cost whose
+"login p99" column fits the login latency budget, then set PASSWORD_HASH_ALGORITHM
+and PASSWORD_BCRYPT_ROUNDS / PASSWORD_PBKDF2_ITERATIONS; existing hashes are
+upgraded on each user's next login.
+
+Run with:
+    python benchmarks/benchmark_password_hashing.py
+    BENCHMARK_RUNS=20 python benchmarks/benchmark_password_hashing.py
+"""
+import sys
+import os
+import time
+import statistics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.password_policy import PasswordPolicy, BCRYPT, PBKDF2_SHA256
+from app.utils.kdf_pool import KDF_MAX_CONCURRENCY, KDF_MAX_QUEUE
+
+BCRYPT_ROUNDS = [10, 11, 12, 13, 14]
+PBKDF2_ITERATIONS = [310000, 600000, 1000000]
+RUNS = int(os.getenv("BENCHMARK_RUNS", "10"))
+PASSWORD = "correct horse battery staple"
+
+
+def measure(fn) -> list:
+    """Milliseconds per call over RUNS calls."""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(timings: list, fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    candidates = [(f"bcrypt rounds={rounds}", PasswordPolicy(BCRYPT, bcrypt_rounds=rounds)) for rounds in BCRYPT_ROUNDS]
+    candidates += [(f"pbkdf2 iterations={iterations}", PasswordPolicy(PBKDF2_SHA256, pbkdf2_iterations=iterations))
+                   for iterations in PBKDF2_ITERATIONS]
+
+    # A login waits for the checks queued ahead of it, KDF_MAX_CONCURRENCY at a time
+    waves = 1 + KDF_MAX_QUEUE // max(KDF_MAX_CONCURRENCY, 1)
+    print(f"{RUNS} runs per setting; KDF pool: {KDF_MAX_CONCURRENCY} concurrent, {KDF_MAX_QUEUE} queued "
+          f"(full queue = {waves} verify times)\n")
+    print(f"{'setting':>26} | {'hash ms':>8} | {'verify ms':>9} | {'verify p99':>10} | {'login p99 (full queue)':>22}")
+    print("-" * 88)
+    for label, policy in candidates:
+        hashed = policy.hash(PASSWORD)
+        hash_ms = statistics.median(measure(lambda: policy.hash(PASSWORD)))
+        verify = measure(lambda: policy.verify(PASSWORD, hashed))
+        verify_p99 = percentile(verify, 0.99)
+        print(f"{label:>26} | {hash_ms:>8.1f} | {statistics.median(verify):>9.1f} | {verify_p99:>10.1f} | "
+              f"{verify_p99 * waves:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: settlement planner latency and plan size for groups of 2-50 members.
+
+For each group size, times greedy and (up to SETTLEMENT_EXACT_MAX_MEMBERS open
+balances, or BENCHMARK_EXACT_MAX) exact planning over random balances, and
+reports how many transfers each needs. Use it to pick SETTLEMENT_EXACT_MAX_MEMBERS:
+the largest size whose exact p99 fits the request latency budget.
+
+Run with:
+    python benchmarks/benchmark_settlement_plan.py
+    BENCHMARK_RUNS=50 BENCHMARK_EXACT_MAX=16 python benchmarks/benchmark_settlement_plan.py
+"""
+import sys
+import os
+import random
+import time
+import statistics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils import settlement_plan
+from app.utils.settlement_plan import SETTLEMENT_EXACT_MAX_MEMBERS, plan_greedy, plan_exact
+
+GROUP_SIZES = [2, 3, 4, 6, 8, 10, 12, 14, 16, 20, 30, 40, 50]
+RUNS = int(os.getenv("BENCHMARK_RUNS", "20"))
+EXACT_MAX = int(os.getenv("BENCHMARK_EXACT_MAX", str(SETTLEMENT_EXACT_MAX_MEMBERS)))
+
+
+def random_balances(rng: random.Random, members: int) -> dict:
+    """Nets of a trip where random members paid random expenses split among everyone."""
+    nets = [0] * members
+    for _ in range(members * 3):
+        amount = rng.randint(100, 50000)
+        nets[rng.randrange(members)] += amount
+        share, remainder = divmod(amount, members)
+        for index in range(members):
+            nets[index] -= share + (remainder if index == 0 else 0)
+    return {f"member{index}": cents for index, cents in enumerate(nets)}
+
+
+def measure(plan, cases: list) -> tuple:
+    """(milliseconds per plan, transfers per plan)."""
+    timings, sizes = [], []
+    for balances in cases:
+        start = time.perf_counter()
+        transfers = plan(balances)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(transfers))
+    return timings, sizes
+
+
+def percentile(timings: list, fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    settlement_plan.SETTLEMENT_EXACT_MAX_MEMBERS = max(EXACT_MAX, SETTLEMENT_EXACT_MAX_MEMBERS)
+    rng = random.Random(42)
+    print(f"{RUNS} random trips per size; exact up to {EXACT_MAX} members "
+          f"(SETTLEMENT_EXACT_MAX_MEMBERS={SETTLEMENT_EXACT_MAX_MEMBERS})\n")
+    print(f"{'members':>7} | {'greedy ms':>9} | {'greedy p99':>10} | {'transfers':>9} | "
+          f"{'exact ms':>8} | {'exact p99':>9} | {'transfers':>9}")
+    print("-" * 80)
+    for members in GROUP_SIZES:
+        cases = [random_balances(rng, members) for _ in range(RUNS)]
+        greedy, greedy_sizes = measure(plan_greedy, cases)
+        line = (f"{members:>7} | {statistics.median(greedy):>9.3f} | {percentile(greedy, 0.99):>10.3f} | "
+                f"{statistics.mean(greedy_sizes):>9.1f}")
+        if members <= EXACT_MAX:
+            exact, exact_sizes = measure(plan_exact, cases)
+            line += (f" | {statistics.median(exact):>8.2f} | {percentile(exact, 0.99):>9.2f} | "
+                     f"{statistics.mean(exact_sizes):>9.1f}")
+        else:
+            line += f" | {'-':>8} | {'-':>9} | {'-':>9}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import uvicorn
+import anyio
 from dotenv import load_dotenv
 import os
 
@@ -26,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],  # Keyset pagination cursor; KDF pool back-off
 )
 
 app.add_middleware(
@@ -42,6 +44,57 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Database connection pool health check
+@app.get("/health/db")
+def database_health_check():
+    from sqlalchemy import text
+    from fastapi.responses import JSONResponse
+    from app.database import engine, get_pool_status
+
+    # Read pool counters before the probe so it doesn't count itself
+    pool_status = get_pool_status()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"Database health check failed: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "pool": pool_status}
+        )
+
+    return {
+        "status": "healthy",
+        "pool": pool_status
+    }
+
+# Real-time (WebSocket) health check
+@app.get("/health/realtime")
+def realtime_health_check():
+    from app.pubsub import bus
+    from app.utils.realtime import manager
+    return {
+        "sockets": manager.stats(),
+        "bus": bus.stats()
+    }
+
+# Auth principal cache and password hashing pool stats
+@app.get("/health/auth")
+def auth_health_check():
+    from app.utils.principal import principal_cache, token_versions
+    from app.utils.kdf_pool import kdf_pool
+    return {
+        "principal_cache": principal_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "kdf_pool": kdf_pool.stats()
+    }
+
+# Email outbox queue depth and delivery counters
+@app.get("/health/email")
+def email_health_check():
+    from app.mail import outbox_sender
+    return outbox_sender.stats()
+
 # Import routes
 from app.controllers.auth import router as auth_router
 from app.controllers.connection import router as connection_router
@@ -49,6 +102,7 @@ from app.controllers.message import router as message_router
 from app.controllers.trip import router as trip_router
 from app.controllers.contact import router as contact_router
 from app.controllers.expense import router as expense_router, settlement_router
+from app.controllers.realtime import router as realtime_router
 
 # Include routers
 app.include_router(auth_router)
@@ -58,6 +112,7 @@ app.include_router(trip_router)
 app.include_router(contact_router)
 app.include_router(expense_router)
 app.include_router(settlement_router)
+app.include_router(realtime_router)
 
 # Root endpoint
 @app.get("/")
@@ -90,16 +145,53 @@ scheduler.add_job(
     replace_existing=True
 )
 
+# Send queued emails; max_instances=1 keeps ticks from overlapping in this worker,
+# and SKIP LOCKED keeps workers from claiming each other's rows
+from app.mail import outbox_sender
+from app.mail.outbox import OUTBOX_POLL_SECONDS
+scheduler.add_job(
+    outbox_sender.run_once,
+    trigger=IntervalTrigger(seconds=OUTBOX_POLL_SECONDS),
+    id='send_outbox_emails',
+    name='Send queued emails',
+    max_instances=1,
+    coalesce=True,
+    replace_existing=True
+)
+
 # Start scheduler when app starts
 @app.on_event("startup")
 async def startup_event():
+    # Route handlers are sync and run in anyio's worker threadpool (default 40 threads).
+    # Keep it at least as large as the DB pool so requests don't queue for a thread.
+    thread_limit = int(os.getenv("THREADPOOL_SIZE", "40"))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = thread_limit
+    
+    # Deliver pub/sub events (from this and other workers) to this worker's sockets
+    from app.pubsub import bus
+    from app.utils.realtime import manager
+    from app.utils.principal import principal_cache, token_versions
+    bus.subscribe(manager.dispatch)
+    # Drop cached principals and token versions when any worker changes a user
+    bus.subscribe(principal_cache.dispatch)
+    bus.subscribe(token_versions.dispatch)
+    # Drop cached trip balances when any worker writes an expense or pays a settlement
+    from app.utils.balances import trip_balance_cache
+    bus.subscribe(trip_balance_cache.dispatch)
+    bus.start()
+    
     scheduler.start()
     print("Background scheduler started:")
     print("  - Cleanup task will run every 30 minutes")
     print("  - Hard delete task will run every hour")
+    print(f"  - Email outbox is sent every {OUTBOX_POLL_SECONDS}s via {outbox_sender.transport.name}")
+    print(f"Request threadpool size: {thread_limit}")
+    print(f"Pub/sub backend: {bus.name}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    from app.pubsub import bus
+    bus.stop()
     scheduler.shutdown()
     print("Background scheduler stopped")
 
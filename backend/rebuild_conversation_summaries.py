@@ -0,0 +1,40 @@
+"""
+Backfill / rebuild conversation_summaries from the messages table.
+Run after add_conversation_summaries.py, or at any time to repair drift:
+    python rebuild_conversation_summaries.py                # all users
+    python rebuild_conversation_summaries.py <user_id> ...  # specific users
+"""
+import sys
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.user import User
+from app.utils.conversation_summary import rebuild_summaries
+
+BATCH_SIZE = 200
+
+def rebuild(user_ids=None):
+    """Rebuild summaries, committing every BATCH_SIZE users."""
+    db = SessionLocal()
+    try:
+        if user_ids is None:
+            user_ids = [user_id for (user_id,) in db.query(User.id).all()]
+
+        total_rows = 0
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            total_rows += rebuild_summaries(db, batch)
+            db.commit()
+            print(f"Rebuilt {min(start + BATCH_SIZE, len(user_ids))}/{len(user_ids)} users...")
+
+        print(f"✅ Rebuilt {total_rows} conversation summaries for {len(user_ids)} user(s)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding conversation summaries: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild([UUID(arg) for arg in sys.argv[1:]] or None)
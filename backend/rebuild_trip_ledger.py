@@ -0,0 +1,65 @@
+"""
+Backfill / rebuild trip_member_balances from the expenses and expense_splits tables,
+reporting every member whose ledger row had drifted. Run after
+add_trip_member_balances.py, or at any time to check or repair the ledger:
+    python rebuild_trip_ledger.py                  # all trips
+    python rebuild_trip_ledger.py <trip_id> ...    # specific trips
+    python rebuild_trip_ledger.py --check [...]    # report drift only, change nothing
+Exits with status 2 when --check finds drift.
+"""
+import sys
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.trip import Trip
+from app.utils.balances import evict_trip_balances
+from app.utils.trip_ledger import rebuild_trip_ledger
+
+BATCH_SIZE = 200
+
+def rebuild(trip_ids=None, repair=True):
+    """Rebuild (or with repair=False, only check) the ledger, committing every BATCH_SIZE trips."""
+    db = SessionLocal()
+    try:
+        if trip_ids is None:
+            trip_ids = [trip_id for (trip_id,) in db.query(Trip.id).all()]
+
+        drift = []
+        for start in range(0, len(trip_ids), BATCH_SIZE):
+            batch = trip_ids[start:start + BATCH_SIZE]
+            batch_drift = rebuild_trip_ledger(db, batch, repair=repair)
+            if repair:
+                db.commit()
+                for trip_id in {entry.trip_id for entry in batch_drift}:
+                    evict_trip_balances(trip_id)
+            else:
+                db.rollback()
+            drift.extend(batch_drift)
+            print(f"{'Rebuilt' if repair else 'Checked'} {min(start + BATCH_SIZE, len(trip_ids))}/{len(trip_ids)} trips...")
+
+        for entry in drift:
+            (ledger_paid, ledger_share), (paid, share) = entry.ledger, entry.actual
+            print(f"  drift: trip {entry.trip_id} user {entry.user_id}: "
+                  f"ledger paid={ledger_paid} share={ledger_share}, expenses paid={paid} share={share}")
+        drifted_trips = len({entry.trip_id for entry in drift})
+        if repair:
+            print(f"✅ Rebuilt the balance ledger of {len(trip_ids)} trip(s); "
+                  f"repaired {len(drift)} drifted row(s) in {drifted_trips} trip(s)")
+        else:
+            print(f"{'❌' if drift else '✅'} {len(drift)} drifted row(s) in {drifted_trips} of {len(trip_ids)} trip(s)")
+        return drift
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding the trip balance ledger: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    check_only = "--check" in args
+    trip_ids = [UUID(arg) for arg in args if arg != "--check"] or None
+    drift = rebuild(trip_ids, repair=not check_only)
+    if check_only and drift:
+        sys.exit(2)
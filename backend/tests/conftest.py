@@ -0,0 +1,73 @@
+"""
+Shared fixtures: an in-memory SQLite session for query-level tests.
+Tables that use Postgres-only column types (JSONB) are skipped.
+
+Integration tests that need a real Postgres use the pg_engine fixture, which
+skips unless TEST_DATABASE_URL points at a disposable database.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.database import Base
+import app.models  # noqa: F401  (register all models on Base.metadata)
+
+
+def _sqlite_compatible_tables():
+    return [
+        table for table in Base.metadata.sorted_tables
+        if not any(isinstance(column.type, JSONB) for column in table.columns)
+    ]
+
+
+@pytest.fixture
+def db():
+    """Fresh in-memory SQLite session per test."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine, tables=_sqlite_compatible_tables())
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def pg_engine():
+    """Engine for TEST_DATABASE_URL (Postgres); skips the test when unset."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    engine = create_engine(url)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@contextmanager
+def count_queries(session):
+    """Count SQL statements executed on the session's engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,87 @@
+"""
+Small row factories for query-level tests (see conftest.db).
+"""
+from datetime import datetime, timedelta
+from app.models.user import User
+from app.models.connection import UserConnection, ConnectionStatus
+from app.models.trip import Trip, TripParticipant
+from app.models.message import Message
+from app.models.expense import Expense, ExpenseSplit
+
+# SQLite hands back naive datetimes, so factories use naive UTC throughout
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def make_user(db, username, **fields):
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        password_hash="not-a-real-hash",
+        first_name=fields.pop("first_name", username.title()),
+        last_name=fields.pop("last_name", "Tester"),
+        is_verified=True,
+        status=fields.pop("status", "active"),
+        **fields
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+def connect(db, user, other, status=ConnectionStatus.ACCEPTED.value):
+    connection = UserConnection(user_id=user.id, connected_user_id=other.id, status=status)
+    db.add(connection)
+    db.flush()
+    return connection
+
+
+def make_trip(db, creator, members=(), title="Trip", **fields):
+    trip = Trip(user_id=creator.id, title=title, **fields)
+    db.add(trip)
+    db.flush()
+    db.add(TripParticipant(trip_id=trip.id, user_id=creator.id, role="creator", status="accepted"))
+    for member in members:
+        db.add(TripParticipant(trip_id=trip.id, user_id=member.id, role="member", status="accepted"))
+    db.flush()
+    return trip
+
+
+def make_message(db, sender, receiver=None, trip=None, minutes=0, **fields):
+    message = Message(
+        sender_id=sender.id,
+        receiver_id=receiver.id if receiver else None,
+        trip_id=trip.id if trip else None,
+        content=fields.pop("content", f"message at +{minutes}m"),
+        is_delivered=fields.pop("is_delivered", trip is not None),
+        is_read=fields.pop("is_read", False),
+        created_at=BASE_TIME + timedelta(minutes=minutes),
+        **fields
+    )
+    db.add(message)
+    db.flush()
+    return message
+
+
+def make_expense(db, trip, payer, participants, amount_cents=600, minutes=0, **fields):
+    """An ACTIVE expense split evenly (remainder to the first participant), without an audit log."""
+    expense = Expense(
+        trip_id=trip.id,
+        created_by_user_id=fields.pop("created_by_user_id", payer.id),
+        payer_user_id=payer.id,
+        amount_cents=amount_cents,
+        description=fields.pop("description", f"expense at +{minutes}m"),
+        status=fields.pop("status", "ACTIVE"),
+        created_at=BASE_TIME + timedelta(minutes=minutes),
+        **fields
+    )
+    db.add(expense)
+    db.flush()
+    share, remainder = divmod(amount_cents, len(participants))
+    for index, participant in enumerate(participants):
+        db.add(ExpenseSplit(
+            expense_id=expense.id,
+            user_id=participant.id,
+            share_cents=share + (remainder if index == 0 else 0)
+        ))
+    db.flush()
+    return expense
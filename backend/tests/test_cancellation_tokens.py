@@ -0,0 +1,85 @@
+"""
+Tests for deletion-cancellation tokens - HMAC digests looked up by index, legacy bcrypt tokens still accepted.
+Run with: python -m pytest backend/tests/test_cancellation_tokens.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from app.models.user import User
+from app.models.deletion_cancellation_token import DeletionCancellationToken
+from app.controllers.auth import cancel_deletion
+from app.schemas.auth import CancelDeletionRequest
+from app.utils.auth import hash_token, verify_token_hash, generate_secure_token, get_password_hash
+from app.utils.kdf_pool import kdf_pool
+from conftest import count_queries
+from factories import make_user
+
+
+@pytest.fixture(autouse=True)
+def aware_expiry(monkeypatch):
+    """SQLite hands back naive datetimes; compare them as UTC like Postgres' timestamptz."""
+    monkeypatch.setattr(
+        DeletionCancellationToken, "is_expired",
+        lambda self: datetime.now(timezone.utc) > self.expires_at.replace(tzinfo=timezone.utc)
+    )
+
+
+def pending_deletion(db, name, token_hash):
+    """A user pending deletion with one cancellation token stored as token_hash."""
+    user = make_user(db, name, status="pending_deletion")
+    db.add(DeletionCancellationToken(
+        user_id=user.id,
+        token_hash=token_hash,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=14),
+        is_used=False
+    ))
+    db.commit()
+    return user
+
+
+def test_hash_token_is_keyed_and_deterministic():
+    """Test: digests are stable, distinct per token, and checked in constant time"""
+    token = generate_secure_token(32)
+    digest = hash_token(token)
+    assert digest == hash_token(token) and len(digest) == 64
+    assert digest != hash_token(token + "x")
+    assert verify_token_hash(token, digest) and not verify_token_hash("nope", digest)
+    print("✅ Test 1 passed: HMAC token digests")
+
+
+def test_cancel_deletion_is_one_lookup(db):
+    """Test: a current token is found by its digest without any bcrypt work"""
+    tokens = {name: generate_secure_token(32) for name in ("alice", "bob", "carol")}
+    users = {name: pending_deletion(db, name, hash_token(token)) for name, token in tokens.items()}
+
+    completed = kdf_pool.stats()["completed"]
+    with count_queries(db) as statements:
+        result = cancel_deletion(CancelDeletionRequest(token=tokens["bob"]), db=db)
+    assert result["success"]
+    assert kdf_pool.stats()["completed"] == completed, "No bcrypt verification"
+    token_lookups = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "deletion_cancellation_tokens" in s]
+    assert len(token_lookups) == 1
+
+    statuses = {name: db.query(User.status).filter(User.id == user.id).scalar() for name, user in users.items()}
+    assert statuses == {"alice": "pending_deletion", "bob": "active", "carol": "pending_deletion"}
+
+    for token in (tokens["bob"], "not-a-token"):
+        with pytest.raises(HTTPException) as exc:
+            cancel_deletion(CancelDeletionRequest(token=token), db=db)
+        assert exc.value.status_code in (400, 404)
+    print("✅ Test 2 passed: cancellation is one indexed lookup")
+
+
+def test_legacy_bcrypt_token_still_accepted(db):
+    """Test: tokens issued before the switch (bcrypt digests) still cancel the deletion"""
+    token = generate_secure_token(32)
+    user = pending_deletion(db, "alice", get_password_hash(token))
+    pending_deletion(db, "bob", hash_token(generate_secure_token(32)))
+
+    assert cancel_deletion(CancelDeletionRequest(token=token), db=db)["success"]
+    assert db.query(User.status).filter(User.id == user.id).scalar() == "active"
+    print("✅ Test 3 passed: legacy tokens are still accepted")
@@ -0,0 +1,178 @@
+"""
+Tests for conversation_summaries maintenance - write-path updates match a full rebuild.
+Run with: python -m pytest backend/tests/test_conversation_summary.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime
+from app.models.conversation_summary import ConversationSummary
+from app.models.trip import TripParticipant
+from app.utils.conversation_summary import (
+    record_message,
+    record_read,
+    clear_summary,
+    remove_summary,
+    refresh_message_summaries,
+    rebuild_summaries,
+    rebuild_user_summaries
+)
+from app.controllers.trip import update_participant_status
+from app.schemas.trip import TripParticipantUpdate
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from factories import make_user, connect, make_trip, make_message
+
+
+def summary_state(db, user_id):
+    """{conversation key: (last_message_id, unread_count)} for one user."""
+    rows = db.query(ConversationSummary).filter(ConversationSummary.user_id == user_id).all()
+    return {(row.peer_user_id or row.trip_id): (row.last_message_id, row.unread_count) for row in rows}
+
+
+def send(db, sender, receiver=None, trip=None, minutes=0, **fields):
+    message = make_message(db, sender, receiver, trip=trip, minutes=minutes, **fields)
+    record_message(db, message)
+    return message
+
+
+def test_send_updates_both_sides(db):
+    """Test: 1-on-1 sends put the message on top for both users and count unread for the receiver"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    connect(db, me, bob)
+
+    send(db, bob, me, minutes=1)
+    latest = send(db, bob, me, minutes=2)
+    db.flush()
+
+    assert summary_state(db, me.id) == {bob.id: (latest.id, 2)}
+    assert summary_state(db, bob.id) == {me.id: (latest.id, 0)}
+
+    reply = send(db, me, bob, minutes=3)
+    db.flush()
+    assert summary_state(db, me.id) == {bob.id: (reply.id, 2)}
+    assert summary_state(db, bob.id) == {me.id: (reply.id, 1)}
+    print("✅ Test 1 passed: 1-on-1 send updates both summaries")
+
+
+def test_older_message_does_not_replace_newer(db):
+    """Test: a late-arriving older message leaves the newest one on top"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    connect(db, me, bob)
+
+    newest = send(db, bob, me, minutes=5)
+    send(db, bob, me, minutes=1)
+    db.flush()
+
+    assert summary_state(db, me.id) == {bob.id: (newest.id, 2)}
+    print("✅ Test 2 passed: last message only moves forward")
+
+
+def test_trip_send_fans_out_to_members(db):
+    """Test: group messages update every accepted member, unread for everyone but the sender"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    trip = make_trip(db, me, members=[bob])
+    db.add(TripParticipant(trip_id=trip.id, user_id=carol.id, role="member", status="pending"))
+    db.flush()
+
+    message = send(db, bob, trip=trip, minutes=1)
+    db.flush()
+
+    assert summary_state(db, me.id) == {trip.id: (message.id, 1)}
+    assert summary_state(db, bob.id) == {trip.id: (message.id, 0)}
+    assert summary_state(db, carol.id) == {}, "Pending invitees get no summary"
+    print("✅ Test 3 passed: trip send fans out to accepted members")
+
+
+def test_read_clear_delete_and_leave(db):
+    """Test: read, clear, delete-for-everyone and leave keep summaries in sync"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    connect(db, me, bob)
+    trip = make_trip(db, bob, members=[me])
+
+    first = send(db, bob, me, minutes=1)
+    second = send(db, bob, me, minutes=2)
+    db.flush()
+
+    second.is_read = True
+    record_read(db, second, me.id)
+    db.flush()
+    assert summary_state(db, me.id)[bob.id] == (second.id, 1)
+
+    second.deleted_for_everyone_at = datetime(2024, 1, 2)
+    db.flush()
+    refresh_message_summaries(db, second)
+    db.flush()
+    assert summary_state(db, me.id)[bob.id] == (first.id, 1)
+    assert summary_state(db, bob.id)[me.id] == (first.id, 0)
+
+    clear_summary(db, me.id, peer_id=bob.id)
+    db.flush()
+    assert summary_state(db, me.id)[bob.id] == (None, 0)
+
+    send(db, bob, trip=trip, minutes=3)
+    db.flush()
+    remove_summary(db, me.id, trip.id)
+    db.flush()
+    assert trip.id not in summary_state(db, me.id)
+    print("✅ Test 4 passed: read/clear/delete/leave update summaries")
+
+
+def test_incremental_matches_rebuild(db):
+    """Test: summaries maintained on write equal summaries rebuilt from messages"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    connect(db, me, bob)
+    connect(db, carol, me)
+    trip = make_trip(db, me, members=[bob, carol])
+
+    send(db, bob, me, minutes=1)
+    send(db, me, carol, minutes=2)
+    send(db, carol, me, minutes=3)
+    send(db, bob, trip=trip, minutes=4)
+    send(db, carol, trip=trip, minutes=5)
+    db.flush()
+
+    users = [me.id, bob.id, carol.id]
+    incremental = {user_id: summary_state(db, user_id) for user_id in users}
+    rebuild_summaries(db, users)
+    db.flush()
+    rebuilt = {user_id: summary_state(db, user_id) for user_id in users}
+
+    assert incremental == rebuilt
+    print("✅ Test 5 passed: incremental summaries match a rebuild")
+
+
+def test_late_joiner_sees_the_trip_chat(db):
+    """Test: accepting an invitation after messages were sent puts the trip's last message in the inbox"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    trip = make_trip(db, me)
+    invites = [TripParticipant(trip_id=trip.id, user_id=user.id, role="member", status="pending") for user in (bob, carol)]
+    db.add_all(invites)
+    db.flush()
+    message = send(db, me, trip=trip, minutes=1)
+    db.commit()
+    trip_id, bob_id, carol_id = str(trip.id), bob.id, carol.id
+    bob_invite, carol_invite = str(invites[0].id), str(invites[1].id)
+
+    update_participant_status(trip_id, bob_invite, TripParticipantUpdate(status="accepted"),
+                              current_user=TokenPrincipal.from_claims(principal_claims(bob)), db=db)
+    update_participant_status(trip_id, carol_invite, TripParticipantUpdate(status="declined"),
+                              current_user=TokenPrincipal.from_claims(principal_claims(carol)), db=db)
+
+    incremental = summary_state(db, bob_id)
+    assert incremental == {trip.id: (message.id, 0)}, "Messages from before joining are not unread"
+    assert summary_state(db, carol_id) == {}, "Declining leaves no summary"
+    rebuild_user_summaries(db, bob_id)
+    db.flush()
+    assert summary_state(db, bob_id) == incremental
+    print("✅ Test 6 passed: late joiner sees the trip chat")
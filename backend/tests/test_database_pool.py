@@ -0,0 +1,61 @@
+"""
+Tests for connection pool configuration - env-driven pool sizing.
+Run with: python -m pytest backend/tests/test_database_pool.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from app import database
+
+
+def test_engine_uses_queue_pool():
+    """Test: engine uses a real QueuePool with SQL echo off by default"""
+    assert isinstance(database.engine.pool, QueuePool)
+    assert database.engine.echo is False
+    print("✅ Test 1 passed: engine uses QueuePool")
+
+
+def test_env_overrides_pool_settings(monkeypatch):
+    """Test: DB_POOL_* variables override the environment defaults"""
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "3")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    settings = database.get_pool_settings()
+    assert settings["pool_size"] == 12
+    assert settings["max_overflow"] == 3
+    assert settings["pool_recycle"] == 600
+    assert settings["pool_pre_ping"] is False
+    print("✅ Test 2 passed: DB_POOL_* overrides applied")
+
+
+def test_invalid_pool_size_rejected(monkeypatch):
+    """Test: non-integer pool size fails loudly instead of silently defaulting"""
+    monkeypatch.setenv("DB_POOL_SIZE", "ten")
+    with pytest.raises(ValueError, match="DB_POOL_SIZE"):
+        database.get_pool_settings()
+    print("✅ Test 3 passed: invalid DB_POOL_SIZE rejected")
+
+
+def test_pool_status_reports_counters():
+    """Test: pool status exposes checked-out, idle and overflow counts"""
+    pool_status = database.get_pool_status()
+    for key in ("pool_size", "checked_out", "idle", "overflow", "max_connections"):
+        assert key in pool_status, f"Missing '{key}' in pool status"
+    assert pool_status["overflow"] >= 0
+    print("✅ Test 4 passed: pool status reports counters")
+
+
+def test_async_engine_has_its_own_smaller_pool(monkeypatch):
+    """Test: the async pool is sized by DB_ASYNC_* and doesn't copy the sync pool size"""
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_ASYNC_MAX_OVERFLOW", "1")
+    settings = database.get_async_pool_settings()
+    assert settings["pool_size"] == 2 and settings["max_overflow"] == 1
+    assert settings["pool_recycle"] == database.get_pool_settings()["pool_recycle"]
+    assert database.async_engine.pool.size() == database.ASYNC_POOL_SETTINGS["pool_size"]
+    print("✅ Test 5 passed: async engine has its own pool")
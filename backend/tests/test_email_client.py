@@ -0,0 +1,145 @@
+"""
+Tests for the Graph mail client - one MSAL app per process, token reuse and refresh, pooled session, $batch sends,
+signing in again after a 401.
+Run with: python -m pytest backend/tests/test_email_client.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from types import SimpleNamespace
+from app.utils import email
+from app.mail.base import MailDeliveryError
+from app.mail import graph as graph_module
+from app.mail.graph import GraphTransport
+from app.mail.render import render_email
+
+
+class FakeMsalApp:
+    """Stands in for ConfidentialClientApplication; hands out numbered tokens."""
+    created = 0
+
+    def __init__(self, **kwargs):
+        FakeMsalApp.created += 1
+        self.acquired = 0
+
+    def acquire_token_for_client(self, scopes):
+        self.acquired += 1
+        return {"access_token": f"token-{self.acquired}", "expires_in": 3600}
+
+
+class FakeResponse:
+    """202 for sendMail; for $batch, 200 with a 202 per request (or 429 for throttled ids)."""
+    text = ""
+
+    def __init__(self, url, body, throttled=()):
+        self.status_code = 200 if url.endswith("/$batch") else 202
+        self.body = body
+        self.throttled = throttled
+
+    def json(self):
+        return {"responses": [
+            {"id": request["id"], "status": 429 if request["id"] in self.throttled else 202}
+            for request in self.body["requests"]
+        ]}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    """Configured MSAL settings with a fake app, a fake clock and a recording session."""
+    clock = {"now": 1000.0}
+    posts = []
+    FakeMsalApp.created = 0
+    monkeypatch.setattr(email, "TENANT_ID", "tenant")
+    monkeypatch.setattr(email, "CLIENT_ID", "client")
+    monkeypatch.setattr(email, "CLIENT_SECRET", "secret")
+    monkeypatch.setattr(email, "ConfidentialClientApplication", FakeMsalApp)
+    monkeypatch.setattr(email, "_msal_app", None)
+    monkeypatch.setattr(email, "_access_token", None)
+    monkeypatch.setattr(email, "_access_token_expires_at", 0.0)
+    monkeypatch.setattr(email, "SENDER_USER", "sender@example.com")
+    monkeypatch.setattr(email, "time", SimpleNamespace(monotonic=lambda: clock["now"]))
+    monkeypatch.setattr(
+        email.graph_session, "post",
+        lambda url, **kwargs: posts.append((url, kwargs)) or FakeResponse(url, kwargs["json"], throttled={"1"})
+    )
+    return clock, posts
+
+
+def test_token_is_reused_until_close_to_expiry(graph):
+    """Test: one MSAL app, one token per lifetime, refreshed inside the margin"""
+    clock, _ = graph
+    assert email.get_access_token() == "token-1"
+    clock["now"] += 3600 - email.GRAPH_TOKEN_REFRESH_MARGIN_SECONDS - 1
+    assert email.get_access_token() == "token-1"
+    clock["now"] += 2
+    assert email.get_access_token() == "token-2"
+    assert FakeMsalApp.created == 1
+    print("✅ Test 1 passed: token reuse and refresh ahead of expiry")
+
+
+def test_batch_send_shares_token_and_session(graph):
+    """Test: several emails go out in one $batch call with one token, through the pooled session"""
+    _, posts = graph
+    transport = GraphTransport()
+    results = transport.send_batch([
+        ("a", render_email("verification", {"email": "a@example.com", "name": "A", "code": "123456"})),
+        ("b", render_email("deletion_complete", {"email": "b@example.com", "name": "B"})),
+        ("c", render_email("deletion_complete", {"email": "c@example.com", "name": "C"}))
+    ])
+    assert results["a"] is None and results["c"] is None
+    assert results["b"].retryable, "Throttled messages are retried"
+    assert len(posts) == 1 and posts[0][0].endswith("/$batch")
+    assert [r["url"] for r in posts[0][1]["json"]["requests"]] == ["/users/sender@example.com/sendMail"] * 3
+
+    transport.send(render_email("deletion_complete", {"email": "d@example.com", "name": "D"}))
+    assert email._msal_app.acquired == 1
+    assert all(kwargs["headers"]["Authorization"] == "Bearer token-1" for _, kwargs in posts)
+    assert all(kwargs["timeout"] == email.GRAPH_TIMEOUT_SECONDS for _, kwargs in posts)
+    print("✅ Test 2 passed: batched sends reuse the token and session")
+
+
+def test_rejected_token_is_not_resent(graph, monkeypatch):
+    """Test: a 401 is retryable and drops the cached token, so the retry signs in again"""
+    _, posts = graph
+    statuses = iter([401, 202])
+    monkeypatch.setattr(
+        email.graph_session, "post",
+        lambda url, **kwargs: posts.append((url, kwargs)) or SimpleNamespace(status_code=next(statuses), text="")
+    )
+    transport = GraphTransport()
+    message = render_email("deletion_complete", {"email": "a@example.com", "name": "A"})
+
+    with pytest.raises(MailDeliveryError) as error:
+        transport.send(message)
+    assert error.value.retryable
+    assert email._access_token is None
+
+    transport.send(message)
+    assert FakeMsalApp.created == 2, "A fresh MSAL app, not its cached copy of the rejected token"
+    assert len(posts) == 2
+    print("✅ Test 3 passed: a rejected token is replaced before the retry")
+
+
+def test_unreadable_batch_response_only_fails_its_chunk(graph, monkeypatch):
+    """Test: a chunk whose response can't be parsed fails its own messages; other chunks still count as sent"""
+    _, posts = graph
+    monkeypatch.setattr(graph_module, "GRAPH_BATCH_LIMIT", 2)
+
+    class Unreadable(FakeResponse):
+        def json(self):
+            raise ValueError("Expecting value")
+
+    responses = iter([FakeResponse, Unreadable])
+    monkeypatch.setattr(
+        email.graph_session, "post",
+        lambda url, **kwargs: posts.append((url, kwargs)) or next(responses)(url, kwargs["json"])
+    )
+    message = render_email("deletion_complete", {"email": "a@example.com", "name": "A"})
+    results = GraphTransport().send_batch([(key, message) for key in "abcd"])
+
+    assert results["a"] is None and results["b"] is None
+    assert results["c"].retryable and "Expecting value" in str(results["d"])
+    assert len(posts) == 2
+    print("✅ Test 4 passed: an unreadable batch response only fails its chunk")
@@ -0,0 +1,177 @@
+"""
+Tests for the email outbox - queued with the caller's transaction, sent in batches, retried with backoff.
+Run with: python -m pytest backend/tests/test_email_outbox.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.mail import outbox
+from app.mail.base import MailTransport, MailDeliveryError
+from app.mail.file import FileTransport
+from app.mail.outbox import OutboxSender, queue_email
+from app.models.email_outbox import OutboxEmail
+from app.controllers.contact import submit_contact_form, ContactForm
+from factories import make_user
+
+
+class RecordingTransport(MailTransport):
+    """Records every batch; fails sends to addresses listed in `failing`."""
+    name = "recording"
+
+    def __init__(self, failing=None):
+        self.batches = []
+        self.failing = failing or {}
+
+    def send_batch(self, payloads):
+        self.batches.append([key for key, _ in payloads])
+        return super().send_batch(payloads)
+
+    def send(self, payload):
+        address = payload["message"]["toRecipients"][0]["emailAddress"]["address"]
+        if address in self.failing:
+            raise MailDeliveryError("provider unavailable", retryable=self.failing[address])
+
+
+def queue_verification(db, address):
+    return queue_email(db, "verification", address, email=address, name="Tester", code="123456")
+
+
+def make_due(db):
+    """Backoff pushes next_attempt_at into the future; pull every row back to now."""
+    db.query(OutboxEmail).update({"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_queue_email_is_part_of_the_transaction(db):
+    """Test: queued emails exist only if the caller commits; unknown kinds are rejected"""
+    queue_verification(db, "a@example.com")
+    db.rollback()
+    assert db.query(OutboxEmail).count() == 0
+
+    submit_contact_form(ContactForm(
+        name="Alice", email="alice@example.com", subject="Hello", message="A question about trips"
+    ), db=db)
+    row = db.query(OutboxEmail).one()
+    assert row.kind == "contact" and row.status == "pending" and row.context["email"] == "alice@example.com"
+
+    with pytest.raises(ValueError):
+        queue_email(db, "newsletter", "a@example.com")
+    print("✅ Test 1 passed: queueing is transactional")
+
+
+def test_sender_sends_one_batch_and_deletes_sent_rows(db):
+    """Test: due rows go to the transport in one batch and are deleted once sent"""
+    for index in range(3):
+        queue_verification(db, f"user{index}@example.com")
+    db.commit()
+
+    transport = RecordingTransport()
+    sender = OutboxSender(transport, session_factory=lambda: db, batch_size=10)
+    assert sender.run_once() == 3
+    assert len(transport.batches) == 1 and len(transport.batches[0]) == 3
+    assert db.query(OutboxEmail).count() == 0
+    assert sender.run_once() == 0 and len(transport.batches) == 1, "Nothing due, nothing sent"
+
+    stats = sender.stats()
+    assert stats["sent"] == 3 and stats["pending"] == 0 and stats["oldest_pending_seconds"] is None
+    print("✅ Test 2 passed: batched send and delete")
+
+
+def test_failures_back_off_then_give_up(db, monkeypatch):
+    """Test: retryable failures are rescheduled with growing delays; permanent or exhausted ones go dead"""
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: 1.0)
+    flaky = queue_verification(db, "flaky@example.com")
+    bounced = queue_verification(db, "bounced@example.com")
+    queue_verification(db, "ok@example.com")
+    db.commit()
+    flaky_id, bounced_id = flaky.id, bounced.id
+
+    transport = RecordingTransport(failing={"flaky@example.com": True, "bounced@example.com": False})
+    sender = OutboxSender(transport, session_factory=lambda: db, max_attempts=3)
+    assert sender.run_once() == 1
+
+    flaky = db.get(OutboxEmail, flaky_id)
+    assert db.get(OutboxEmail, bounced_id).status == "dead"
+    assert flaky.status == "pending" and flaky.attempts == 1 and "provider unavailable" in flaky.last_error
+    assert sender.run_once() == 0 and len(transport.batches) == 1, "Backed-off rows are not due yet"
+
+    assert outbox.backoff_seconds(1) == outbox.OUTBOX_BACKOFF_BASE_SECONDS
+    assert outbox.backoff_seconds(2) == 2 * outbox.OUTBOX_BACKOFF_BASE_SECONDS
+    assert outbox.backoff_seconds(50) == outbox.OUTBOX_BACKOFF_MAX_SECONDS
+
+    for _ in range(2):
+        make_due(db)
+        sender.run_once()
+    flaky = db.get(OutboxEmail, flaky_id)
+    assert flaky.status == "dead" and flaky.attempts == 3
+    stats = sender.stats()
+    assert stats["dead"] == 2 and stats["pending"] == 0 and stats["gave_up"] == 2 and stats["retried"] == 2
+    print("✅ Test 3 passed: backoff and dead letters")
+
+
+def test_file_transport_writes_payloads(db, tmp_path):
+    """Test: the file transport stands in for Graph and writes the rendered payload"""
+    queue_email(db, "deletion_complete", "bob@example.com", email="bob@example.com", name="Bob")
+    db.commit()
+
+    sender = OutboxSender(FileTransport(str(tmp_path)), session_factory=lambda: db)
+    assert sender.run_once() == 1
+    (written,) = tmp_path.iterdir()
+    payload = json.loads(written.read_text())
+    assert payload["message"]["toRecipients"][0]["emailAddress"]["address"] == "bob@example.com"
+    print("✅ Test 4 passed: file transport")
+
+
+def test_cleanup_queues_deletion_complete(db, monkeypatch):
+    """Test: the hard delete job queues the goodbye email in the transaction that deletes the user"""
+    from app.utils import cleanup
+    user = make_user(db, "carol", status="pending_deletion")
+    user.hard_delete_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db.commit()
+    monkeypatch.setattr(cleanup, "SessionLocal", lambda: db)
+    monkeypatch.setattr(cleanup, "evict_principal", lambda user_id: None)
+
+    cleanup.hard_delete_pending_accounts()
+    row = db.query(OutboxEmail).one()
+    assert row.kind == "deletion_complete" and row.recipient == "carol@example.com"
+    print("✅ Test 5 passed: deletion complete email is queued")
+
+
+def test_dead_rows_do_not_keep_secrets(db):
+    """Test: a row that gives up is kept without its context, so its cancellation token is gone"""
+    queue_email(db, "deletion_scheduled", "dan@example.com", email="dan@example.com", name="Dan",
+                hard_delete_at=datetime.now(timezone.utc).isoformat(), cancellation_token="secret-token")
+    db.commit()
+
+    transport = RecordingTransport(failing={"dan@example.com": False})
+    OutboxSender(transport, session_factory=lambda: db).run_once()
+    db.expire_all()
+    row = db.query(OutboxEmail).one()
+    assert row.status == "dead" and row.kind == "deletion_scheduled" and row.recipient == "dan@example.com"
+    assert row.attempts == 1 and "provider unavailable" in row.last_error
+    assert row.context == {} and "secret-token" not in json.dumps(row.context)
+    print("✅ Test 6 passed: dead rows drop their context")
+
+
+def test_unexpected_transport_errors_fail_only_their_message(db):
+    """Test: an exception that isn't a MailDeliveryError is retried for its message; the rest are sent"""
+    queue_verification(db, "ok@example.com")
+    broken = queue_verification(db, "broken@example.com")
+    db.commit()
+    broken_id = broken.id
+
+    class BrokenTransport(RecordingTransport):
+        def send(self, payload):
+            if payload["message"]["toRecipients"][0]["emailAddress"]["address"] == "broken@example.com":
+                raise KeyError("toRecipients")
+
+    assert OutboxSender(BrokenTransport(), session_factory=lambda: db).run_once() == 1
+    db.expire_all()
+    (row,) = db.query(OutboxEmail).all()
+    assert row.id == broken_id and row.status == "pending" and row.attempts == 1
+    assert "toRecipients" in row.last_error
+    print("✅ Test 7 passed: unexpected errors fail only their own message")
@@ -0,0 +1,64 @@
+"""
+Tests for the email templates - compiled once, shared layout, escaped fields.
+Run with: python -m pytest backend/tests/test_email_templates.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from app.mail import render
+from app.mail.render import render_email, EMAIL_TEMPLATES
+
+
+def test_every_kind_renders_from_a_small_context(monkeypatch):
+    """Test: each kind renders into the shared layout without touching the template files again"""
+    monkeypatch.setattr(render, "_read", lambda filename: pytest.fail(f"{filename} read at render time"))
+    contexts = {
+        "contact": {"name": "Alice", "email": "alice@example.com", "subject": "Hello", "message": "Hi"},
+        "verification": {"email": "a@example.com", "name": "Alice", "code": "123456"},
+        "password_change": {"email": "a@example.com", "name": "Alice", "changed_at": "2024-01-01T12:00:00+00:00"},
+        "deletion_scheduled": {"email": "a@example.com", "name": "Alice",
+                               "hard_delete_at": "2030-01-01T12:00:00+00:00", "cancellation_token": "abc"},
+        "deletion_complete": {"email": "a@example.com", "name": "Alice"}
+    }
+    assert set(contexts) == set(EMAIL_TEMPLATES)
+    for kind, context in contexts.items():
+        message = render_email(kind, context)["message"]
+        content = message["body"]["content"]
+        assert "$" not in content, f"{kind} left a placeholder"
+        assert content.startswith("<html>") and content.rstrip().endswith("</html>")
+        if kind != "contact":
+            assert "Hi Alice," in content and "All rights reserved" in content
+            assert message["toRecipients"][0]["emailAddress"] == {"address": "a@example.com", "name": "Alice"}
+
+    contact = render_email("contact", contexts["contact"])["message"]
+    assert contact["toRecipients"][0]["emailAddress"]["address"] == render.CONTACT_EMAIL
+    assert contact["replyTo"][0]["emailAddress"]["address"] == "alice@example.com"
+    print("✅ Test 1 passed: every kind renders from its context")
+
+
+def test_fields_are_escaped():
+    """Test: user-supplied text can't inject markup; the subject stays plain text"""
+    message = render_email("contact", {
+        "name": "<script>alert(1)</script>",
+        "email": "x@example.com",
+        "subject": "Tom & Jerry",
+        "message": "line one\n<b>line two</b>",
+        "phone": "\"><img>"
+    })["message"]
+    content = message["body"]["content"]
+    assert "<script>" not in content and "&lt;script&gt;" in content
+    assert "line one<br>&lt;b&gt;line two&lt;/b&gt;" in content
+    assert "<strong>Phone:</strong> &quot;&gt;&lt;img&gt;" in content
+    assert message["subject"] == "Contact Form: Tom & Jerry"
+
+    scheduled = render_email("deletion_scheduled", {
+        "email": "a@example.com", "name": "A", "hard_delete_at": "2030-01-01T12:00:00+00:00",
+        "cancellation_token": "a&b=c"
+    })["message"]["body"]["content"]
+    assert "/cancel-deletion?token=a%26b%3Dc" in scheduled
+
+    with pytest.raises(TypeError):
+        render_email("verification", {"email": "a@example.com", "name": "A"})
+    print("✅ Test 2 passed: fields are escaped")
@@ -0,0 +1,149 @@
+"""
+Tests for the trip expense list - splits and users loaded in a constant number of queries,
+cursor pagination and date/payer filters - and for set-based split writes.
+Run with: python -m pytest backend/tests/test_expense_queries.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import uuid
+import pytest
+from datetime import timedelta
+from fastapi import HTTPException, Response
+from app.controllers.expense import get_trip_expenses, write_splits
+from app.models.expense import ExpenseSplit
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from app.utils.pagination import CURSOR_HEADER
+from conftest import count_queries
+from factories import BASE_TIME, make_user, make_trip, make_expense
+
+
+def as_principal(user):
+    return TokenPrincipal.from_claims(principal_claims(user))
+
+
+def list_expenses(db, principal, trip_id, **params):
+    """Call get_trip_expenses with its query defaults; returns (expenses, next cursor)."""
+    args = dict(include_void=False, limit=50, before=None, start_date=None, end_date=None, payer_user_id=None)
+    args.update(params)
+    response = Response()
+    expenses = get_trip_expenses(trip_id, response, current_user=principal, db=db, **args)
+    return expenses, response.headers.get(CURSOR_HEADER)
+
+
+def make_group(db, size):
+    me = make_user(db, "me")
+    friends = [make_user(db, f"friend{index}") for index in range(size - 1)]
+    trip = make_trip(db, me, members=friends)
+    return me, friends, trip
+
+
+def test_large_trip_pages_cost_the_same_queries(db):
+    """Test: pages of a 300-expense, 6-way-split trip cost a constant handful of queries"""
+    me, friends, trip = make_group(db, 6)
+    people = [me] + friends
+    for index in range(300):
+        make_expense(db, trip, people[index % 6], people, amount_cents=1000 + index, minutes=index)
+    db.commit()
+    principal, trip_id = as_principal(me), str(trip.id)
+
+    # trip + membership + expenses + splits + users
+    with count_queries(db) as statements:
+        first, cursor = list_expenses(db, principal, trip_id, limit=100)
+    assert len(statements) == 5, statements
+    assert len(first) == 100 and cursor
+    assert first[0].description == "expense at +299m", "Newest first"
+    assert all(len(expense.splits) == 6 for expense in first)
+    assert all(split.user and split.user["username"] == "friend1" for expense in first for split in expense.splits
+               if split.user_id == str(friends[1].id))
+    assert all(expense.creator and expense.payer for expense in first)
+
+    with count_queries(db) as statements:
+        third, cursor = list_expenses(db, principal, trip_id, limit=100, before=cursor)
+        third, cursor = list_expenses(db, principal, trip_id, limit=100, before=cursor)
+    assert len(statements) == 10, statements
+    assert third[-1].description == "expense at +0m"
+    print("✅ Test 1 passed: expense pages in 5 queries each")
+
+
+def test_cursor_walks_every_expense_once(db):
+    """Test: following X-Next-Cursor visits each expense exactly once, voided ones only on request"""
+    me, friends, trip = make_group(db, 3)
+    people = [me] + friends
+    # Same timestamp for a run of expenses: the id breaks the tie
+    for index in range(7):
+        make_expense(db, trip, me, people, minutes=index // 3)
+    make_expense(db, trip, me, people, minutes=10, status="VOID")
+    db.commit()
+    principal, trip_id = as_principal(me), str(trip.id)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = list_expenses(db, principal, trip_id, limit=2, before=cursor)
+        seen.extend(expense.id for expense in page)
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 7
+
+    with_void, _ = list_expenses(db, principal, trip_id, include_void=True)
+    assert len(with_void) == 8 and with_void[0].status == "VOID"
+
+    with pytest.raises(HTTPException) as exc:
+        list_expenses(db, principal, trip_id, before="not-a-cursor")
+    assert exc.value.status_code == 400
+    print("✅ Test 2 passed: cursor walk visits every expense once")
+
+
+def test_date_and_payer_filters(db):
+    """Test: start_date/end_date bound created_at and payer_user_id picks one payer"""
+    me, friends, trip = make_group(db, 3)
+    people = [me] + friends
+    for day in range(6):
+        make_expense(db, trip, people[day % 3], people, minutes=day * 24 * 60)
+    db.commit()
+    principal, trip_id = as_principal(me), str(trip.id)
+
+    window, _ = list_expenses(db, principal, trip_id, start_date=BASE_TIME + timedelta(days=1),
+                              end_date=BASE_TIME + timedelta(days=3))
+    assert [expense.created_at.day for expense in window] == [4, 3, 2]
+
+    paid_by_friend, _ = list_expenses(db, principal, trip_id, payer_user_id=str(friends[0].id))
+    assert [expense.created_at.day for expense in paid_by_friend] == [5, 2]
+    assert all(expense.payer["username"] == "friend0" for expense in paid_by_friend)
+
+    for params in ({"payer_user_id": "nope"},
+                   {"start_date": BASE_TIME + timedelta(days=3), "end_date": BASE_TIME}):
+        with pytest.raises(HTTPException) as exc:
+            list_expenses(db, principal, trip_id, **params)
+        assert exc.value.status_code == 400
+
+    outsider = make_user(db, "outsider")
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        list_expenses(db, as_principal(outsider), trip_id)
+    assert exc.value.status_code == 403
+    print("✅ Test 3 passed: date and payer filters")
+
+
+def test_split_writes_are_set_based(db):
+    """Test: splits are upserted and pruned in one statement each, whatever the group size"""
+    me, friends, trip = make_group(db, 8)
+    people = [me] + friends
+    expense = make_expense(db, trip, me, people[:5], amount_cents=1000)
+    db.commit()
+    expense_id = expense.id
+    original = {split.user_id: split.id for split in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense_id)}
+    kept, added = [person.id for person in people[2:5]], [person.id for person in people[5:]]
+
+    with count_queries(db) as statements:
+        written = write_splits(db, expense_id, kept + added, [100] * 6, replace=True)
+    assert len(statements) == 2, statements
+    db.commit()
+
+    assert [row.user_id for row in written] == kept + added, "Rows come back in the given order"
+    assert all(row.id == original[row.user_id] for row in written[:3]), "Existing splits are updated in place"
+    splits = {split.user_id: split.share_cents for split in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense_id)}
+    assert splits == {user_id: 100 for user_id in kept + added}
+    print("✅ Test 4 passed: split writes are set-based")
@@ -0,0 +1,78 @@
+"""
+Tests for the inbox - summaries rebuilt from messages and read in a constant number of queries.
+Run with: python -m pytest backend/tests/test_inbox.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime
+from app.utils.inbox import build_inbox
+from app.utils.conversation_summary import rebuild_summaries
+from conftest import count_queries
+from factories import make_user, connect, make_trip, make_message
+
+
+def test_last_message_and_unread_counts(db):
+    """Test: each conversation gets its own latest message and unread count"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    connect(db, me, bob)
+    connect(db, carol, me)
+    trip = make_trip(db, me, members=[bob], title="Lisbon")
+
+    make_message(db, bob, me, minutes=1)
+    make_message(db, bob, me, minutes=2)
+    latest_bob = make_message(db, me, bob, minutes=3)
+    make_message(db, carol, me, minutes=4, is_read=True)
+    make_message(db, bob, trip=trip, minutes=5)
+    latest_trip = make_message(db, me, trip=trip, minutes=6)
+    make_message(db, bob, trip=trip, minutes=7, deleted_for_everyone_at=datetime(2024, 1, 2))
+
+    rebuild_summaries(db, [me.id])
+    inbox = build_inbox(db, me.id)
+    by_key = {c.user_id or c.trip_id: c for c in inbox}
+
+    assert by_key[str(bob.id)].last_message.id == str(latest_bob.id)
+    assert by_key[str(bob.id)].unread_count == 2
+    assert by_key[str(carol.id)].unread_count == 0
+    assert by_key[str(trip.id)].last_message.id == str(latest_trip.id), "Deleted messages are skipped"
+    assert by_key[str(trip.id)].unread_count == 1
+    assert [c.trip_title or c.user_name for c in inbox] == ["Lisbon", "Carol Tester", "Bob Tester"]
+    print("✅ Test 1 passed: last messages and unread counts per conversation")
+
+
+def test_deleted_user_is_anonymized(db):
+    """Test: users pending deletion show as 'Deleted User'"""
+    me = make_user(db, "me")
+    gone = make_user(db, "gone", status="pending_deletion")
+    connect(db, me, gone)
+
+    rebuild_summaries(db, [me.id])
+    inbox = build_inbox(db, me.id)
+    assert inbox[0].user_name == "Deleted User"
+    assert inbox[0].user_avatar is None
+    assert inbox[0].last_message is None
+    print("✅ Test 2 passed: deleted user anonymized")
+
+
+def test_query_count_is_constant(db):
+    """Test: inbox size does not change the number of queries"""
+    me = make_user(db, "me")
+    for i in range(25):
+        peer = make_user(db, f"peer{i}")
+        connect(db, me, peer)
+        make_message(db, peer, me, minutes=i)
+        trip = make_trip(db, peer, members=[me], title=f"Trip {i}")
+        make_message(db, peer, trip=trip, minutes=i)
+    me_id = me.id
+    rebuild_summaries(db, [me_id])
+    db.commit()
+
+    with count_queries(db) as statements:
+        inbox = build_inbox(db, me_id)
+
+    assert len(inbox) == 50
+    assert len(statements) == 2, f"Expected 2 queries, got {len(statements)}"
+    print("✅ Test 3 passed: 2 queries for 50 conversations")
@@ -0,0 +1,85 @@
+"""
+Tests for the bounded password hashing pool - concurrency limit, saturation and 503 + Retry-After.
+Run with: python -m pytest backend/tests/test_kdf_pool.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+import pytest
+from app.utils import auth
+from app.utils.kdf_pool import KdfPool, KdfPoolBusy
+from app.utils.auth import get_password_hash, verify_password
+from app.controllers.auth import login
+from app.schemas.auth import UserLogin
+from factories import make_user
+
+
+def occupy(pool, count):
+    """Start count blocking jobs in pool; returns the event that releases them and their threads."""
+    release, started = threading.Event(), threading.Semaphore(0)
+
+    def job():
+        started.release()
+        release.wait(5)
+
+    threads = [threading.Thread(target=pool.run, args=(job,)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for _ in range(min(count, pool.max_concurrency)):
+        started.acquire(timeout=5)
+    deadline = time.monotonic() + 5
+    while sum(pool.stats()[key] for key in ("running", "queued")) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return release, threads
+
+
+def test_hash_and_verify_run_in_pool():
+    """Test: hashing and verification still round-trip and are counted by the pool"""
+    before = auth.kdf_pool.stats()["completed"]
+    hashed = get_password_hash("secret123")
+    assert verify_password("secret123", hashed)
+    assert not verify_password("wrong", hashed)
+    assert auth.kdf_pool.stats()["completed"] == before + 3
+    print("✅ Test 1 passed: KDF calls go through the pool")
+
+
+def test_saturated_pool_rejects_with_retry_after():
+    """Test: at most max_concurrency jobs run, max_queue wait, and the next caller gets 503"""
+    pool = KdfPool(max_concurrency=2, max_queue=1)
+    release, threads = occupy(pool, 3)
+    stats = pool.stats()
+    assert (stats["running"], stats["queued"]) == (2, 1)
+
+    with pytest.raises(KdfPoolBusy) as exc:
+        pool.run(lambda: None)
+    assert exc.value.status_code == 503
+    assert int(exc.value.headers["Retry-After"]) > 0
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    stats = pool.stats()
+    assert (stats["running"], stats["queued"], stats["completed"], stats["rejected"]) == (0, 0, 3, 1)
+    assert pool.run(lambda x: x * 2, 21) == 42
+    print("✅ Test 2 passed: saturation is refused right away")
+
+
+def test_login_returns_503_when_saturated(db, monkeypatch):
+    """Test: login surfaces saturation as 503 instead of its generic 500"""
+    make_user(db, "alice")
+    db.commit()
+    pool = KdfPool(max_concurrency=1, max_queue=0)
+    monkeypatch.setattr(auth, "kdf_pool", pool)
+    release, threads = occupy(pool, 1)
+    try:
+        with pytest.raises(KdfPoolBusy) as exc:
+            login(UserLogin(username_or_email="alice", password="secret123"), db=db)
+        assert exc.value.status_code == 503
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join(5)
+    print("✅ Test 3 passed: login answers 503 when saturated")
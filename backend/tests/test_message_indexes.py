@@ -0,0 +1,156 @@
+"""
+EXPLAIN regression tests - the hot message queries must be served by their indexes.
+Needs Postgres: TEST_DATABASE_URL=postgresql://... python -m pytest backend/tests/test_message_indexes.py
+Everything runs in a scratch schema inside a transaction that is rolled back.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from fastapi import Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.message import Message
+from app.controllers.message import direct_messages_query, fetch_message_page
+from app.utils.inbox import get_direct_unread_counts, get_last_trip_messages, get_trip_unread_counts
+from app.utils.pagination import encode_cursor
+from factories import make_user, connect, make_trip
+
+pytestmark = pytest.mark.integration
+
+MESSAGES = 20000
+
+
+@pytest.fixture
+def pg_db(pg_engine):
+    conn = pg_engine.connect()
+    trans = conn.begin()
+    conn.execute(text("CREATE SCHEMA explain_test"))
+    conn.execute(text("SET LOCAL search_path TO explain_test"))
+    Base.metadata.create_all(conn)
+    db = Session(bind=conn, autoflush=False)
+    try:
+        yield db
+    finally:
+        db.close()
+        trans.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def chat(pg_db):
+    """
+    Two connected users and their trip, inside a busier table: most rows belong to
+    other conversations, so no single chat is a large share of the messages.
+    """
+    me = make_user(pg_db, "me")
+    peer = make_user(pg_db, "peer")
+    others = [make_user(pg_db, f"other{i}") for i in range(40)]
+    connect(pg_db, me, peer)
+    trip = make_trip(pg_db, me, members=[peer])
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    rows = []
+    for i in range(MESSAGES):
+        sender, receiver, trip_id = others[i % 40], others[(i * 7 + 1) % 40], None
+        if i % 50 == 0:
+            sender, receiver = me, peer
+        elif i % 50 == 1:
+            sender, receiver = peer, me
+        elif i % 50 == 2:
+            receiver = me
+        elif i % 50 == 3:
+            sender, receiver, trip_id = peer, None, trip.id
+        rows.append({
+            "id": uuid4(), "sender_id": sender.id, "receiver_id": receiver and receiver.id,
+            "trip_id": trip_id, "content": "x", "is_delivered": True,
+            "is_read": i % 3 != 0, "created_at": start + timedelta(seconds=i),
+            "deleted_for_everyone_at": start if i % 7 == 0 else None
+        })
+    pg_db.execute(Message.__table__.insert(), rows)
+    pg_db.execute(text("ANALYZE messages"))
+    # Small tables make sequential scans look cheap; only asking which index is usable
+    pg_db.execute(text("SET LOCAL enable_seqscan = off"))
+    return pg_db, me, peer, trip
+
+
+def explain_executed(db, fn):
+    """Run fn(), then EXPLAIN every SELECT it issued (with its real parameters)."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    conn = db.connection()
+    event.listen(conn, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(conn, "before_cursor_execute", before_cursor_execute)
+    return [
+        "\n".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters))
+        for statement, parameters in captured
+    ]
+
+
+def test_trip_history_uses_timeline_index(chat):
+    """Test: trip history pages (with and without a cursor) scan idx_messages_trip_created"""
+    db, me, peer, trip = chat
+    query = db.query(Message).filter(Message.trip_id == trip.id)
+    cursor = encode_cursor(datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc), uuid4())
+
+    plans = explain_executed(db, lambda: (
+        fetch_message_page(query, Response(), 50, 0, None, None),
+        fetch_message_page(query, Response(), 50, 0, cursor, None)
+    ))
+    assert len(plans) == 2
+    for plan in plans:
+        assert "idx_messages_trip_created" in plan, plan
+    print("✅ Test 1 passed: trip history uses idx_messages_trip_created")
+
+
+def test_direct_history_uses_pair_index(chat):
+    """Test: 1-on-1 history scans idx_messages_pair_created for both directions"""
+    db, me, peer, trip = chat
+    query = direct_messages_query(db, me.id, peer.id)
+    cursor = encode_cursor(datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc), uuid4())
+
+    plans = explain_executed(db, lambda: (
+        fetch_message_page(query, Response(), 50, 0, None, None),
+        fetch_message_page(query, Response(), 50, 0, cursor, None)
+    ))
+    for plan in plans:
+        assert plan.count("idx_messages_pair_created") == 2, plan
+    print("✅ Test 2 passed: 1-on-1 history uses idx_messages_pair_created")
+
+
+def test_unread_counts_use_partial_index(chat):
+    """Test: unread counts by receiver read only the partial unread index"""
+    db, me, peer, trip = chat
+    plans = explain_executed(db, lambda: get_direct_unread_counts(db, peer.id, [me.id]))
+    assert "idx_messages_unread_direct" in plans[0], plans[0]
+    print("✅ Test 3 passed: unread counts use idx_messages_unread_direct")
+
+
+def test_last_trip_message_uses_visible_timeline(chat):
+    """Test: last visible message per trip reads the partial trip timeline index"""
+    db, me, peer, trip = chat
+    # A single trip's few hundred rows are cheap to bitmap-scan and sort; ask for the ordered path
+    db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    plans = explain_executed(db, lambda: get_last_trip_messages(db, [trip.id]))
+    assert "idx_messages_trip_visible" in plans[0], plans[0]
+    print("✅ Test 4 passed: last trip message uses idx_messages_trip_visible")
+
+
+def test_trip_unread_count_is_range_scan(chat):
+    """Test: trip unread counts scan the visible timeline past the member's read cursor"""
+    db, me, peer, trip = chat
+    plans = explain_executed(db, lambda: get_trip_unread_counts(db, me.id, [trip.id]))
+    assert "idx_messages_trip_visible" in plans[0], plans[0]
+    print("✅ Test 5 passed: trip unread counts use idx_messages_trip_visible")
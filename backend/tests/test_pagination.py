@@ -0,0 +1,77 @@
+"""
+Tests for keyset (cursor) pagination of chat histories.
+Run with: python -m pytest backend/tests/test_pagination.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi import HTTPException, Response
+from app.models.message import Message
+from app.utils.pagination import CURSOR_HEADER, encode_cursor, decode_cursor
+from app.controllers.message import fetch_message_page
+from factories import make_user, make_trip, make_message
+
+
+def page(db, trip, limit, before=None, after=None, offset=0):
+    response = Response()
+    query = db.query(Message).filter(Message.trip_id == trip.id)
+    messages = fetch_message_page(query, response, limit, offset, before, after)
+    return [m.content for m in messages], response.headers.get(CURSOR_HEADER)
+
+
+def test_cursor_round_trip():
+    """Test: cursors encode (timestamp, id) and reject garbage"""
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    row_id = uuid4()
+    assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+    for bad in ("", "not-a-cursor", encode_cursor(created_at, row_id)[:-4]):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+    print("✅ Test 1 passed: cursor round trip")
+
+
+def test_walk_backwards_and_catch_up(db):
+    """Test: before= walks history without gaps or repeats; after= returns newer messages"""
+    me = make_user(db, "me")
+    trip = make_trip(db, me)
+    for n in range(1, 8):
+        make_message(db, me, trip=trip, minutes=n, content=str(n))
+    # Same timestamp as message 7: the id breaks the tie
+    make_message(db, me, trip=trip, minutes=7, content="7b")
+
+    seen = []
+    contents, cursor = page(db, trip, limit=3)
+    seen += contents
+    while cursor:
+        contents, cursor = page(db, trip, limit=3, before=cursor)
+        seen += contents
+    assert sorted(seen) == sorted(["1", "2", "3", "4", "5", "6", "7", "7b"])
+    assert len(seen) == len(set(seen))
+
+    oldest = db.query(Message).filter(Message.content == "2").one()
+    contents, cursor = page(db, trip, limit=3, after=encode_cursor(oldest.created_at, oldest.id))
+    assert contents == ["5", "4", "3"], "Newest first within the page"
+    contents, cursor = page(db, trip, limit=3, after=cursor)
+    assert sorted(contents) == ["6", "7", "7b"]
+    print("✅ Test 2 passed: keyset pages cover history exactly once")
+
+
+def test_offset_fallback_and_bad_cursor(db):
+    """Test: deprecated offset still works; invalid cursors are a 400"""
+    me = make_user(db, "me")
+    trip = make_trip(db, me)
+    for n in range(1, 6):
+        make_message(db, me, trip=trip, minutes=n, content=str(n))
+
+    contents, _ = page(db, trip, limit=2, offset=2)
+    assert contents == ["3", "2"]
+    with pytest.raises(HTTPException) as exc:
+        page(db, trip, limit=2, before="garbage")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        page(db, trip, limit=2, before=encode_cursor(datetime(2024, 1, 1), uuid4()), after=encode_cursor(datetime(2024, 1, 1), uuid4()))
+    print("✅ Test 3 passed: offset fallback and cursor validation")
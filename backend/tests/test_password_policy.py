@@ -0,0 +1,75 @@
+"""
+Tests for the password hashing policy - formats, needs_rehash and the upgrade on login.
+Run with: python -m pytest backend/tests/test_password_policy.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from fastapi import HTTPException
+from app.utils import auth
+from app.utils.password_policy import PasswordPolicy, BCRYPT, PBKDF2_SHA256
+from app.controllers.auth import login
+from app.schemas.auth import UserLogin
+from app.models.user import User
+from factories import make_user
+
+# Cheap costs keep the tests fast; the formats are the same at any cost
+FAST_BCRYPT = PasswordPolicy(BCRYPT, bcrypt_rounds=4)
+FAST_PBKDF2 = PasswordPolicy(PBKDF2_SHA256, pbkdf2_iterations=1000)
+
+
+def test_every_format_verifies_under_any_policy():
+    """Test: hashes of either algorithm verify regardless of the configured one"""
+    bcrypt_hash = FAST_BCRYPT.hash("secret123")
+    pbkdf2_hash = FAST_PBKDF2.hash("secret123")
+    assert bcrypt_hash.startswith("$2b$04$")
+    assert pbkdf2_hash.startswith("pbkdf2_sha256$1000$")
+
+    for policy in (FAST_BCRYPT, FAST_PBKDF2):
+        assert policy.verify("secret123", bcrypt_hash) and policy.verify("secret123", pbkdf2_hash)
+        assert not policy.verify("wrong", bcrypt_hash) and not policy.verify("wrong", pbkdf2_hash)
+        assert not policy.verify("secret123", "garbage")
+    print("✅ Test 1 passed: all formats verify")
+
+
+def test_needs_rehash():
+    """Test: a hash needs rehashing when its algorithm or cost differs from the policy"""
+    bcrypt_hash = FAST_BCRYPT.hash("secret123")
+    pbkdf2_hash = FAST_PBKDF2.hash("secret123")
+
+    assert not FAST_BCRYPT.needs_rehash(bcrypt_hash)
+    assert PasswordPolicy(BCRYPT, bcrypt_rounds=5).needs_rehash(bcrypt_hash)
+    assert FAST_BCRYPT.needs_rehash(pbkdf2_hash)
+    assert not FAST_PBKDF2.needs_rehash(pbkdf2_hash)
+    assert PasswordPolicy(PBKDF2_SHA256, pbkdf2_iterations=2000).needs_rehash(pbkdf2_hash)
+    assert FAST_BCRYPT.needs_rehash("garbage")
+
+    with pytest.raises(ValueError):
+        PasswordPolicy("md5")
+    print("✅ Test 2 passed: needs_rehash")
+
+
+def test_login_upgrades_outdated_hash(db, monkeypatch):
+    """Test: a successful login replaces an outdated hash once; failed logins don't touch it"""
+    user = make_user(db, "alice")
+    user.password_hash = FAST_BCRYPT.hash("secret123")
+    db.commit()
+    monkeypatch.setattr(auth, "password_policy", FAST_PBKDF2)
+
+    def stored_hash():
+        return db.query(User.password_hash).filter(User.id == user.id).scalar()
+
+    with pytest.raises(HTTPException) as exc:
+        login(UserLogin(username_or_email="alice", password="wrong"), db=db)
+    assert exc.value.status_code == 401
+    assert stored_hash().startswith("$2b$")
+
+    assert login(UserLogin(username_or_email="alice", password="secret123"), db=db).access_token
+    upgraded = stored_hash()
+    assert upgraded.startswith("pbkdf2_sha256$1000$")
+
+    login(UserLogin(username_or_email="alice", password="secret123"), db=db)
+    assert stored_hash() == upgraded, "Up-to-date hashes are left alone"
+    print("✅ Test 3 passed: login upgrades outdated hashes")
@@ -0,0 +1,156 @@
+"""
+Tests for the authenticated-user principal cache - TTL, LRU bound, eviction, get_current_user
+and signed-claims tokens with token_version revocation.
+Run with: python -m pytest backend/tests/test_principal_cache.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import dataclasses
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.controllers.auth import get_current_user, get_current_principal
+from app.utils import principal
+from app.utils.principal import Principal, PrincipalCache, TokenPrincipal, USER_CHANGED
+from app.utils.auth import create_access_token, verify_token
+from conftest import count_queries
+from factories import make_user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Fresh principal and token version caches for one test."""
+    for name in ("principal_cache", "token_versions"):
+        cache = PrincipalCache()
+        monkeypatch.setattr(principal, name, cache)
+        monkeypatch.setattr(f"app.controllers.auth.{name}", cache)
+
+
+def bearer(user, claims=True):
+    token = create_access_token({"sub": str(user.id), "email": user.email}, user=user if claims else None)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def snapshot(db, name):
+    return Principal.from_user(make_user(db, name))
+
+
+def test_ttl_and_lru_bound(db):
+    """Test: entries expire after the TTL and the least recently used one is dropped first"""
+    clock = FakeClock()
+    cache = PrincipalCache(max_entries=2, ttl=10, clock=clock)
+    alice, bob, carol = snapshot(db, "alice"), snapshot(db, "bob"), snapshot(db, "carol")
+
+    cache.put(alice.id, alice)
+    cache.put(bob.id, bob)
+    assert cache.get(alice.id) is alice  # alice is now the most recently used
+    cache.put(carol.id, carol)
+    assert cache.get(bob.id) is None
+    assert cache.get(alice.id) is alice
+
+    clock.now = 10
+    assert cache.get(alice.id) is None and cache.get(carol.id) is None
+    assert cache.stats()["entries"] == 0
+    print("✅ Test 1 passed: TTL and LRU bound")
+
+
+def test_principal_is_immutable(db):
+    """Test: cached principals can't be modified by a handler"""
+    alice = snapshot(db, "alice")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        alice.status = "pending_deletion"
+    assert not hasattr(alice, "password_hash")
+    print("✅ Test 2 passed: principals are read-only")
+
+
+def test_eviction_wins_over_concurrent_load(db):
+    """Test: a row loaded before an eviction is not cached afterwards"""
+    cache = PrincipalCache()
+    alice = snapshot(db, "alice")
+
+    def load_then_change():
+        cache.evict(alice.id)  # Another request commits a change while this one loads
+        return alice
+
+    assert cache.get_or_load(alice.id, load_then_change) is alice
+    assert cache.get(alice.id) is None
+    cache.dispatch([], {"type": USER_CHANGED, "data": {"user_id": str(alice.id)}})
+    print("✅ Test 3 passed: eviction wins over concurrent load")
+
+
+def test_get_current_user_skips_database_when_warm(db, caches):
+    """Test: a warm token + cache resolves the user without a query; eviction forces a reload"""
+    user = make_user(db, "alice")
+    credentials = bearer(user, claims=False)
+
+    with count_queries(db) as statements:
+        first = get_current_user(credentials, db)
+        second = get_current_user(credentials, db)
+    assert isinstance(first, Principal) and second is first
+    assert len(statements) == 1
+
+    user.first_name = "Alicia"
+    db.flush()
+    principal.evict_principal(user.id)
+    assert get_current_user(credentials, db).first_name == "Alicia"
+
+    db.delete(user)
+    db.flush()
+    principal.evict_principal(user.id)
+    with pytest.raises(HTTPException) as exc:
+        get_current_user(credentials, db)
+    assert exc.value.status_code == 401
+    print("✅ Test 4 passed: get_current_user served from cache")
+
+
+def test_signed_claims_principal(db, caches):
+    """Test: claims tokens authenticate from the token plus a cached token_version; legacy tokens still work"""
+    user = make_user(db, "alice")
+    credentials = bearer(user)
+    assert verify_token(credentials.credentials)["username"] == "alice"
+
+    with count_queries(db) as statements:
+        first = get_current_principal(credentials, db)
+        second = get_current_principal(credentials, db)
+    assert first == second and isinstance(first, TokenPrincipal)
+    assert (first.id, first.username, first.full_name) == (user.id, "alice", user.full_name)
+    assert len(statements) == 1 and "password_hash" not in statements[0], "Only token_version is loaded"
+
+    legacy = get_current_principal(bearer(user, claims=False), db)
+    assert legacy == first
+    print("✅ Test 5 passed: signed-claims principals")
+
+
+def test_token_version_bump_revokes(db, caches):
+    """Test: bumping token_version refuses older tokens on both dependencies; newer tokens work"""
+    user = make_user(db, "alice")
+    old = bearer(user)
+    get_current_principal(old, db)
+
+    user.token_version = 1
+    db.flush()
+    principal.evict_principal(user.id)
+
+    for dependency in (get_current_principal, get_current_user):
+        with pytest.raises(HTTPException) as exc:
+            dependency(old, db)
+        assert (exc.value.status_code, exc.value.detail) == (401, "Token has been revoked")
+    assert get_current_principal(bearer(user), db).token_version == 1
+
+    db.delete(user)
+    db.flush()
+    principal.evict_principal(user.id)
+    with pytest.raises(HTTPException) as exc:
+        get_current_principal(bearer(user), db)
+    assert exc.value.status_code == 401
+    print("✅ Test 6 passed: token_version revocation")
@@ -0,0 +1,148 @@
+"""
+Tests for explicit read receipts - POST /messages/read-up-to and history reads without side effects.
+Run with: python -m pytest backend/tests/test_read_up_to.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import uuid
+import pytest
+from fastapi import HTTPException, Response
+from app.models.message import Message
+from app.schemas.message import ReadUpToRequest
+from app.controllers.message import mark_read_up_to, get_conversation, get_trip_messages
+from app.utils.conversation_summary import rebuild_summaries
+from app.models.conversation_summary import ConversationSummary
+from app.models.conversation_participant import ConversationParticipant
+from app.utils.inbox import get_trip_unread_counts
+from conftest import count_queries
+from factories import make_user, connect, make_trip, make_message
+
+
+def unread_summary(db, user_id):
+    return db.query(ConversationSummary.unread_count).filter(ConversationSummary.user_id == user_id).scalar()
+
+
+def test_read_up_to_direct(db):
+    """Test: one UPDATE marks everything up to the high-water mark; newer messages stay unread"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    connect(db, me, bob)
+    first = make_message(db, bob, me, minutes=1)
+    second = make_message(db, bob, me, minutes=2)
+    mine = make_message(db, me, bob, minutes=3)
+    third = make_message(db, bob, me, minutes=4)
+    rebuild_summaries(db)
+    db.commit()
+
+    with count_queries(db) as statements:
+        result = mark_read_up_to(ReadUpToRequest(user_id=str(bob.id), message_id=str(mine.id)), current_user=me, db=db)
+    assert result["read_count"] == 2
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE MESSAGES")]) == 1
+
+    read = {m.id: m.is_read for m in db.query(Message).all()}
+    assert read[first.id] and read[second.id] and not read[third.id]
+    assert not read[mine.id], "The reader's own messages are not touched"
+    assert unread_summary(db, me.id) == 1
+
+    again = mark_read_up_to(ReadUpToRequest(user_id=str(bob.id), message_id=str(mine.id)), current_user=me, db=db)
+    assert again["read_count"] == 0
+    print("✅ Test 1 passed: 1-on-1 read-up-to")
+
+
+def test_read_up_to_trip_and_validation(db):
+    """Test: group reads skip the reader's own messages; foreign or missing marks are rejected"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    trip = make_trip(db, me, members=[bob])
+    other_trip = make_trip(db, bob)
+    theirs = make_message(db, bob, trip=trip, minutes=1)
+    mine = make_message(db, me, trip=trip, minutes=2)
+    elsewhere = make_message(db, bob, trip=other_trip, minutes=3)
+    db.commit()
+
+    result = mark_read_up_to(ReadUpToRequest(trip_id=str(trip.id), message_id=str(mine.id)), current_user=me, db=db)
+    assert result["read_count"] == 1
+    cursor = db.query(ConversationParticipant).filter(ConversationParticipant.trip_id == trip.id).one()
+    assert (cursor.user_id, cursor.last_read_message_id) == (me.id, mine.id)
+    assert db.query(Message).filter(Message.is_read == True).count() == 0, "Group reads don't touch messages"
+
+    bad_requests = [
+        (ReadUpToRequest(trip_id=str(trip.id), message_id=str(elsewhere.id)), 404),
+        (ReadUpToRequest(trip_id=str(other_trip.id), message_id=str(elsewhere.id)), 403),
+        (ReadUpToRequest(message_id=str(mine.id)), 400),
+        (ReadUpToRequest(trip_id=str(trip.id), user_id=str(bob.id), message_id=str(mine.id)), 400),
+        (ReadUpToRequest(trip_id=str(trip.id), message_id="nope"), 400)
+    ]
+    for request, status_code in bad_requests:
+        with pytest.raises(HTTPException) as exc:
+            mark_read_up_to(request, current_user=me, db=db)
+        assert exc.value.status_code == status_code
+    print("✅ Test 2 passed: trip read-up-to and validation")
+
+
+def test_group_read_cursors_are_per_member(db):
+    """Test: one member reading a group chat leaves the others' unread counts alone"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    trip = make_trip(db, bob, members=[me, carol])
+    sent = [make_message(db, bob, trip=trip, minutes=n) for n in range(1, 4)]
+    rebuild_summaries(db)
+    db.commit()
+
+    with count_queries(db) as statements:
+        mark_read_up_to(ReadUpToRequest(trip_id=str(trip.id), message_id=str(sent[1].id)), current_user=me, db=db)
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE MESSAGES")]
+
+    assert get_trip_unread_counts(db, me.id, [trip.id]) == {trip.id: 1}
+    assert get_trip_unread_counts(db, carol.id, [trip.id]) == {trip.id: 3}
+    assert (unread_summary(db, me.id), unread_summary(db, carol.id)) == (1, 3)
+
+    # Older marks never move the cursor back
+    assert mark_read_up_to(ReadUpToRequest(trip_id=str(trip.id), message_id=str(sent[0].id)), current_user=me, db=db)["read_count"] == 0
+    assert get_trip_unread_counts(db, me.id, [trip.id]) == {trip.id: 1}
+
+    history = get_trip_messages(str(trip.id), Response(), limit=50, before=None, after=None, offset=0, current_user=bob, db=db)
+    assert [m.is_read for m in history] == [True, True, False], "Read once another member has read past it"
+    print("✅ Test 3 passed: per-member group read cursors")
+
+
+def test_group_cursor_orders_by_timestamp_and_id(db):
+    """Test: a message sharing the cursor's timestamp but with a higher id is still read past"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    trip = make_trip(db, bob, members=[me])
+    low = make_message(db, bob, trip=trip, minutes=1, id=uuid.UUID("aaaaaaaa-0000-0000-0000-000000000001"))
+    high = make_message(db, bob, trip=trip, minutes=1, id=uuid.UUID("aaaaaaaa-0000-0000-0000-000000000002"))
+    db.commit()
+
+    read = lambda message: mark_read_up_to(
+        ReadUpToRequest(trip_id=str(trip.id), message_id=str(message.id)), current_user=me, db=db
+    )["read_count"]
+    assert read(low) == 1
+    assert read(high) == 1, "Same timestamp, later id"
+    assert read(low) == 0, "Never moves back"
+    cursor = db.query(ConversationParticipant).filter(ConversationParticipant.trip_id == trip.id).one()
+    assert cursor.last_read_message_id == high.id
+    print("✅ Test 4 passed: group cursors compare (created_at, id)")
+
+
+def test_fetching_history_does_not_mark_read(db):
+    """Test: GET history leaves is_read alone (1-on-1 messages are still marked delivered)"""
+    me = make_user(db, "me")
+    bob = make_user(db, "bob")
+    connect(db, me, bob)
+    trip = make_trip(db, bob, members=[me])
+    make_message(db, bob, me, minutes=1)
+    make_message(db, bob, trip=trip, minutes=2)
+    db.commit()
+
+    direct = get_conversation(str(bob.id), Response(), limit=50, before=None, after=None, offset=0, current_user=me, db=db)
+    group = get_trip_messages(str(trip.id), Response(), limit=50, before=None, after=None, offset=0, current_user=me, db=db)
+
+    assert [m.is_read for m in direct + group] == [False, False]
+    assert direct[0].is_delivered
+    assert db.query(Message).filter(Message.is_read == True).count() == 0
+    print("✅ Test 5 passed: history reads are side-effect free")
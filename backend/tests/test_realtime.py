@@ -0,0 +1,195 @@
+"""
+Tests for WebSocket fan-out - channel routing, cross-thread delivery, slow consumers,
+trip membership changes and the pub/sub backends.
+Run with: python -m pytest backend/tests/test_realtime.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import json
+import threading
+import pytest
+from app.utils import realtime
+from app.utils.realtime import ConnectionManager, user_channel, trip_channel
+from app.pubsub import InMemoryBus, PostgresBus, create_bus
+from app.pubsub.postgres import encode_payload, MAX_PAYLOAD_BYTES
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def drain():
+    """Let call_soon_threadsafe callbacks and writer tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_publish_routes_by_channel():
+    """Test: events reach only sockets subscribed to one of the channels"""
+    async def scenario():
+        manager = ConnectionManager()
+        alice, bob = FakeWebSocket(), FakeWebSocket()
+        subs = [
+            manager.connect(alice, "a", [user_channel("a"), trip_channel("t1")]),
+            manager.connect(bob, "b", [user_channel("b")])
+        ]
+        writers = [asyncio.create_task(sub.run()) for sub in subs]
+
+        manager.deliver([trip_channel("t1")], {"type": "message.created", "n": 1})
+        manager.deliver([user_channel("a"), user_channel("b")], {"type": "message.created", "n": 2})
+        await drain()
+
+        assert [e["n"] for e in alice.sent] == [1, 2]
+        assert [e["n"] for e in bob.sent] == [2]
+        for writer in writers:
+            writer.cancel()
+
+    asyncio.run(scenario())
+    print("✅ Test 1 passed: events routed by channel")
+
+
+def test_publish_from_worker_thread():
+    """Test: sync handlers can publish from the threadpool"""
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        sub = manager.connect(socket, "a", [user_channel("a")])
+        writer = asyncio.create_task(sub.run())
+
+        thread = threading.Thread(target=manager.deliver, args=([user_channel("a")], {"type": "ping"}))
+        thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        await drain()
+
+        assert socket.sent == [{"type": "ping"}]
+        writer.cancel()
+
+    asyncio.run(scenario())
+    print("✅ Test 2 passed: cross-thread publish delivered")
+
+
+def test_slow_consumer_is_disconnected(monkeypatch):
+    """Test: a socket whose queue overflows is closed instead of buffering without bound"""
+    monkeypatch.setattr(realtime, "SOCKET_QUEUE_SIZE", 2)
+
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        sub = manager.connect(socket, "a", [user_channel("a")])
+        for n in range(3):
+            manager.deliver([user_channel("a")], {"n": n})
+        await drain()
+
+        await sub.run()
+        assert socket.sent == []
+        assert socket.closed_with == 1013
+
+    asyncio.run(scenario())
+    print("✅ Test 3 passed: slow consumer disconnected")
+
+
+def test_disconnect_unsubscribes():
+    """Test: closed sockets stop receiving and empty channels are dropped"""
+    async def scenario():
+        manager = ConnectionManager()
+        sub = manager.connect(FakeWebSocket(), "a", [user_channel("a"), trip_channel("t1")])
+        assert manager.stats() == {"connections": 1, "users": 1, "channels": 2}
+        manager.disconnect(sub)
+        assert manager.stats() == {"connections": 0, "users": 0, "channels": 0}
+
+    asyncio.run(scenario())
+    print("✅ Test 4 passed: disconnect unsubscribes")
+
+
+def test_membership_events_update_subscriptions():
+    """Test: trip.member_joined/left and trip.deleted change which sockets see the trip"""
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        sub = manager.connect(socket, "a", [user_channel("a")])
+        writer = asyncio.create_task(sub.run())
+        joined = {"type": "trip.member_joined", "data": {"trip_id": "t1", "user_id": "a"}}
+        left = {"type": "trip.member_left", "data": {"trip_id": "t1", "user_id": "a", "reason": "left"}}
+
+        manager.dispatch([trip_channel("t1"), user_channel("a")], joined)
+        manager.dispatch([trip_channel("t1")], {"type": "message.created", "n": 1})
+        manager.dispatch([trip_channel("t1"), user_channel("a")], left)
+        manager.dispatch([trip_channel("t1")], {"type": "message.created", "n": 2})
+        await drain()
+
+        assert [e["type"] for e in socket.sent] == ["trip.member_joined", "message.created", "trip.member_left"]
+        assert trip_channel("t1") not in sub.channels
+
+        manager.dispatch([trip_channel("t2"), user_channel("a")], {"type": "trip.member_joined", "data": {"trip_id": "t2", "user_id": "a"}})
+        manager.dispatch([trip_channel("t2")], {"type": "trip.deleted", "data": {"trip_id": "t2"}})
+        assert manager.stats()["channels"] == 1
+        writer.cancel()
+
+    asyncio.run(scenario())
+    print("✅ Test 5 passed: membership events update subscriptions")
+
+
+def test_memory_bus_delivers_to_handlers():
+    """Test: the in-memory bus hands every event to every subscribed handler"""
+    bus = InMemoryBus()
+    received = []
+    bus.subscribe(lambda channels, event: received.append((channels, event["type"])))
+    bus.subscribe(lambda channels, event: 1 / 0)  # A failing handler doesn't stop delivery
+    bus.publish((c for c in ["user:a"]), {"type": "message.created"})
+
+    assert received == [(["user:a"], "message.created")]
+    assert bus.stats()["published"] == 1
+    with pytest.raises(ValueError, match="PUBSUB_BACKEND"):
+        create_bus("redis")
+    print("✅ Test 6 passed: in-memory bus delivers")
+
+
+def test_oversized_payload_drops_content():
+    """Test: NOTIFY payloads stay under the Postgres limit by dropping message content"""
+    event = {"type": "message.created", "data": {"id": "m1", "content": "é" * 5000}}
+    payload = encode_payload(["trip:t1"], event)
+
+    decoded = json.loads(payload)
+    assert len(payload.encode("utf-8")) <= MAX_PAYLOAD_BYTES
+    assert decoded["event"]["truncated"] is True
+    assert decoded["event"]["data"] == {"id": "m1"}
+    assert encode_payload(["trip:t1"], {"type": "message.created", "data": {"content": "short"}}) is not None
+    print("✅ Test 7 passed: oversized payloads truncated")
+
+
+@pytest.mark.integration
+def test_postgres_bus_round_trip(pg_engine):
+    """Test: an event published on one bus reaches the listener of another (two workers)"""
+    publisher, listener = PostgresBus(pg_engine), PostgresBus(pg_engine)
+    received = threading.Event()
+    events = []
+
+    def handler(channels, event):
+        events.append((channels, event))
+        received.set()
+
+    listener.subscribe(handler)
+    listener.start()
+    try:
+        for _ in range(50):  # Wait for LISTEN to be in place
+            if listener.stats()["listening"]:
+                break
+            threading.Event().wait(0.1)
+        publisher.publish(["trip:t1"], {"type": "message.created", "data": {"id": "m1"}})
+        assert received.wait(5), "Event not received"
+    finally:
+        listener.stop()
+
+    assert events == [(["trip:t1"], {"type": "message.created", "data": {"id": "m1"}})]
+    print("✅ Test 8 passed: Postgres LISTEN/NOTIFY round trip")
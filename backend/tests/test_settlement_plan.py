@@ -0,0 +1,108 @@
+"""
+Tests for the settlement planner - greedy and exact (fewest transfers) plans over
+integer-cent balances, and POST /settlements/trips/{trip_id}/plan.
+Run with: python -m pytest backend/tests/test_settlement_plan.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import pytest
+from fastapi import HTTPException
+from app.controllers.expense import plan_trip_settlement
+from app.utils import balances, settlement_plan
+from app.utils.balances import TripBalanceCache
+from app.utils.settlement_plan import Transfer, plan_exact, plan_greedy, plan_settlement
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from app.utils.trip_ledger import rebuild_trip_ledger
+from factories import make_user, make_trip, make_expense
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Fresh balance cache for each test."""
+    monkeypatch.setattr(balances, "trip_balance_cache", TripBalanceCache())
+
+
+def settles(balances, transfers):
+    """True when every transfer is positive and paying them zeroes every balance."""
+    remaining = dict(balances)
+    for transfer in transfers:
+        if transfer.amount_cents <= 0:
+            return False
+        remaining[transfer.from_user_id] += transfer.amount_cents
+        remaining[transfer.to_user_id] -= transfer.amount_cents
+    return all(cents == 0 for cents in remaining.values())
+
+
+def test_greedy_matches_largest_debtor_with_largest_creditor():
+    """Test: greedy pays the largest creditor from the largest debtor, in at most n - 1 transfers"""
+    balances = {"ann": 700, "bob": 300, "cat": -600, "dan": -400, "eve": 0}
+    transfers = plan_greedy(balances)
+    assert transfers[0] == Transfer("cat", "ann", 600)
+    assert settles(balances, transfers) and len(transfers) <= 3
+    assert plan_greedy({"ann": 0, "bob": 0}) == []
+    with pytest.raises(ValueError):
+        plan_greedy({"ann": 100, "bob": -99})
+    print("✅ Test 1 passed: greedy matching")
+
+
+def test_exact_finds_fewer_transfers_than_greedy():
+    """Test: exact splits the group into zero-sum subgroups where greedy can't"""
+    # Greedy pays 600 of e's 700 to d first and needs 4 transfers; {d, c} and {a, b, e} need 3
+    balances = {"a": 500, "b": 200, "c": -600, "d": 600, "e": -700}
+    assert len(plan_greedy(balances)) == 4
+    exact = plan_exact(balances)
+    assert settles(balances, exact) and len(exact) == 3
+
+    rng = random.Random(7)
+    for _ in range(200):
+        values = [rng.choice([-500, -300, -200, -100, 100, 200, 300, 500]) for _ in range(rng.randint(1, 8))]
+        values.append(-sum(values))
+        case = {f"m{index}": cents for index, cents in enumerate(values)}
+        exact, greedy = plan_exact(case), plan_greedy(case)
+        assert settles(case, exact) and settles(case, greedy)
+        assert len(exact) <= len(greedy)
+    print("✅ Test 2 passed: exact plans are minimal")
+
+
+def test_auto_mode_switches_to_greedy_for_large_groups(monkeypatch):
+    """Test: auto uses exact up to SETTLEMENT_EXACT_MAX_MEMBERS open balances, greedy beyond"""
+    monkeypatch.setattr(settlement_plan, "SETTLEMENT_EXACT_MAX_MEMBERS", 4)
+    small = {"a": 300, "b": -100, "c": -200, "d": 0, "e": 0}
+    large = {"a": 400, "b": -100, "c": -100, "d": -100, "e": -100}
+    assert plan_settlement(small)[0] == "exact"
+    assert plan_settlement(large)[0] == "greedy"
+    with pytest.raises(ValueError):
+        plan_settlement(large, "exact")
+    with pytest.raises(ValueError):
+        plan_settlement(small, "fastest")
+    print("✅ Test 3 passed: auto mode")
+
+
+def test_plan_endpoint_settles_trip_balances(db):
+    """Test: the endpoint plans over the trip's outstanding balances, for accepted members only"""
+    ann, bob, cat = make_user(db, "ann"), make_user(db, "bob"), make_user(db, "cat")
+    trip = make_trip(db, ann, members=[bob, cat])
+    make_expense(db, trip, ann, [ann, bob, cat], amount_cents=900)
+    make_expense(db, trip, bob, [bob, cat], amount_cents=400)
+    outsider = make_user(db, "outsider")
+    rebuild_trip_ledger(db, [trip.id])
+    db.commit()
+    principal = TokenPrincipal.from_claims(principal_claims(cat))
+
+    plan = plan_trip_settlement(str(trip.id), mode="auto", current_user=principal, db=db)
+    assert plan.mode == "exact"
+    # Nets: ann +600, bob -100, cat -500
+    paid = {(t.from_user["username"], t.to_user["username"]): t.amount_cents for t in plan.transfers}
+    assert paid == {("cat", "ann"): 500, ("bob", "ann"): 100}
+    assert plan.transfers[0].amount == "5.00"
+
+    for mode, user, code in (("fastest", cat, 400), ("auto", outsider, 403)):
+        with pytest.raises(HTTPException) as exc:
+            plan_trip_settlement(str(trip.id), mode=mode,
+                                 current_user=TokenPrincipal.from_claims(principal_claims(user)), db=db)
+        assert exc.value.status_code == code
+    print("✅ Test 4 passed: plan endpoint")
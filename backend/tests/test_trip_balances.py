@@ -0,0 +1,125 @@
+"""
+Tests for the trip balance engine - net per-member balances from one grouped query,
+VOID expenses and PAID settlements left out, reads from the ledger and the per-trip cache.
+Run with: python -m pytest backend/tests/test_trip_balances.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from fastapi import HTTPException
+from app.controllers.expense import get_trip_balances, mark_settlement_paid
+from app.models.expense import Settlement, SettlementExpense
+from app.utils import balances
+from app.utils.balances import TripBalanceCache, TRIP_BALANCES_CHANGED, aggregate_balances, evict_trip_balances
+from app.utils.trip_ledger import rebuild_trip_ledger
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from conftest import count_queries
+from factories import make_user, make_trip, make_expense
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Fresh balance cache for each test."""
+    fresh = TripBalanceCache()
+    monkeypatch.setattr(balances, "trip_balance_cache", fresh)
+    return fresh
+
+
+def as_principal(user):
+    return TokenPrincipal.from_claims(principal_claims(user))
+
+
+def nets(sheet):
+    return {member.user["username"]: member.net_cents for member in sheet.members}
+
+
+def backfill(db, trip):
+    """Bring the trip's ledger rows in line with its expenses (the factories write no ledger entries)."""
+    rebuild_trip_ledger(db, [trip.id])
+    db.commit()
+
+
+def make_settlement(db, trip, creator, expenses, status="PENDING"):
+    settlement = Settlement(trip_id=trip.id, created_by_user_id=creator.id, status=status)
+    db.add(settlement)
+    db.flush()
+    for expense in expenses:
+        db.add(SettlementExpense(settlement_id=settlement.id, expense_id=expense.id))
+    db.flush()
+    return settlement
+
+
+def test_balances_net_to_zero_without_void_or_paid(db):
+    """Test: nets are paid - share, sum to zero, and skip VOID and PAID-settled expenses"""
+    ann, bob, cat, dan = (make_user(db, name) for name in ("ann", "bob", "cat", "dan"))
+    trip = make_trip(db, ann, members=[bob, cat, dan])
+    make_expense(db, trip, ann, [ann, bob, cat], amount_cents=900)
+    make_expense(db, trip, bob, [bob, cat], amount_cents=401)  # bob's share carries the odd cent
+    make_expense(db, trip, cat, [ann, bob, cat], amount_cents=3000, status="VOID")
+    paid_off = make_expense(db, trip, dan, [ann, dan], amount_cents=5000)
+    pending = make_expense(db, trip, cat, [ann, cat], amount_cents=200)
+    make_settlement(db, trip, ann, [paid_off], status="PAID")
+    make_settlement(db, trip, ann, [pending])
+    db.commit()
+
+    totals = {balance.user_id: balance for balance in aggregate_balances(db, [trip.id])[trip.id]}
+    assert totals[ann.id].paid_cents == 900 and totals[ann.id].share_cents == 300 + 100
+    assert dan.id not in totals, "Only in a PAID settlement"
+    assert sum(balance.net_cents for balance in totals.values()) == 0
+
+    backfill(db, trip)
+    sheet = get_trip_balances(str(trip.id), current_user=as_principal(bob), db=db)
+    assert nets(sheet) == {"ann": 500, "bob": -100, "cat": -400, "dan": 0}
+    assert [member.user["username"] for member in sheet.members] == ["ann", "dan", "bob", "cat"], "Largest net first"
+    assert sheet.members[2].net == "-1.00" and sheet.members[0].paid == "9.00"
+    print("✅ Test 1 passed: balances net to zero, VOID and PAID left out")
+
+
+def test_balances_are_cached_until_evicted(db, cache):
+    """Test: a warm trip skips the aggregate; eviction (locally or from the bus) recomputes"""
+    ann, bob = make_user(db, "ann"), make_user(db, "bob")
+    trip = make_trip(db, ann, members=[bob])
+    make_expense(db, trip, ann, [ann, bob], amount_cents=1000)
+    backfill(db, trip)
+    principal, trip_id = as_principal(ann), str(trip.id)
+
+    with count_queries(db) as cold:
+        get_trip_balances(trip_id, current_user=principal, db=db)
+    with count_queries(db) as warm:
+        sheet = get_trip_balances(trip_id, current_user=principal, db=db)
+    assert len(warm) == len(cold) - 1, (cold, warm)
+    assert nets(sheet) == {"ann": 500, "bob": -500}
+
+    make_expense(db, trip, bob, [ann, bob], amount_cents=1000)
+    backfill(db, trip)
+    assert nets(get_trip_balances(trip_id, current_user=principal, db=db))["ann"] == 500, "Still cached"
+    evict_trip_balances(trip.id)
+    assert nets(get_trip_balances(trip_id, current_user=principal, db=db))["ann"] == 0
+
+    cache.dispatch([], {"type": TRIP_BALANCES_CHANGED, "data": {"trip_id": trip_id}})
+    assert cache.get(trip_id) is None
+    print("✅ Test 2 passed: balances cached until evicted")
+
+
+def test_paying_a_settlement_evicts_balances(db):
+    """Test: mark_settlement_paid takes its expenses out of the ledger and drops the cached balances"""
+    ann, bob = make_user(db, "ann"), make_user(db, "bob")
+    trip = make_trip(db, ann, members=[bob])
+    expense = make_expense(db, trip, ann, [ann, bob], amount_cents=1000)
+    settlement = make_settlement(db, trip, bob, [expense])
+    backfill(db, trip)
+    owner, trip_id, settlement_id = as_principal(ann), str(trip.id), str(settlement.id)
+
+    assert nets(get_trip_balances(trip_id, current_user=owner, db=db)) == {"ann": 500, "bob": -500}
+    mark_settlement_paid(settlement_id, current_user=owner, db=db)
+    assert nets(get_trip_balances(trip_id, current_user=owner, db=db)) == {"ann": 0, "bob": 0}
+
+    outsider = make_user(db, "outsider")
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        get_trip_balances(trip_id, current_user=as_principal(outsider), db=db)
+    assert exc.value.status_code == 403
+    print("✅ Test 3 passed: paying a settlement evicts balances")
@@ -0,0 +1,173 @@
+"""
+Tests for the per-trip balance ledger - deltas applied by expense and settlement writes,
+and rebuild_trip_ledger() drift reports and repair.
+Run with: python -m pytest backend/tests/test_trip_ledger.py
+The write-path test needs Postgres (expense writes keep a JSONB audit log):
+    TEST_DATABASE_URL=postgresql://... python -m pytest backend/tests/test_trip_ledger.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.controllers.expense import create_expense, update_expense, void_expense, create_settlement, mark_settlement_paid
+from app.models.trip_member_balance import TripMemberBalance
+from app.schemas.expense import ExpenseCreate, ExpenseUpdate, SettlementCreate
+from app.utils import balances
+from app.utils.balances import TripBalanceCache, load_trip_balances
+from app.utils.trip_ledger import LedgerEntry, apply_entries, expense_entries, rebuild_trip_ledger
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from factories import make_user, make_trip, make_expense
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Fresh balance cache for each test."""
+    monkeypatch.setattr(balances, "trip_balance_cache", TripBalanceCache())
+
+
+def ledger_rows(db, trip):
+    return {
+        row.user_id: (row.paid_cents, row.share_cents)
+        for row in db.query(TripMemberBalance).filter(TripMemberBalance.trip_id == trip.id).all()
+    }
+
+
+def test_entries_add_and_subtract(db):
+    """Test: entries accumulate per member, and removing one undoes exactly what adding it did"""
+    ann, bob, cat = make_user(db, "ann"), make_user(db, "bob"), make_user(db, "cat")
+    trip = make_trip(db, ann, members=[bob, cat])
+    dinner = LedgerEntry(ann.id, 900, ((ann.id, 300), (bob.id, 300), (cat.id, 300)))
+    taxi = LedgerEntry(bob.id, 401, ((bob.id, 201), (cat.id, 200)))
+
+    apply_entries(db, trip.id, added=[dinner])
+    apply_entries(db, trip.id, added=[taxi])
+    db.commit()
+    assert ledger_rows(db, trip) == {ann.id: (900, 300), bob.id: (401, 501), cat.id: (0, 500)}
+
+    # An edit: swap the taxi for a cheaper one split between bob and ann
+    apply_entries(db, trip.id, added=[LedgerEntry(bob.id, 200, ((bob.id, 100), (ann.id, 100)))], removed=[taxi])
+    apply_entries(db, trip.id, removed=[dinner])
+    db.commit()
+    assert ledger_rows(db, trip) == {ann.id: (0, 100), bob.id: (200, 100), cat.id: (0, 0)}
+    assert {balance.user_id for balance in load_trip_balances(db, trip.id)} == {ann.id, bob.id}, "Square rows are left out"
+    print("✅ Test 1 passed: ledger entries add and subtract")
+
+
+def test_rebuild_reports_and_repairs_drift(db):
+    """Test: rebuild lists every member whose row is off, fixes them, and then finds nothing"""
+    ann, bob, cat = make_user(db, "ann"), make_user(db, "bob"), make_user(db, "cat")
+    trip = make_trip(db, ann, members=[bob, cat])
+    other = make_trip(db, bob, members=[cat])
+    dinner = make_expense(db, trip, ann, [ann, bob, cat], amount_cents=900)
+    make_expense(db, other, bob, [bob, cat], amount_cents=400)
+    db.commit()
+
+    apply_entries(db, trip.id, added=expense_entries(db, [dinner]))
+    db.commit()
+    assert rebuild_trip_ledger(db, [trip.id], repair=False) == []
+
+    # Lose bob's share and invent a row for someone with no expenses
+    db.query(TripMemberBalance).filter(TripMemberBalance.user_id == bob.id).delete()
+    apply_entries(db, trip.id, added=[LedgerEntry(cat.id, 50, ())])
+    db.commit()
+
+    drift = rebuild_trip_ledger(db, repair=False)
+    found = {(entry.trip_id, entry.user_id): (entry.ledger, entry.actual) for entry in drift}
+    assert found == {
+        (trip.id, bob.id): ((0, 0), (0, 300)),
+        (trip.id, cat.id): ((50, 300), (0, 300)),
+        (other.id, bob.id): ((0, 0), (400, 200)),
+        (other.id, cat.id): ((0, 0), (0, 200)),
+    }
+    db.rollback()
+
+    assert len(rebuild_trip_ledger(db)) == 4
+    db.commit()
+    assert rebuild_trip_ledger(db, repair=False) == []
+    assert ledger_rows(db, trip) == {ann.id: (900, 300), bob.id: (0, 300), cat.id: (0, 300)}
+    print("✅ Test 2 passed: rebuild reports and repairs drift")
+
+
+@pytest.fixture
+def pg_db(pg_engine):
+    conn = pg_engine.connect()
+    trans = conn.begin()
+    conn.execute(text("CREATE SCHEMA ledger_test"))
+    conn.execute(text("SET LOCAL search_path TO ledger_test"))
+    Base.metadata.create_all(conn)
+    db = Session(bind=conn, autoflush=False)
+    try:
+        yield db
+    finally:
+        db.close()
+        trans.rollback()
+        conn.close()
+
+
+@pytest.mark.integration
+def test_expense_and_settlement_writes_keep_the_ledger_exact(pg_db):
+    """Test: create, edit, void and paying a settlement leave no drift and the right nets"""
+    db = pg_db
+    ann, bob, cat = make_user(db, "ann"), make_user(db, "bob"), make_user(db, "cat")
+    trip = make_trip(db, ann, members=[bob, cat])
+    db.commit()
+    owner = TokenPrincipal.from_claims(principal_claims(ann))
+    trip_id, ids = str(trip.id), [str(ann.id), str(bob.id), str(cat.id)]
+
+    def nets():
+        return {balance.user_id: balance.net_cents for balance in load_trip_balances(db, trip.id)}
+
+    dinner = create_expense(trip_id, ExpenseCreate(amount="90.00", payer_user_id=ids[0], participant_user_ids=ids),
+                            current_user=owner, db=db)
+    taxi = create_expense(trip_id, ExpenseCreate(amount="40.01", payer_user_id=ids[1], participant_user_ids=ids[1:]),
+                          current_user=owner, db=db)
+    museum = create_expense(trip_id, ExpenseCreate(amount="30.00", payer_user_id=ids[2], participant_user_ids=ids),
+                            current_user=owner, db=db)
+    assert nets() == {ann.id: 5000, bob.id: -2000, cat.id: -3000}
+
+    # The museum is voided after joining the settlement: paying it must not subtract it again
+    settlement = create_settlement(SettlementCreate(expense_ids=[dinner.id, museum.id]), current_user=owner, db=db)
+    update_expense(taxi.id, ExpenseUpdate(participant_user_ids=ids, payer_user_id=ids[1]), current_user=owner, db=db)
+    void_expense(museum.id, current_user=owner, db=db)
+    assert rebuild_trip_ledger(db, [trip.id], repair=False) == []
+
+    mark_settlement_paid(settlement.id, current_user=owner, db=db)
+    assert rebuild_trip_ledger(db, [trip.id], repair=False) == []
+    # Only the taxi is left: 40.01 paid by bob, split three ways with the odd cent on him
+    assert nets() == {ann.id: -1333, bob.id: 2666, cat.id: -1333}
+    print("✅ Test 3 passed: expense and settlement writes keep the ledger exact")
+
+
+@pytest.mark.integration
+def test_amount_and_payer_edits_resplit_the_expense(pg_db):
+    """Test: editing only the amount or payer re-splits the expense, and the response matches the rows"""
+    db = pg_db
+    ann, bob, cat = make_user(db, "ann"), make_user(db, "bob"), make_user(db, "cat")
+    trip = make_trip(db, ann, members=[bob, cat])
+    db.commit()
+    owner = TokenPrincipal.from_claims(principal_claims(ann))
+    trip_id, ids = str(trip.id), [str(ann.id), str(bob.id), str(cat.id)]
+
+    created = create_expense(trip_id, ExpenseCreate(amount="30.00", payer_user_id=ids[0], participant_user_ids=ids),
+                             current_user=owner, db=db)
+    assert created.created_at and created.creator["username"] == "ann"
+    assert [split.share_cents for split in created.splits] == [1000, 1000, 1000]
+
+    edited = update_expense(created.id, ExpenseUpdate(amount="10.00"), current_user=owner, db=db)
+    assert sorted(split.share_cents for split in edited.splits) == [333, 333, 334]
+    edited = update_expense(created.id, ExpenseUpdate(payer_user_id=ids[2]), current_user=owner, db=db)
+    assert {split.user_id: split.share_cents for split in edited.splits}[ids[2]] == 334, "Odd cent moves to the payer"
+    assert edited.payer["username"] == "cat"
+    assert rebuild_trip_ledger(db, [trip.id], repair=False) == []
+    assert sum(balance.net_cents for balance in load_trip_balances(db, trip.id)) == 0
+
+    with pytest.raises(HTTPException) as error:
+        update_expense(created.id, ExpenseUpdate(participant_user_ids=ids[:2]), current_user=owner, db=db)
+    assert error.value.status_code == 400
+    print("✅ Test 4 passed: amount and payer edits re-split the expense")
@@ -0,0 +1,168 @@
+"""
+Tests for trip reads - participants and their users eager-loaded in a constant number of queries,
+and the paginated, filterable trip list.
+Run with: python -m pytest backend/tests/test_trip_queries.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Response
+from app.controllers.trip import get_trips, get_trip, update_trip, invite_users_to_trip, update_participant_status
+from app.models.trip import TripParticipant
+from app.schemas.trip import TripUpdate, TripInviteRequest, TripParticipantUpdate
+from app.utils.auth import principal_claims
+from app.utils.principal import TokenPrincipal
+from app.utils.pagination import CURSOR_HEADER
+from conftest import count_queries
+from factories import BASE_TIME, make_user, connect, make_trip
+
+
+def as_principal(user):
+    return TokenPrincipal.from_claims(principal_claims(user))
+
+
+def list_trips(db, principal, **params):
+    """Call get_trips with its query defaults; returns (titles, next cursor)."""
+    args = dict(limit=50, before=None, trip_status=None, start_date=None, end_date=None, role=None,
+                include_participants=True)
+    args.update(params)
+    response = Response()
+    trips = get_trips(response, current_user=principal, db=db, **args)
+    return trips, response.headers.get(CURSOR_HEADER)
+
+
+def make_people(db, prefix, count):
+    return [make_user(db, f"{prefix}{index}") for index in range(count)]
+
+
+def test_trip_list_is_three_queries(db):
+    """Test: 30 trips of 8 people load in 3 queries, with every participant and user"""
+    me = make_user(db, "me")
+    friends = make_people(db, "friend", 7)
+    for index in range(30):
+        make_trip(db, me, members=friends, title=f"Trip {index}")
+    make_trip(db, friends[0], title="Not mine")
+    db.commit()
+    principal = as_principal(me)
+
+    with count_queries(db) as statements:
+        trips, cursor = list_trips(db, principal)
+    assert len(statements) == 3, statements
+    assert len(trips) == 30 and cursor is None
+    assert all(len(trip.participants) == 8 for trip in trips), "One entry per participant"
+    assert all(p.user and p.user["username"] == "friend3" for trip in trips for p in trip.participants
+               if p.user_id == str(friends[3].id))
+    print("✅ Test 1 passed: trip list in 3 queries")
+
+
+def test_trip_endpoints_do_not_grow_with_the_trip(db):
+    """Test: get, update, invite and accept cost the same for a 3- and an 8-person trip"""
+    me = make_user(db, "me")
+    invitees = make_people(db, "invitee", 4)
+    for invitee in invitees:
+        connect(db, me, invitee)
+    small = make_trip(db, me, members=make_people(db, "small", 2), title="Small")
+    large = make_trip(db, me, members=make_people(db, "large", 7), title="Large")
+    db.commit()
+    principals = {user.id: as_principal(user) for user in [me] + invitees}
+
+    # Read ids up front: touching expired ORM objects inside a block would count their refresh
+    cases = [(label, str(trip.id), str(invitee.id), principals[invitee.id])
+             for label, trip, invitee in (("small", small, invitees[0]), ("large", large, invitees[1]))]
+    owner = principals[me.id]
+
+    costs = {}
+    for label, trip_id, invitee_id, invitee in cases:
+        with count_queries(db) as get_statements:
+            get_trip(trip_id, current_user=owner, db=db)
+        with count_queries(db) as update_statements:
+            update_trip(trip_id, TripUpdate(title="Renamed"), current_user=owner, db=db)
+        with count_queries(db) as invite_statements:
+            invite_users_to_trip(trip_id, TripInviteRequest(user_ids=[invitee_id]), current_user=owner, db=db)
+        participant_id = str(db.query(TripParticipant.id).filter_by(trip_id=uuid.UUID(trip_id), user_id=invitee.id).scalar())
+        with count_queries(db) as accept_statements:
+            accepted = update_participant_status(trip_id, participant_id, TripParticipantUpdate(status="accepted"),
+                                                 current_user=invitee, db=db)
+        assert accepted.status == "accepted" and accepted.user["username"] == invitee.username
+        costs[label] = [len(s) for s in (get_statements, update_statements, invite_statements, accept_statements)]
+
+    assert costs["small"] == costs["large"], costs
+    assert costs["small"][0] == 3, "Trip, participants, users"
+    print("✅ Test 2 passed: trip endpoints in a constant number of queries")
+
+
+def test_invite_skips_unconnected_and_existing(db):
+    """Test: only connected users who aren't participants yet are invited; bad ids are ignored"""
+    me = make_user(db, "me")
+    member, friend, reverse_friend, stranger, requested = make_people(db, "user", 5)
+    connect(db, me, member)
+    connect(db, me, friend)
+    connect(db, reverse_friend, me)
+    connect(db, me, requested, status="pending")
+    trip = make_trip(db, me, members=[member])
+    db.commit()
+
+    ids = [str(member.id), str(friend.id), str(reverse_friend.id), str(stranger.id), str(requested.id),
+           str(uuid.uuid4()), "not-a-uuid", str(friend.id)]
+    participants = invite_users_to_trip(str(trip.id), TripInviteRequest(user_ids=ids), current_user=as_principal(me), db=db)
+    statuses = {p.user["username"]: p.status for p in participants}
+    assert statuses == {"me": "accepted", "user0": "accepted", "user1": "pending", "user2": "pending"}
+    print("✅ Test 3 passed: invite filters")
+
+
+def test_trip_list_pages_by_cursor(db):
+    """Test: ?before= walks the list newest first without gaps or repeats"""
+    me = make_user(db, "me")
+    for index in range(7):
+        make_trip(db, me, title=f"Trip {index}", created_at=BASE_TIME + timedelta(days=index))
+    db.commit()
+    principal = as_principal(me)
+
+    titles, cursor = [], None
+    while True:
+        trips, cursor = list_trips(db, principal, limit=3, before=cursor)
+        titles += [trip.title for trip in trips]
+        if not cursor:
+            break
+    assert titles == [f"Trip {index}" for index in reversed(range(7))]
+
+    trips, _ = list_trips(db, principal, limit=3, include_participants=False)
+    assert all(trip.participants is None for trip in trips)
+    with pytest.raises(HTTPException) as exc:
+        list_trips(db, principal, before="not-a-cursor")
+    assert exc.value.status_code == 400
+    print("✅ Test 4 passed: cursor pagination")
+
+
+def test_trip_list_filters(db):
+    """Test: status, date-window and role filters"""
+    me = make_user(db, "me")
+    friend = make_user(db, "friend")
+    day = lambda n: datetime(2025, 6, 1) + timedelta(days=n)
+    make_trip(db, me, title="Past", status="completed", start_date=day(-30), end_date=day(-20))
+    make_trip(db, me, title="Ongoing", status="active", start_date=day(-2), end_date=day(3))
+    make_trip(db, me, title="Upcoming", status="planning", start_date=day(10), end_date=day(15))
+    make_trip(db, me, title="Undated", status="planning")
+    make_trip(db, friend, members=[me], title="Friend's", status="planning", start_date=day(40))
+    db.commit()
+    principal = as_principal(me)
+
+    def titles(**params):
+        return sorted(trip.title for trip in list_trips(db, principal, **params)[0])
+
+    assert titles(trip_status="planning") == ["Friend's", "Undated", "Upcoming"]
+    assert titles(start_date=day(0)) == ["Friend's", "Ongoing", "Upcoming"]
+    assert titles(start_date=day(0), end_date=day(30)) == ["Ongoing", "Upcoming"]
+    assert titles(end_date=day(0)) == ["Ongoing", "Past"]
+    assert titles(role="member") == ["Friend's"]
+    assert titles(role="creator", trip_status="planning") == ["Undated", "Upcoming"]
+
+    for bad in (dict(trip_status="archived"), dict(role="owner"), dict(start_date=day(5), end_date=day(1))):
+        with pytest.raises(HTTPException) as exc:
+            list_trips(db, principal, **bad)
+        assert exc.value.status_code == 400
+    print("✅ Test 5 passed: trip list filters")
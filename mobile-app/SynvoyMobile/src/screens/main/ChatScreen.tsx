@@ -73,6 +73,7 @@ const ChatScreen = ({ route, navigation }: any) => {
   const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
   const flatListRef = useRef<FlatList>(null);
   const intervalRef = useRef<NodeJS.Timeout | null>(null);
+  const lastReadIdRef = useRef<string | null>(null);
 
   useEffect(() => {
     if (user && (userId || tripId)) {
@@ -147,6 +148,13 @@ const ChatScreen = ({ route, navigation }: any) => {
       // This matches the web app behavior - messages from top to bottom
       setMessages(fetchedMessages);
       
+      // Fetching no longer marks messages read; acknowledge up to the newest one we've shown
+      const newest = fetchedMessages[fetchedMessages.length - 1];
+      if (newest && newest.id !== lastReadIdRef.current) {
+        lastReadIdRef.current = newest.id;
+        apiService.markReadUpTo(newest.id, tripId ? undefined : userId, tripId).catch(() => {});
+      }
+      
       // Extract other user info from messages (only for 1-on-1 chat)
       if (userId && fetchedMessages.length > 0 && !otherUser) {
         const firstMessage = fetchedMessages[0];
@@ -108,7 +108,7 @@ const DashboardScreen = ({ navigation }: any) => {
 
     const fetchPendingTrips = async () => {
       try {
-        const fetchedTrips = await apiService.getTrips();
+        const fetchedTrips = await apiService.getAllTrips();
         // Count trips where current user has a pending invitation
         const pendingTrips = fetchedTrips.filter((trip: any) => {
           if (!trip.participants) return false;
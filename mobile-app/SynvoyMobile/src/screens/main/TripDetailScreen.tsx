@@ -274,7 +274,7 @@ const TripDetailScreen = ({ route, navigation }: any) => {
     if (!tripId) return;
     setLoadingExpenses(true);
     try {
-      const fetchedExpenses = await apiService.getTripExpenses(tripId);
+      const fetchedExpenses = await apiService.getAllTripExpenses(tripId);
       setExpenses(fetchedExpenses);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch expenses');
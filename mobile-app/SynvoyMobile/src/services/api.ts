@@ -1,4 +1,4 @@
-import axios, { AxiosInstance, AxiosError } from 'axios';
+import axios, { AxiosInstance, AxiosError, AxiosResponse } from 'axios';
 import AsyncStorage from '@react-native-async-storage/async-storage';
 
 // Use a function to get API URL to avoid issues during module initialization
@@ -23,6 +23,40 @@ const getApiBaseUrl = (): string => {
   return 'https://www.synvoy.com/api';
 };
 
+// One page of a keyset-paginated list: pass nextCursor as `before` for the next page (null on the last one)
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+// Trip list filters (GET /trips/)
+export interface TripListParams {
+  limit?: number;
+  before?: string;
+  status?: 'planning' | 'active' | 'completed' | 'cancelled';
+  start_date?: string;
+  end_date?: string;
+  role?: 'creator' | 'member';
+  include_participants?: boolean;
+}
+
+const toPage = <T>(response: AxiosResponse<T[]>): Page<T> => ({
+  items: response.data,
+  nextCursor: (response.headers['x-next-cursor'] as string | undefined) ?? null,
+});
+
+// Every item of a paginated list, following nextCursor page by page
+const fetchAllPages = async <T>(fetchPage: (before?: string) => Promise<Page<T>>): Promise<T[]> => {
+  const items: T[] = [];
+  let before: string | undefined;
+  do {
+    const page = await fetchPage(before);
+    items.push(...page.items);
+    before = page.nextCursor ?? undefined;
+  } while (before);
+  return items;
+};
+
 class ApiService {
   private client: AxiosInstance;
   private token: string | null = null;
@@ -173,6 +207,10 @@ class ApiService {
         current_password: currentPassword,
         new_password: newPassword,
       });
+      // Changing the password revokes older tokens; keep using the fresh one
+      if (response.data.access_token) {
+        await this.setToken(response.data.access_token);
+      }
       return response.data;
     } catch (error: any) {
       console.error('API change password error:', error);
@@ -226,9 +264,15 @@ class ApiService {
   }
 
   // Trip endpoints
-  async getTrips() {
-    const response = await this.client.get('/trips/');
-    return response.data;
+  // One page of trips, newest first
+  async getTrips(params?: TripListParams): Promise<Page<any>> {
+    const response = await this.client.get('/trips/', { params });
+    return toPage(response);
+  }
+
+  // All trips, newest first, following the pages
+  async getAllTrips(params?: Omit<TripListParams, 'limit' | 'before'>): Promise<any[]> {
+    return fetchAllPages((before) => this.getTrips({ ...params, limit: 100, before }));
   }
 
   async getTrip(id: string) {
@@ -279,10 +323,27 @@ class ApiService {
     return response.data;
   }
 
-  async getTripExpenses(tripId: string, includeVoid: boolean = false) {
+  // One page of a trip's expenses, newest first
+  async getTripExpenses(tripId: string, includeVoid: boolean = false, params?: {
+    limit?: number;
+    before?: string;
+    start_date?: string;
+    end_date?: string;
+    payer_user_id?: string;
+  }): Promise<Page<any>> {
     const response = await this.client.get(`/expenses/trips/${tripId}/expenses`, {
-      params: { include_void: includeVoid }
+      params: { include_void: includeVoid, ...params }
     });
+    return toPage(response);
+  }
+
+  // All of a trip's expenses, newest first, following the pages
+  async getAllTripExpenses(tripId: string, includeVoid: boolean = false): Promise<any[]> {
+    return fetchAllPages((before) => this.getTripExpenses(tripId, includeVoid, { limit: 100, before }));
+  }
+
+  async getTripBalances(tripId: string) {
+    const response = await this.client.get(`/expenses/trips/${tripId}/balances`);
     return response.data;
   }
 
@@ -318,6 +379,11 @@ class ApiService {
     return response.data;
   }
 
+  async planSettlement(tripId: string, mode: 'auto' | 'greedy' | 'exact' = 'auto') {
+    const response = await this.client.post(`/settlements/trips/${tripId}/plan`, null, { params: { mode } });
+    return response.data;
+  }
+
   // Price alert endpoints
   async getAlerts() {
     const response = await this.client.get('/alerts');
@@ -426,6 +492,15 @@ class ApiService {
     return response.data;
   }
 
+  async markReadUpTo(messageId: string, userId?: string, tripId?: string) {
+    const response = await this.client.post('/messages/read-up-to', {
+      message_id: messageId,
+      user_id: userId,
+      trip_id: tripId,
+    });
+    return response.data;
+  }
+
   async clearChat(userId?: string, tripId?: string) {
     const response = await this.client.post('/messages/clear-chat', {
       user_id: userId,
@@ -492,7 +567,8 @@ export const apiService = {
   }) => getApiService().register(data),
   getProfile: () => getApiService().getProfile(),
   updateProfile: (data: any) => getApiService().updateProfile(data),
-  getTrips: () => getApiService().getTrips(),
+  getTrips: (params?: TripListParams) => getApiService().getTrips(params),
+  getAllTrips: (params?: Omit<TripListParams, 'limit' | 'before'>) => getApiService().getAllTrips(params),
   getTrip: (id: string) => getApiService().getTrip(id),
   createTrip: (data: any) => getApiService().createTrip(data),
   updateTrip: (id: string, data: any) => getApiService().updateTrip(id, data),
@@ -502,13 +578,16 @@ export const apiService = {
   removeParticipant: (tripId: string, participantId: string) => getApiService().removeParticipant(tripId, participantId),
   // Expense endpoints
   createExpense: (tripId: string, expenseData: any) => getApiService().createExpense(tripId, expenseData),
-  getTripExpenses: (tripId: string, includeVoid?: boolean) => getApiService().getTripExpenses(tripId, includeVoid),
+  getTripExpenses: (tripId: string, includeVoid?: boolean, params?: Parameters<ApiService['getTripExpenses']>[2]) => getApiService().getTripExpenses(tripId, includeVoid, params),
+  getAllTripExpenses: (tripId: string, includeVoid?: boolean) => getApiService().getAllTripExpenses(tripId, includeVoid),
+  getTripBalances: (tripId: string) => getApiService().getTripBalances(tripId),
   updateExpense: (expenseId: string, expenseData: any) => getApiService().updateExpense(expenseId, expenseData),
   voidExpense: (expenseId: string) => getApiService().voidExpense(expenseId),
   // Settlement endpoints
   getTripSettlements: (tripId: string) => getApiService().getTripSettlements(tripId),
   createSettlement: (settlementData: any) => getApiService().createSettlement(settlementData),
   markSettlementPaid: (settlementId: string) => getApiService().markSettlementPaid(settlementId),
+  planSettlement: (tripId: string, mode?: 'auto' | 'greedy' | 'exact') => getApiService().planSettlement(tripId, mode),
   getAlerts: () => getApiService().getAlerts(),
   createAlert: (data: any) => getApiService().createAlert(data),
   updateAlert: (id: string, data: any) => getApiService().updateAlert(id, data),
@@ -528,6 +607,7 @@ export const apiService = {
   getConversation: (userId: string, limit?: number, offset?: number) => getApiService().getConversation(userId, limit, offset),
   getTripMessages: (tripId: string, limit?: number, offset?: number) => getApiService().getTripMessages(tripId, limit, offset),
   sendMessage: (content: string, receiverId?: string, tripId?: string) => getApiService().sendMessage(content, receiverId, tripId),
+  markReadUpTo: (messageId: string, userId?: string, tripId?: string) => getApiService().markReadUpTo(messageId, userId, tripId),
   clearChat: (userId?: string, tripId?: string) => getApiService().clearChat(userId, tripId),
   deleteMessageForEveryone: (messageId: string) => getApiService().deleteMessageForEveryone(messageId),
   leaveGroup: (tripId: string) => getApiService().leaveGroup(tripId),
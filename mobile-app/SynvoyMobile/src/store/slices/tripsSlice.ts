@@ -30,7 +30,7 @@ const initialState: TripsState = {
 
 export const fetchTrips = createAsyncThunk('trips/fetchAll', async (_, { rejectWithValue }) => {
   try {
-    const data = await apiService.getTrips();
+    const data = await apiService.getAllTrips();
     return data;
   } catch (error: any) {
     return rejectWithValue(error.response?.data?.detail || 'Failed to fetch trips');
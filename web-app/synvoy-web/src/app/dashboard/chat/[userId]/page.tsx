@@ -64,6 +64,7 @@ export default function ChatPage() {
   const shouldScrollRef = useRef(true);
   const previousMessagesCountRef = useRef(0);
   const isInitialLoadRef = useRef(true);
+  const lastReadIdRef = useRef<string | null>(null);
   const isLoadingRef = useRef(false);
   const menuRef = useRef<HTMLDivElement>(null);
 
@@ -177,6 +178,13 @@ export default function ChatPage() {
     try {
       const fetchedMessages = await messageAPI.getConversation(userId);
       
+      // Fetching no longer marks messages read; acknowledge up to the newest one we've shown
+      const newest = fetchedMessages[fetchedMessages.length - 1];
+      if (newest && newest.id !== lastReadIdRef.current) {
+        lastReadIdRef.current = newest.id;
+        messageAPI.markReadUpTo(newest.id, userId).catch(() => {});
+      }
+      
       // Debug: Log message data to check if is_delivered and is_read are present
       if (fetchedMessages.length > 0) {
         console.log('Sample message data:', fetchedMessages[0]);
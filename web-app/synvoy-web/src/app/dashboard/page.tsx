@@ -100,7 +100,7 @@ export default function DashboardPage() {
 
     const fetchPendingTrips = async () => {
       try {
-        const trips = await tripAPI.getTrips();
+        const trips = await tripAPI.getAllTrips();
         // Count trips where current user has a pending invitation
         const pendingTrips = trips.filter((trip: any) => {
           if (!trip.participants) return false;
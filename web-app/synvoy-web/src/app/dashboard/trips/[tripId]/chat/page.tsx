@@ -65,6 +65,7 @@ export default function TripChatPage() {
   const shouldScrollRef = useRef(true);
   const previousMessagesCountRef = useRef(0);
   const isInitialLoadRef = useRef(true);
+  const lastReadIdRef = useRef<string | null>(null);
   const isLoadingRef = useRef(false);
   const menuRef = useRef<HTMLDivElement>(null);
 
@@ -188,6 +189,13 @@ export default function TripChatPage() {
     try {
       const fetchedMessages = await messageAPI.getTripMessages(tripId);
       
+      // Fetching no longer marks messages read; acknowledge up to the newest one we've shown
+      const newest = fetchedMessages[fetchedMessages.length - 1];
+      if (newest && newest.id !== lastReadIdRef.current) {
+        lastReadIdRef.current = newest.id;
+        messageAPI.markReadUpTo(newest.id, undefined, tripId).catch(() => {});
+      }
+      
       // Only update if messages actually changed to prevent unnecessary re-renders
       setMessages(prevMessages => {
         // If we have no previous messages, always update
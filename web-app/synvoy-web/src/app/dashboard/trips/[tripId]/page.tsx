@@ -163,7 +163,7 @@ export default function TripDetailPage() {
     if (!tripId) return;
     setLoadingExpenses(true);
     try {
-      const fetchedExpenses = await expenseAPI.getTripExpenses(tripId);
+      const fetchedExpenses = await expenseAPI.getAllTripExpenses(tripId);
       setExpenses(fetchedExpenses);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch expenses');
@@ -43,7 +43,7 @@ export default function TripsPage() {
     setLoading(true);
     setError('');
     try {
-      const fetchedTrips = await tripAPI.getTrips();
+      const fetchedTrips = await tripAPI.getAllTrips();
       setTrips(fetchedTrips);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch trips');
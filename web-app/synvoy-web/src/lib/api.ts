@@ -1,4 +1,4 @@
-import axios from 'axios';
+import axios, { AxiosResponse } from 'axios';
 
 // Base URL for your FastAPI backend
 // Dynamically detect the hostname to work from both localhost and network devices
@@ -174,6 +174,29 @@ api.interceptors.response.use(
   }
 );
 
+// One page of a keyset-paginated list: pass nextCursor as `before` for the next page (null on the last one)
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+const toPage = <T>(response: AxiosResponse<T[]>): Page<T> => ({
+  items: response.data,
+  nextCursor: (response.headers['x-next-cursor'] as string | undefined) ?? null,
+});
+
+// Every item of a paginated list, following nextCursor page by page
+const fetchAllPages = async <T>(fetchPage: (before?: string) => Promise<Page<T>>): Promise<T[]> => {
+  const items: T[] = [];
+  let before: string | undefined;
+  do {
+    const page = await fetchPage(before);
+    items.push(...page.items);
+    before = page.nextCursor ?? undefined;
+  } while (before);
+  return items;
+};
+
 // Auth API functions
 export const authAPI = {
   // Register new user
@@ -296,6 +319,10 @@ export const authAPI = {
         current_password: currentPassword,
         new_password: newPassword,
       });
+      // Changing the password revokes older tokens; keep using the fresh one
+      if (response.data.access_token) {
+        storage.saveToken(response.data.access_token);
+      }
       return response.data;
     } catch (error: any) {
       throw new Error(error.response?.data?.detail || 'Failed to change password');
@@ -430,6 +457,20 @@ export const messageAPI = {
     }
   },
 
+  // Mark a conversation read up to and including messageId
+  markReadUpTo: async (messageId: string, userId?: string, tripId?: string) => {
+    try {
+      const response = await api.post('/messages/read-up-to', {
+        message_id: messageId,
+        user_id: userId,
+        trip_id: tripId,
+      });
+      return response.data;
+    } catch (error: any) {
+      throw new Error(error.response?.data?.detail || 'Failed to mark messages as read');
+    }
+  },
+
   // Get all conversations
   getConversations: async () => {
     try {
@@ -535,6 +576,17 @@ export const contactAPI = {
   },
 };
 
+// Trip list filters (GET /trips/)
+export interface TripListParams {
+  limit?: number;
+  before?: string;
+  status?: 'planning' | 'active' | 'completed' | 'cancelled';
+  start_date?: string;
+  end_date?: string;
+  role?: 'creator' | 'member';
+  include_participants?: boolean;
+}
+
 // Trip API functions
 export const tripAPI = {
   // Create a new trip
@@ -558,16 +610,20 @@ export const tripAPI = {
     }
   },
 
-  // Get all trips
-  getTrips: async () => {
+  // Get one page of trips, newest first
+  getTrips: async (params?: TripListParams): Promise<Page<any>> => {
     try {
-      const response = await api.get('/trips/');
-      return response.data;
+      const response = await api.get('/trips/', { params });
+      return toPage(response);
     } catch (error: any) {
       throw new Error(error.response?.data?.detail || error.message || 'Failed to fetch trips');
     }
   },
 
+  // Get all trips, newest first, following the pages
+  getAllTrips: async (params?: Omit<TripListParams, 'limit' | 'before'>): Promise<any[]> =>
+    fetchAllPages((before) => tripAPI.getTrips({ ...params, limit: 100, before })),
+
   // Get a specific trip
   getTrip: async (tripId: string) => {
     try {
@@ -656,18 +712,38 @@ export const expenseAPI = {
     }
   },
 
-  // Get expenses for a trip
-  getTripExpenses: async (tripId: string, includeVoid: boolean = false) => {
+  // Get one page of a trip's expenses, newest first
+  getTripExpenses: async (tripId: string, includeVoid: boolean = false, params?: {
+    limit?: number;
+    before?: string;
+    start_date?: string;
+    end_date?: string;
+    payer_user_id?: string;
+  }): Promise<Page<any>> => {
     try {
       const response = await api.get(`/expenses/trips/${tripId}/expenses`, {
-        params: { include_void: includeVoid }
+        params: { include_void: includeVoid, ...params }
       });
-      return response.data;
+      return toPage(response);
     } catch (error: any) {
       throw new Error(error.response?.data?.detail || error.message || 'Failed to fetch expenses');
     }
   },
 
+  // Get all of a trip's expenses, newest first, following the pages
+  getAllTripExpenses: async (tripId: string, includeVoid: boolean = false): Promise<any[]> =>
+    fetchAllPages((before) => expenseAPI.getTripExpenses(tripId, includeVoid, { limit: 100, before })),
+
+  // Get net balances for a trip
+  getTripBalances: async (tripId: string) => {
+    try {
+      const response = await api.get(`/expenses/trips/${tripId}/balances`);
+      return response.data;
+    } catch (error: any) {
+      throw new Error(error.response?.data?.detail || error.message || 'Failed to fetch balances');
+    }
+  },
+
   // Update an expense
   updateExpense: async (expenseId: string, expenseData: {
     amount?: string | number;
@@ -728,6 +804,16 @@ export const settlementAPI = {
       throw new Error(error.response?.data?.detail || error.message || 'Failed to mark settlement as paid');
     }
   },
+
+  // Plan the payments that settle a trip (nothing is saved)
+  planSettlement: async (tripId: string, mode: 'auto' | 'greedy' | 'exact' = 'auto') => {
+    try {
+      const response = await api.post(`/settlements/trips/${tripId}/plan`, null, { params: { mode } });
+      return response.data;
+    } catch (error: any) {
+      throw new Error(error.response?.data?.detail || error.message || 'Failed to plan settlement');
+    }
+  },
 };
 
 export default api;